@@ -13,6 +13,7 @@ sys.path.insert(0, str(BASE_DIR))
 
 import database
 import models
+from mf_services import mf_category_stats, mf_recommend_view, mf_snapshot, mf_trending
 
 SEED = 42
 
@@ -287,6 +288,12 @@ def main():
         inserted_reviews = insert_reviews(session, ratings, member_map)
         insert_wishlists_and_orders(session, ratings, member_map)
         print(f"✨ 총 {inserted_reviews} 개의 리뷰 데이터가 삽입되었습니다.")
+        # 리뷰는 bulk_save_objects로 넣어 매퍼 이벤트를 거치지 않으므로 카운터/트렌딩 점수를 다시 집계
+        mf_category_stats.backfill()
+        mf_trending.backfill()
+        mf_recommend_view.refresh()
+        # 적재 행의 시각은 과거라 학습 스냅샷 워터마크로 잡히지 않음
+        mf_snapshot.invalidate()
     finally:
         session.close()
 
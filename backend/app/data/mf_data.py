@@ -1,13 +1,16 @@
 """MF 학습용 데이터 생성(members.csv/ratings.csv)."""
 import csv
+import io
 import json
 import os
 import random
+import shutil
 import sys
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 
+import numpy as np
 import pandas as pd
 
 BASE_DIR = Path(__file__).resolve().parents[1]
@@ -48,6 +51,13 @@ ITEM_CAP = int(ITEM_CAP) if ITEM_CAP else None
 DEFAULT_DATA_DIR = Path(__file__).resolve().parents[1] / "data"
 DATA_DIR = Path(os.getenv("REC_DATA_DIR", str(DEFAULT_DATA_DIR)))
 
+# Generator: "loop"(기존 회원별 루프) | "vectorized"(numpy, 10^5~10^6 회원용)
+GENERATOR = os.getenv("REC_GENERATOR", "loop").strip().lower()
+# vectorized 전용: 출력 형식("csv" | "npy" | "both"), CSV 컬럼("full" | "slim"), 청크당 회원 수
+REC_OUTPUT = os.getenv("REC_OUTPUT", "csv").strip().lower()
+REC_CSV_COLUMNS = os.getenv("REC_CSV_COLUMNS", "full").strip().lower()
+REC_CHUNK_MEMBERS = max(1, int(os.getenv("REC_CHUNK_MEMBERS", "20000")))
+
 # Path to your taxonomy file
 CLASSIFIED_FOOD_PATH = Path(
     os.getenv(
@@ -786,6 +796,374 @@ def save_csv(path: Path, header: List[str], rows: List[List[str]]):
         w.writerows(rows)
 
 
+# -----------------------------------------------------------------------------
+# Vectorized generator (REC_GENERATOR=vectorized)
+# - 회원 속성은 numpy로 한 번에, 평점은 REC_CHUNK_MEMBERS 단위로 생성해 바로 파일에 씀
+# - 같은 (프로필, 페르소나, 이웃, 제약) 세그먼트는 풀이 같으므로 세그먼트별로 묶어 샘플링
+# - 그룹 비율/브리지 최소 포함/그룹별 평점 범위는 generate_ratings와 동일
+# -----------------------------------------------------------------------------
+GROUPS = ("main", "popular", "weak", "avoid", "noise")
+GROUP_RATIOS = (0.40, 0.20, 0.20, 0.05)
+GROUP_RANGES = np.array([(3.8, 5.0), (2.8, 4.4), (2.6, 4.2), (1.0, 2.2), (1.0, 5.0)])
+AVOID_GROUP = GROUPS.index("avoid")
+
+RATING_HEADER = [
+    "member_id",
+    "product_id",
+    "rating",
+    "persona_major",
+    "neighbor_major",
+    "constraint_major",
+    "item_major",
+    "item_sub",
+    "item_name",
+    "context",
+    "is_bridge",
+]
+MEMBER_HEADER = ["member_id", "persona_major", "neighbor_major", "constraint_major", "member_bias", "activity_n", "profile"]
+
+
+def _csv_fields(values: List[str]) -> str:
+    """CSV 한 행 문자열(줄바꿈 제외). 반복되는 범주/상품 문자열을 미리 만들어 두는 용도."""
+    buf = io.StringIO()
+    csv.writer(buf).writerow(values)
+    return buf.getvalue().rstrip("\r\n")
+
+
+def _item_tables(items: List[Item], item_bias: Dict[str, float], item_pop: Dict[str, float]) -> Dict[str, np.ndarray]:
+    cat_index = {c: i for i, c in enumerate(CATEGORIES)}
+    pop = np.array([item_pop[it.item_id] for it in items])
+    neutral = np.array([it.major in NEUTRAL_MAJOR_CATEGORIES for it in items], dtype=bool)
+
+    # generate_ratings와 같은 인기 풀: item_pop 상위(중립 대분류 제외)
+    popular_pool_size = max(50, int(len(items) * 0.12))
+    order = [i for i in np.argsort(-pop, kind="stable") if not neutral[i]][:popular_pool_size]
+    popular = np.zeros(len(items), dtype=bool)
+    popular[order] = True
+
+    return {
+        "product_id": np.array([int(it.item_id) for it in items], dtype=np.int64),
+        "major": np.array([cat_index[it.major] for it in items], dtype=np.int64),
+        "sub": np.array([it.sub for it in items], dtype=object),
+        "bias": np.array([item_bias[it.item_id] for it in items]),
+        "bridge": np.array([it.is_bridge for it in items], dtype=bool),
+        "popular": popular,
+        "suffix": np.array(
+            [_csv_fields([it.major, it.sub, it.name, it.name, "1" if it.is_bridge else "0"]) for it in items],
+            dtype=object,
+        ),
+    }
+
+
+def _profile_majors(profile: dict, sub_to_major: Dict[str, str]) -> Tuple[List[int], List[int], List[int]]:
+    """(선호 대분류, 회피 대분류 집합, 회피 소분류의 대분류 목록(중복 유지)) 인덱스."""
+    cat_index = {c: i for i, c in enumerate(CATEGORIES)}
+    avoid_list = [cat_index[sub_to_major[s]] for s in profile.get("avoid_subs", []) if sub_to_major.get(s) in cat_index]
+    favorite = {cat_index[sub_to_major[s]] for s in profile.get("favorite_subs", []) if sub_to_major.get(s) in cat_index}
+    avoid = set(avoid_list)
+    return sorted(favorite - avoid), sorted(avoid), avoid_list
+
+
+def _choice(rng: np.random.Generator, options: List[int], size: int) -> np.ndarray:
+    return np.asarray(options, dtype=np.int64)[rng.integers(len(options), size=size)]
+
+
+def make_members_vectorized(rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    """make_members + main()의 이웃/제약 보정과 같은 규칙을 배열로. 범주는 CATEGORIES 인덱스, 제약 없음은 -1."""
+    n = NUM_MEMBERS
+    num_cats = len(CATEGORIES)
+    cat_index = {c: i for i, c in enumerate(CATEGORIES)}
+    sub_to_major = {sub: major for major, subs in SUBCATEGORIES_BY_MAJOR.items() for sub in subs}
+    tables = [_profile_majors(p, sub_to_major) for p in PROFILES]
+
+    # 프로필을 회원에 고르게 배분
+    base, rem = divmod(n, len(PROFILES))
+    pool = np.concatenate([np.repeat(np.arange(len(PROFILES)), base), rng.permutation(len(PROFILES))[:rem]])
+    profile = rng.permutation(pool)[:n]
+
+    persona = np.empty(n, dtype=np.int64)
+    constraint = np.full(n, -1, dtype=np.int64)
+    constraint_candidates = [cat_index[c] for c in CONSTRAINT_CANDIDATES]
+    for p, (favorite, avoid, _) in enumerate(tables):
+        rows = np.flatnonzero(profile == p)
+        if not len(rows):
+            continue
+        candidates = favorite or [c for c in range(num_cats) if c not in avoid]
+        persona[rows] = _choice(rng, candidates, len(rows)) if candidates else rows % num_cats
+        if avoid:
+            constraint[rows] = _choice(rng, avoid, len(rows))
+        elif constraint_candidates:
+            hit = rows[rng.random(len(rows)) < CONSTRAINT_MEMBER_PROB]
+            constraint[hit] = _choice(rng, constraint_candidates, len(hit))
+
+    bias = rng.uniform(-0.45, 0.45, size=n)
+    heavy = rng.random(n) < 0.20
+    activity = np.where(
+        heavy,
+        rng.integers(max(RATINGS_MAX, 120), 201, size=n),
+        rng.integers(RATINGS_MIN, RATINGS_MAX + 1, size=n),
+    )
+
+    # 이웃: 페르소나의 링 이웃 중 프로필 선호/회피와 겹치지 않는 것
+    neighbor = np.empty(n, dtype=np.int64)
+    keys = profile * num_cats + persona
+    for key in np.unique(keys):
+        rows = np.flatnonzero(keys == key)
+        p, pers = divmod(int(key), num_cats)
+        favorite, avoid, _ = tables[p]
+        excluded = set(avoid) | set(favorite) | {pers}
+        ring = [cat_index[c] for c in NEIGHBORS.get(CATEGORIES[pers], [])]
+        candidates = [c for c in ring if c not in excluded] or [c for c in range(num_cats) if c not in excluded] or ring
+        neighbor[rows] = _choice(rng, candidates, len(rows))
+
+    # 제약이 페르소나/이웃과 겹치면 다시 고름
+    clash = np.flatnonzero((constraint >= 0) & ((constraint == persona) | (constraint == neighbor)))
+    keys = (profile[clash] * num_cats + persona[clash]) * num_cats + neighbor[clash]
+    for key in np.unique(keys):
+        rows = clash[keys == key]
+        rest, neigh = divmod(int(key), num_cats)
+        p, pers = divmod(rest, num_cats)
+        if PROFILES[p].get("avoid_subs"):
+            candidates = [c for c in tables[p][2] if c not in (pers, neigh)]
+        else:
+            candidates = [c for c in constraint_candidates if c not in (pers, neigh)]
+        constraint[rows] = _choice(rng, candidates, len(rows)) if candidates else -1
+
+    return {
+        "profile": profile,
+        "persona": persona,
+        "neighbor": neighbor,
+        "constraint": constraint,
+        "bias": bias,
+        "activity": activity,
+    }
+
+
+def _random_top(rng: np.random.Generator, candidates: np.ndarray, k: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """행마다 candidates(True) 중 k개를 균등 비복원 추출. (행, 열) 인덱스 반환."""
+    keys = rng.random(candidates.shape)
+    keys[~candidates] = -1.0
+    k = np.minimum(k, candidates.sum(axis=1))
+    kmax = int(k.max()) if len(k) else 0
+    if kmax <= 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    if kmax < keys.shape[1]:
+        top = np.argpartition(-keys, kmax - 1, axis=1)[:, :kmax]
+    else:
+        top = np.broadcast_to(np.arange(keys.shape[1]), keys.shape)
+    rows, slots = np.nonzero(np.arange(top.shape[1])[None, :] < k[:, None])
+    return rows, top[rows, slots]
+
+
+def _segment_ratings(
+    rng: np.random.Generator,
+    tables: Dict[str, np.ndarray],
+    profile: dict,
+    persona: int,
+    neighbor: int,
+    constraint: int,
+    target: np.ndarray,
+    member_bias: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """같은 세그먼트 회원들의 (회원 행, 아이템 위치, 평점)."""
+    major, sub = tables["major"], tables["sub"]
+    m, n = len(target), len(major)
+    avoid_sub = np.isin(sub, list(profile.get("avoid_subs", [])))
+    avoid_major = major == constraint
+
+    pools = [
+        (major == persona) | np.isin(sub, list(profile.get("favorite_subs", []))),
+        tables["popular"] & ~avoid_major,
+        ~tables["popular"] & ~np.isin(major, [persona, neighbor, constraint]) & ~avoid_sub,
+        avoid_major | avoid_sub,
+        ~avoid_major & ~avoid_sub,
+    ]
+    counts = [np.rint(target * ratio).astype(np.int64) for ratio in GROUP_RATIOS]
+    counts.append(np.maximum(0, target - sum(counts)))
+
+    chosen = np.zeros((m, n), dtype=bool)
+    group = np.full((m, n), -1, dtype=np.int8)
+    for g, (pool, k) in enumerate(zip(pools, counts)):
+        cols = np.flatnonzero(pool)
+        if not len(cols):
+            continue
+        rows, local = _random_top(rng, ~chosen[:, cols], k)
+        chosen[rows, cols[local]] = True
+        group[rows, cols[local]] = g
+
+    # 브리지 아이템 최소 포함 보장 후, 목표 수를 넘으면 브리지가 아닌 아이템을 덜어냄
+    bridge = np.flatnonzero(tables["bridge"])
+    if len(bridge):
+        have = chosen[:, bridge].sum(axis=1)
+        need = np.where(have < BRIDGE_MIN, np.minimum(BRIDGE_MIN - have, len(bridge)), 0)
+        rows, local = _random_top(rng, ~chosen[:, bridge], need)
+        chosen[rows, bridge[local]] = True
+        group[rows, bridge[local]] = GROUPS.index("main")
+
+        others = np.flatnonzero(~tables["bridge"])
+        overflow = np.where(need > 0, np.maximum(0, chosen.sum(axis=1) - target), 0)
+        rows, local = _random_top(rng, chosen[:, others], overflow)
+        chosen[rows, others[local]] = False
+
+    rows, cols = np.nonzero(chosen)
+    g = group[rows, cols]
+    lo, hi = GROUP_RANGES[g, 0], GROUP_RANGES[g, 1]
+    score = lo + (hi - lo) * rng.random(len(g))
+    # 회피 그룹은 편향/잡음 없이 1~2점대
+    shifted = g != AVOID_GROUP
+    score[shifted] += 0.25 * member_bias[rows[shifted]] + 0.20 * tables["bias"][cols[shifted]]
+    jitter = shifted & (rng.random(len(g)) < 0.08)
+    score[jitter] += rng.uniform(-0.4, 0.4, size=int(jitter.sum()))
+    ratings = np.clip(np.rint(score), 1, 5).astype(np.int8)
+    return rows, cols, ratings
+
+
+class _ColumnWriter:
+    """평점 컬럼을 청크마다 .bin에 덧붙이고 close()에서 .npy(헤더 + 본문)로 확정."""
+
+    DTYPES = {"member_id": np.int32, "product_id": np.int32, "rating": np.int8}
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.rows = 0
+        self.files = {key: open(path / f"{key}.bin", "wb") for key in self.DTYPES}
+
+    def append(self, columns: Dict[str, np.ndarray]):
+        for key, dtype in self.DTYPES.items():
+            np.ascontiguousarray(columns[key], dtype=dtype).tofile(self.files[key])
+        self.rows += len(columns["rating"])
+
+    def close(self, meta: Dict):
+        for key, dtype in self.DTYPES.items():
+            self.files[key].close()
+            raw = self.path / f"{key}.bin"
+            with open(self.path / f"{key}.npy", "wb") as out, open(raw, "rb") as src:
+                np.lib.format.write_array_header_1_0(out, {
+                    "descr": np.lib.format.dtype_to_descr(np.dtype(dtype)),
+                    "fortran_order": False,
+                    "shape": (self.rows,),
+                })
+                shutil.copyfileobj(src, out, 1 << 20)
+            raw.unlink()
+        (self.path / "meta.json").write_text(json.dumps({**meta, "rows": self.rows}, ensure_ascii=False), encoding="utf-8")
+
+
+def generate_vectorized(items: List[Item], item_bias: Dict[str, float], item_pop: Dict[str, float]) -> Dict[str, np.ndarray]:
+    """members.csv와 ratings.csv(또는 ratings_npy/)를 청크 단위로 생성. 메모리는 O(회원 수 + 청크 x 아이템 수)."""
+    rng = np.random.default_rng(SEED)
+    tables = _item_tables(items, item_bias, item_pop)
+    members = make_members_vectorized(rng)
+    n = len(members["persona"])
+    category_csv = np.array([_csv_fields([c]) for c in CATEGORIES] + [""], dtype=object)
+    profile_csv = [_csv_fields([p["name"]]) for p in PROFILES]
+
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    with open(DATA_DIR / "members.csv", "w", newline="", encoding="utf-8") as f:
+        f.write(",".join(MEMBER_HEADER) + "\n")
+        for start in range(0, n, REC_CHUNK_MEMBERS):
+            end = min(start + REC_CHUNK_MEMBERS, n)
+            f.write("".join(
+                f"U{u + 1:03d},{category_csv[pe]},{category_csv[ne]},{category_csv[co]},{b:.3f},{a},{profile_csv[pr]}\n"
+                for u, pe, ne, co, b, a, pr in zip(
+                    range(start, end),
+                    members["persona"][start:end].tolist(),
+                    members["neighbor"][start:end].tolist(),
+                    members["constraint"][start:end].tolist(),
+                    members["bias"][start:end].tolist(),
+                    members["activity"][start:end].tolist(),
+                    members["profile"][start:end].tolist(),
+                )
+            ))
+
+    csv_file = None
+    if REC_OUTPUT in ("csv", "both"):
+        csv_file = open(DATA_DIR / "ratings.csv", "w", newline="", encoding="utf-8")
+        csv_file.write(",".join(RATING_HEADER if REC_CSV_COLUMNS == "full" else RATING_HEADER[:3]) + "\n")
+    columns = _ColumnWriter(DATA_DIR / "ratings_npy") if REC_OUTPUT in ("npy", "both") else None
+
+    per_member = np.zeros(n, dtype=np.int64)
+    per_item = np.zeros(len(items), dtype=np.int64)
+    rating_counts = np.zeros(6, dtype=np.int64)
+    try:
+        for start in range(0, n, REC_CHUNK_MEMBERS):
+            end = min(start + REC_CHUNK_MEMBERS, n)
+            num_cats = len(CATEGORIES)
+            segment = ((members["profile"][start:end] * num_cats + members["persona"][start:end]) * num_cats
+                       + members["neighbor"][start:end]) * (num_cats + 1) + members["constraint"][start:end] + 1
+            parts = []
+            for key in np.unique(segment):
+                rows = start + np.flatnonzero(segment == key)
+                rest, constraint = divmod(int(key), num_cats + 1)
+                rest, neighbor = divmod(rest, num_cats)
+                profile, persona = divmod(rest, num_cats)
+                local, cols, ratings = _segment_ratings(
+                    rng, tables, PROFILES[profile], persona, neighbor, constraint - 1,
+                    members["activity"][rows], members["bias"][rows],
+                )
+                parts.append((rows[local], cols, ratings))
+
+            # 회원 순서대로 정렬해 기록
+            member_rows = np.concatenate([p[0] for p in parts])
+            order = np.argsort(member_rows, kind="stable")
+            member_rows = member_rows[order]
+            cols = np.concatenate([p[1] for p in parts])[order]
+            ratings = np.concatenate([p[2] for p in parts])[order]
+
+            per_member += np.bincount(member_rows, minlength=n)
+            per_item += np.bincount(cols, minlength=len(items))
+            rating_counts += np.bincount(ratings, minlength=6)
+
+            product_ids = tables["product_id"][cols]
+            if csv_file is not None:
+                if REC_CSV_COLUMNS == "full":
+                    context = [
+                        f"{category_csv[pe]},{category_csv[ne]},{category_csv[co]}"
+                        for pe, ne, co in zip(
+                            members["persona"][start:end].tolist(),
+                            members["neighbor"][start:end].tolist(),
+                            members["constraint"][start:end].tolist(),
+                        )
+                    ]
+                    suffix = tables["suffix"]
+                    csv_file.write("".join(
+                        f"U{u + 1:03d},{pid},{r},{context[u - start]},{suffix[c]}\n"
+                        for u, pid, r, c in zip(member_rows.tolist(), product_ids.tolist(), ratings.tolist(), cols.tolist())
+                    ))
+                else:
+                    csv_file.write("".join(
+                        f"U{u + 1:03d},{pid},{r}\n"
+                        for u, pid, r in zip(member_rows.tolist(), product_ids.tolist(), ratings.tolist())
+                    ))
+            if columns is not None:
+                columns.append({"member_id": member_rows + 1, "product_id": product_ids, "rating": ratings})
+            print(f"  members {end}/{n} ratings {int(per_member.sum())}", flush=True)
+    finally:
+        if csv_file is not None:
+            csv_file.close()
+    if columns is not None:
+        columns.close({"seed": SEED, "members": n, "items": len(items)})
+
+    return {"per_member": per_member, "per_item": per_item, "rating_counts": rating_counts, **members}
+
+
+def _report_vectorized(stats: Dict[str, np.ndarray]):
+    """members.csv 규칙 검증과 분포 요약 출력."""
+    persona, neighbor, constraint = stats["persona"], stats["neighbor"], stats["constraint"]
+    assert not (persona == neighbor).any(), "persona_major equals neighbor_major"
+    assert not ((constraint >= 0) & ((constraint == persona) | (constraint == neighbor))).any(), \
+        "constraint_major overlaps persona/neighbor"
+
+    per_member, per_item = stats["per_member"], stats["per_item"]
+    print(
+        f"members={len(per_member)} ratings={int(per_member.sum())}",
+        f"per_member min/p50/max={int(per_member.min())}/{int(np.median(per_member))}/{int(per_member.max())}",
+        f"per_item min/p50/p90/max={int(per_item.min())}/{int(np.median(per_item))}/"
+        f"{int(np.quantile(per_item, 0.9))}/{int(per_item.max())}",
+        "ratings=" + ",".join(f"{r}:{int(stats['rating_counts'][r])}" for r in range(1, 6)),
+    )
+
+
 def main():
     """CSV 생성 진입점."""
     random.seed(SEED)
@@ -793,6 +1171,10 @@ def main():
     init_categories_from_db()
 
     items, item_bias, item_pop = make_items(CLASSIFIED_FOOD_PATH)
+    if GENERATOR == "vectorized":
+        _report_vectorized(generate_vectorized(items, item_bias, item_pop))
+        print("✨ MF 데이터가 생성되었습니다.")
+        return
     members, member_persona, member_bias, member_constraint, member_activity, member_profile = make_members()
 
     sub_to_major = {}
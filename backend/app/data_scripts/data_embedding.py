@@ -1,9 +1,9 @@
 import os
-import voyageai
 from dotenv import load_dotenv
 from sqlalchemy.orm import Session
 from database import SessionLocal
 from models import Product, Recipe, RecipeProduct, Category
+from embedding_services import gateway as embedding_gateway, vector_search
 from sqlalchemy import case, text, or_, func
 import re
 
@@ -14,12 +14,15 @@ import re
 # ..env 파일 로드
 load_dotenv()
 
-# Voyage Client 설정
+# 임베딩 게이트웨이 설정 (EMBEDDING_PROVIDER=hashing이면 네트워크 없이 결정적 벡터)
 EMBEDDING_API_KEY = os.getenv('EMBEDDING_API_KEY')
-if not EMBEDDING_API_KEY:
+if os.getenv('EMBEDDING_PROVIDER', 'voyage').lower() == 'voyage' and not EMBEDDING_API_KEY:
     raise ValueError("❌ ..env 파일에 'EMBEDDING_API_KEY'가 없습니다.")
 
-client = voyageai.Client(api_key=EMBEDDING_API_KEY)
+client = embedding_gateway.client()
+
+# 재료-상품 매칭에서 인덱스로 먼저 뽑을 벡터 유사 상품 수
+MATCH_VECTOR_CANDIDATES = 10
 
 # -----------------------------------------------------------
 # 2. 내부 로직 함수 (임베딩 생성 & 상품 매칭)
@@ -119,6 +122,8 @@ def _match_ingredients_to_products(db: Session):
     print(f"   🔍 총 {len(target_ingredients)}개의 재료에 대해 짝꿍 상품을 찾습니다.")
 
     matched_count = 0
+    # 벡터 후보는 HNSW 인덱스로 상위 몇 개만 뽑는다(트랜잭션 단위 설정이라 루프 전에 한 번)
+    vector_search.apply_search_params(db, limit=MATCH_VECTOR_CANDIDATES)
 
     for item in target_ingredients:
         raw_keyword = item.ingredient or ""
@@ -156,7 +161,19 @@ def _match_ingredients_to_products(db: Session):
         total_score = (cat_score + name_score + vec_score).label("total_score")
 
         # 5. 쿼리 실행
-        top_match = db.query(Product).join(Category, Product.category_id == Category.id).filter(Product.is_active == True).order_by(total_score.desc()).limit(1).first()
+        # 후보: 벡터 근사 상위 + 카테고리/상품명 점수가 있는 상품. 텍스트 점수가 0인 상품 중 최고점은
+        # 벡터 최상위 상품이므로 전체 상품을 정렬한 결과와 같다(전체 거리 계산 순차 스캔을 피함)
+        vector_ids = [
+            pid for (pid,) in db.query(Product.id)
+            .filter(Product.is_active == True)
+            .order_by(Product.embedding.cosine_distance(item.embedding))
+            .limit(MATCH_VECTOR_CANDIDATES)
+            .all()
+        ]
+        top_match = db.query(Product).join(Category, Product.category_id == Category.id).filter(
+            Product.is_active == True,
+            or_(Product.id.in_(vector_ids), cat_score + name_score > 0),
+        ).order_by(total_score.desc()).limit(1).first()
 
         if top_match:
             item.product_id = top_match.id
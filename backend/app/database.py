@@ -32,20 +32,61 @@ def get_db():
     finally:
         db.close()
 
+RECOMMEND_VIEW_SELECT = """
+    SELECT
+      member_id,
+      product_id,
+      ROUND(AVG(rating))::int AS rating,
+      MAX(COALESCE(updated_at, created_at)) AS updated_at
+    FROM product_review
+    GROUP BY member_id, product_id
+"""
+
+
+def recommend_view_materialized() -> bool:
+    """recommend_view를 구체화 뷰(리뷰 쓰기 후 모아서 갱신)로 만들지 여부."""
+    return os.getenv("RECOMMEND_VIEW_MATERIALIZED", "false").lower() in {"1", "true", "yes"}
+
+
+def recommend_view_kind(conn):
+    """현재 recommend_view 종류: 'v'(일반 뷰), 'm'(구체화 뷰), 없으면 None."""
+    return conn.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('recommend_view')")).scalar()
+
+
+def drop_recommend_view(conn):
+    """일반/구체화 뷰 어느 쪽이든 recommend_view 삭제."""
+    kind = recommend_view_kind(conn)
+    if kind == "m":
+        conn.execute(text("DROP MATERIALIZED VIEW IF EXISTS recommend_view CASCADE"))
+    elif kind == "v":
+        conn.execute(text("DROP VIEW IF EXISTS recommend_view CASCADE"))
+
+
 def create_tables():
     import models
 
     tables = [table for table in Base.metadata.sorted_tables if not table.info.get("is_view")]
     Base.metadata.create_all(bind=engine, tables=tables)
+    # create_all은 이미 있는 테이블에 새로 선언한 인덱스를 만들지 않으므로 따로 확인
+    for table in tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
 
     with engine.begin() as conn:
-        conn.execute(text("""
-        CREATE OR REPLACE VIEW recommend_view AS
-            SELECT
-              member_id,
-              product_id,
-              ROUND(AVG(rating))::int AS rating,
-              MAX(COALESCE(updated_at, created_at)) AS updated_at
-            FROM product_review
-            GROUP BY member_id, product_id
-        """))
\ No newline at end of file
+        kind = recommend_view_kind(conn)
+        if recommend_view_materialized():
+            if kind == "v":
+                conn.execute(text("DROP VIEW recommend_view CASCADE"))
+            conn.execute(text(f"CREATE MATERIALIZED VIEW IF NOT EXISTS recommend_view AS {RECOMMEND_VIEW_SELECT}"))
+            # REFRESH ... CONCURRENTLY에 필요한 유니크 인덱스
+            conn.execute(text(
+                "CREATE UNIQUE INDEX IF NOT EXISTS ux_recommend_view_member_product "
+                "ON recommend_view (member_id, product_id)"
+            ))
+            if kind == "m":
+                # 서버가 내려가 있던 동안의 리뷰 반영
+                conn.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY recommend_view"))
+        else:
+            if kind == "m":
+                conn.execute(text("DROP MATERIALIZED VIEW recommend_view CASCADE"))
+            conn.execute(text(f"CREATE OR REPLACE VIEW recommend_view AS {RECOMMEND_VIEW_SELECT}"))
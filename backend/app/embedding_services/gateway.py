@@ -0,0 +1,326 @@
+"""임베딩 게이트웨이: 동시에 들어온 임베딩 요청을 몇 ms 모아 한 번의 배치 embed 호출로 보낸다.
+
+- 전용 이벤트 루프 스레드에서 (모델, 입력 종류)별로 요청을 모으고, EMBEDDING_BATCH_WAIT_MS가 지나거나
+  EMBEDDING_MAX_BATCH개가 차면 보낸다. 결과는 요청별로 다시 나눠 돌려준다(배치 안 중복 텍스트는 한 번만 보냄).
+- 동시 호출 수(EMBEDDING_MAX_CONCURRENCY)와 초당 호출 수(EMBEDDING_RATE_PER_SEC, 0이면 제한 없음)를 지킨다.
+- 제공자(EMBEDDING_PROVIDER): voyage(원격) | hashing(네트워크 없는 결정적 특성 해싱, 부하 테스트용).
+
+동기 코드(FastAPI 스레드풀, LangGraph 노드, 스크립트)는 client()의 voyageai.Client 모양 인터페이스를 쓰면
+여러 스레드의 호출이 한 배치로 묶인다. 게이트웨이 루프 스레드 안에서 동기 호출하면 교착되므로 주의.
+
+    python -m embedding_services.gateway --requests 2000 --threads 64 --latency-ms 50
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "voyage-3.5"
+DEFAULT_DIM = 1024
+
+BatchKey = Tuple[str, str]
+
+_WORDS = re.compile(r"\w+")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+class VoyageProvider:
+    """voyageai.Client 배치 호출(블로킹, 게이트웨이가 실행기 스레드에서 호출)."""
+
+    name = "voyage"
+
+    def __init__(self, api_key: Optional[str] = None):
+        import voyageai
+
+        self._client = voyageai.Client(api_key=api_key or os.getenv("EMBEDDING_API_KEY"))
+
+    def embed(self, texts: List[str], model: str, input_type: str) -> List[List[float]]:
+        return self._client.embed(texts, model=model, input_type=input_type or None).embeddings
+
+
+class HashingProvider:
+    """단어와 글자 3-gram을 부호 있는 특성 해싱으로 dim차원에 모은 L2 정규화 벡터.
+
+    같은 텍스트는 항상 같은 벡터, 글자가 겹치는 텍스트는 비슷한 벡터가 된다. latency_ms는 호출당 지연 흉내.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dim: int = DEFAULT_DIM, latency_ms: float = 0.0):
+        self.dim = dim
+        self.latency_ms = latency_ms
+
+    def _vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in _WORDS.findall(text.lower()):
+            padded = f"<{word}>"
+            for feature in [word] + [padded[i:i + 3] for i in range(max(1, len(padded) - 2))]:
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                index = int.from_bytes(digest[:4], "little") % self.dim
+                vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def embed(self, texts: List[str], model: str, input_type: str) -> List[List[float]]:
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000.0)
+        return [self._vector(text).tolist() for text in texts]
+
+
+def make_provider(name: Optional[str] = None):
+    name = (name or os.getenv("EMBEDDING_PROVIDER", "voyage")).lower()
+    if name == "hashing":
+        return HashingProvider(
+            dim=_env_int("EMBEDDING_HASHING_DIM", DEFAULT_DIM),
+            latency_ms=_env_float("EMBEDDING_HASHING_LATENCY_MS", 0.0),
+        )
+    return VoyageProvider()
+
+
+class EmbeddingGateway:
+    """요청을 모아 배치로 보내는 비동기 게이트웨이(전용 이벤트 루프 스레드에서 동작)."""
+
+    def __init__(
+        self,
+        provider=None,
+        max_batch: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        rate_per_sec: Optional[float] = None,
+    ):
+        self.provider = provider if provider is not None else make_provider()
+        self.max_batch = max(1, max_batch or _env_int("EMBEDDING_MAX_BATCH", 128))
+        wait_ms = max_wait_ms if max_wait_ms is not None else _env_float("EMBEDDING_BATCH_WAIT_MS", 5.0)
+        self.max_wait = max(0.0, wait_ms) / 1000.0
+        self.max_concurrency = max(1, max_concurrency or _env_int("EMBEDDING_MAX_CONCURRENCY", 4))
+        rate = rate_per_sec if rate_per_sec is not None else _env_float("EMBEDDING_RATE_PER_SEC", 0.0)
+        self.rate_per_sec = max(0.0, rate)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._start_lock = threading.Lock()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._pending: Dict[BatchKey, List[Tuple[str, asyncio.Future]]] = {}
+        self._timers: Dict[BatchKey, asyncio.TimerHandle] = {}
+        self._next_slot = 0.0
+        self._in_flight = 0
+        self._requests = 0
+        self._batches = 0
+        self._texts_sent = 0
+        self._errors = 0
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="embedding-gateway", daemon=True).start()
+                self._loop = loop
+        return self._loop
+
+    # ----- 아래는 게이트웨이 루프 안에서만 실행 -----
+
+    def _enqueue(self, key: BatchKey, text: str) -> asyncio.Future:
+        future = self._loop.create_future()
+        pending = self._pending.setdefault(key, [])
+        pending.append((text, future))
+        self._requests += 1
+        if len(pending) >= self.max_batch:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = self._loop.call_later(self.max_wait, self._flush, key)
+        return future
+
+    def _flush(self, key: BatchKey):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        pending = self._pending.pop(key, [])
+        for start in range(0, len(pending), self.max_batch):
+            self._loop.create_task(self._send(key, pending[start:start + self.max_batch]))
+
+    async def _throttle(self):
+        """초당 호출 수 제한: 다음 호출 시작 시각을 1/rate 간격으로 예약."""
+        if not self.rate_per_sec:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + 1.0 / self.rate_per_sec
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _send(self, key: BatchKey, batch: List[Tuple[str, asyncio.Future]]):
+        model, input_type = key
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            await self._throttle()
+            self._in_flight += 1
+            try:
+                vectors = await self._loop.run_in_executor(None, self.provider.embed, texts, model, input_type)
+                if len(vectors) != len(texts):
+                    raise RuntimeError(f"embedding provider returned {len(vectors)} vectors for {len(texts)} texts")
+            except Exception as exc:
+                self._errors += 1
+                logger.warning("Embedding batch failed (%d texts): %s", len(texts), exc)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                return
+            finally:
+                self._in_flight -= 1
+        self._batches += 1
+        self._texts_sent += len(texts)
+        by_text = dict(zip(texts, vectors))
+        for text, future in batch:
+            if not future.done():
+                future.set_result(list(by_text[text]))
+
+    async def _embed_many(self, texts: Sequence[str], model: str, input_type: str) -> List[List[float]]:
+        futures = [self._enqueue((model, input_type or ""), text) for text in texts]
+        return list(await asyncio.gather(*futures))
+
+    # ----- 공개 인터페이스 -----
+
+    async def embed(self, texts: Sequence[str], model: str = DEFAULT_MODEL, input_type: str = "document") -> List[List[float]]:
+        """비동기 호출(어느 이벤트 루프에서든). 다른 동시 요청과 한 배치로 묶일 수 있다."""
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self._embed_many(list(texts), model, input_type), loop)
+        return await asyncio.wrap_future(future)
+
+    def embed_blocking(self, texts: Sequence[str], model: str = DEFAULT_MODEL, input_type: str = "document") -> List[List[float]]:
+        """동기 호출(스레드에서). 게이트웨이 루프 스레드 안에서는 호출하지 않는다."""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self._embed_many(list(texts), model, input_type), loop).result()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider.name,
+            "requests": self._requests,
+            "batches": self._batches,
+            "texts_sent": self._texts_sent,
+            "avg_batch_size": (self._texts_sent / self._batches) if self._batches else 0.0,
+            "in_flight": self._in_flight,
+            "errors": self._errors,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "max_concurrency": self.max_concurrency,
+            "rate_per_sec": self.rate_per_sec,
+        }
+
+
+class EmbedResult(NamedTuple):
+    embeddings: List[List[float]]
+
+
+class GatewayClient:
+    """voyageai.Client.embed와 같은 모양의 동기 인터페이스."""
+
+    def __init__(self, gateway: EmbeddingGateway):
+        self._gateway = gateway
+
+    def embed(self, texts: Sequence[str], model: str = DEFAULT_MODEL, input_type: Optional[str] = None) -> EmbedResult:
+        return EmbedResult(self._gateway.embed_blocking(texts, model=model, input_type=input_type or ""))
+
+
+_GATEWAY: Optional[EmbeddingGateway] = None
+_GATEWAY_LOCK = threading.Lock()
+
+
+def gateway() -> EmbeddingGateway:
+    """프로세스 공용 게이트웨이(처음 쓸 때 생성)."""
+    global _GATEWAY
+    with _GATEWAY_LOCK:
+        if _GATEWAY is None:
+            _GATEWAY = EmbeddingGateway()
+        return _GATEWAY
+
+
+def client() -> GatewayClient:
+    return GatewayClient(gateway())
+
+
+def stats() -> Dict[str, Any]:
+    return _GATEWAY.stats() if _GATEWAY is not None else {"provider": None, "requests": 0}
+
+
+def _load_test(requests: int, threads: int, gateway_: EmbeddingGateway) -> Dict[str, float]:
+    """threads개 스레드가 한 건씩 동기 호출(서로 다른 질의 텍스트)."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    shared = GatewayClient(gateway_)
+
+    def _one(i: int) -> float:
+        started = time.perf_counter()
+        shared.embed([f"load test query {i % 997} 김치찌개 레시피 {i}"], input_type="query")
+        return (time.perf_counter() - started) * 1000.0
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = list(pool.map(_one, range(requests)))
+    wall = time.perf_counter() - started
+    return {
+        "wall_sec": wall,
+        "requests_per_sec": requests / wall if wall > 0 else 0.0,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        **{key: gateway_.stats()[key] for key in ("batches", "avg_batch_size", "errors")},
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="embedding gateway load test")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="hashing 제공자의 호출당 지연")
+    parser.add_argument("--wait-ms", type=float, default=5.0)
+    parser.add_argument("--max-batch", type=int, default=128)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=0.0, help="초당 호출 수 제한(0이면 없음)")
+    args = parser.parse_args(argv)
+
+    # 배치 없이(한 건씩) 보낸 경우와 비교
+    for label, max_batch in (("unbatched", 1), ("batched", args.max_batch)):
+        gateway_ = EmbeddingGateway(
+            provider=HashingProvider(latency_ms=args.latency_ms),
+            max_batch=max_batch,
+            max_wait_ms=args.wait_ms,
+            max_concurrency=args.concurrency,
+            rate_per_sec=args.rate,
+        )
+        result = _load_test(args.requests, args.threads, gateway_)
+        print(
+            f"{label}: requests={args.requests} threads={args.threads}",
+            f"rps={result['requests_per_sec']:.0f}",
+            f"p50_ms={result['p50_ms']:.1f}",
+            f"p95_ms={result['p95_ms']:.1f}",
+            f"batches={result['batches']}",
+            f"avg_batch={result['avg_batch_size']:.1f}",
+            f"errors={result['errors']}",
+        )
+
+
+if __name__ == "__main__":
+    main()
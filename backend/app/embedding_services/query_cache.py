@@ -0,0 +1,172 @@
+"""질의 임베딩 2단 캐시(프로세스 내 LRU -> query_embedding_cache 테이블 -> 원격 임베딩 API).
+
+키는 (모델, 입력 종류, 정규화 텍스트). 정규화(NFKC, 공백 정리, 소문자)한 텍스트를 임베딩하므로
+표기만 다른 같은 질의는 같은 벡터를 쓴다. 테이블에는 float32 바이트로 저장한다.
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.dialects.postgresql import insert
+
+from database import SessionLocal
+from models import QueryEmbedding
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "voyage-3.5"
+DEFAULT_MAX_ENTRIES = 1024
+
+_SPACES = re.compile(r"\s+")
+
+CacheKey = Tuple[str, str, str]
+
+
+def _max_entries() -> int:
+    try:
+        return max(1, int(os.getenv("QUERY_EMBED_CACHE_SIZE", str(DEFAULT_MAX_ENTRIES))))
+    except ValueError:
+        return DEFAULT_MAX_ENTRIES
+
+
+def _persist_enabled() -> bool:
+    """테이블(2단) 캐시 사용 여부."""
+    return os.getenv("QUERY_EMBED_CACHE_PERSIST", "true").lower() not in {"0", "false", "no"}
+
+
+def normalize(query: str) -> str:
+    return _SPACES.sub(" ", unicodedata.normalize("NFKC", query or "")).strip().lower()
+
+
+def _text_hash(normalized: str) -> str:
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class QueryEmbeddingCache:
+    """LRU(1단) + 테이블(2단) 질의 임베딩 캐시와 단계별 적중 통계."""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[CacheKey, np.ndarray]" = OrderedDict()
+        self._memory_hits = 0
+        self._table_hits = 0
+        self._misses = 0
+        self._errors = 0
+        self.evictions = 0
+
+    def _remember(self, key: CacheKey, vector: np.ndarray):
+        limit = self._max_entries or _max_entries()
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > limit:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _memory_get(self, key: CacheKey) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self._memory_hits += 1
+            return vector
+
+    def _table_get(self, key: CacheKey) -> Optional[np.ndarray]:
+        model, input_type, text_hash = key
+        with SessionLocal() as db:
+            row = db.get(QueryEmbedding, (model, input_type, text_hash))
+            if row is None:
+                return None
+            return np.frombuffer(row.vector, dtype=np.float32).copy()
+
+    def _table_put(self, key: CacheKey, normalized: str, vector: np.ndarray):
+        model, input_type, text_hash = key
+        with SessionLocal() as db:
+            db.execute(
+                insert(QueryEmbedding)
+                .values(
+                    model=model,
+                    input_type=input_type,
+                    text_hash=text_hash,
+                    query_text=normalized,
+                    dim=int(len(vector)),
+                    vector=vector.tobytes(),
+                )
+                .on_conflict_do_nothing()
+            )
+            db.commit()
+
+    def embed(self, client, query: str, model: str = DEFAULT_MODEL, input_type: str = "query") -> List[float]:
+        """질의 임베딩. 1단 -> 2단 -> client.embed 순으로 찾고, 원격 결과는 두 단계에 모두 저장."""
+        normalized = normalize(query)
+        key = (model, input_type, _text_hash(normalized))
+        vector = self._memory_get(key)
+        if vector is not None:
+            return vector.tolist()
+
+        if _persist_enabled():
+            try:
+                vector = self._table_get(key)
+            except Exception as exc:
+                self._errors += 1
+                logger.warning("Query embedding cache read failed: %s", exc)
+            if vector is not None:
+                with self._lock:
+                    self._table_hits += 1
+                self._remember(key, vector)
+                return vector.tolist()
+
+        with self._lock:
+            self._misses += 1
+        vector = np.asarray(
+            client.embed([normalized], model=model, input_type=input_type).embeddings[0], dtype=np.float32
+        )
+        self._remember(key, vector)
+        if _persist_enabled():
+            try:
+                self._table_put(key, normalized, vector)
+            except Exception as exc:
+                self._errors += 1
+                logger.warning("Query embedding cache write failed: %s", exc)
+        return vector.tolist()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._memory_hits + self._table_hits + self._misses
+            return {
+                "memory_hits": self._memory_hits,
+                "table_hits": self._table_hits,
+                "misses": self._misses,
+                "memory_hit_ratio": (self._memory_hits / lookups) if lookups else 0.0,
+                "hit_ratio": ((self._memory_hits + self._table_hits) / lookups) if lookups else 0.0,
+                "errors": self._errors,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "persist": _persist_enabled(),
+            }
+
+
+_CACHE = QueryEmbeddingCache()
+
+
+def embed_query(client, query: str, model: str = DEFAULT_MODEL, input_type: str = "query") -> List[float]:
+    return _CACHE.embed(client, query, model=model, input_type=input_type)
+
+
+def stats() -> Dict[str, Any]:
+    return _CACHE.stats()
+
+
+def clear():
+    _CACHE.clear()
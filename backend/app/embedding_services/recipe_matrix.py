@@ -0,0 +1,110 @@
+"""레시피 임베딩 행렬 캐시(L2 정규화 float32, id 오름차순)와 장바구니 상품 기반 레시피 점수.
+
+임베딩이 채워지거나 바뀌거나 레시피가 추가/삭제되면 (개수, 최대 id, id 합, 임베딩 합의 해시) 시그니처가
+바뀌어 다시 로드한다. 임베딩 작업은 별도 프로세스라 API 워커는 이 시그니처로만 변경을 알아챈다.
+시그니처 확인은 RECIPE_EMBEDDING_CHECK_SEC마다 한 번만 한다.
+"""
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import Product, Recipe
+
+_CACHE: Optional[Dict[str, Any]] = None
+_LOCK = threading.Lock()
+
+
+def _check_seconds() -> float:
+    """임베딩 변경 여부(시그니처) 확인 주기(초)."""
+    try:
+        return max(0.0, float(os.getenv("RECIPE_EMBEDDING_CHECK_SEC", "30")))
+    except ValueError:
+        return 30.0
+
+
+def _signature(db: Session) -> Tuple[int, int, int, str]:
+    """같은 id 집합을 다시 임베딩한 경우도 잡도록 임베딩의 원소별 합(pgvector sum)을 해시해 넣는다."""
+    count, max_id, id_sum, vector_sum = (
+        db.query(
+            func.count(Recipe.id),
+            func.coalesce(func.max(Recipe.id), 0),
+            func.coalesce(func.sum(Recipe.id), 0),
+            func.sum(Recipe.embedding),
+        )
+        .filter(Recipe.embedding.isnot(None))
+        .one()
+    )
+    digest = "" if vector_sum is None else hashlib.sha1(np.asarray(vector_sum, dtype=np.float32).tobytes()).hexdigest()
+    return int(count), int(max_id), int(id_sum), digest
+
+
+def _normalized(vectors: Sequence[Any]) -> np.ndarray:
+    """pgvector 값들 -> 행별 L2 정규화 float32 행렬(영벡터는 그대로 0)."""
+    matrix = np.asarray([np.asarray(v, dtype=np.float32) for v in vectors], dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1.0)
+
+
+def recipe_matrix(db: Session) -> Tuple[np.ndarray, np.ndarray]:
+    """(레시피 id 배열, 정규화 임베딩 행렬)."""
+    global _CACHE
+    cached = _CACHE
+    now = time.monotonic()
+    if cached is not None and now - cached["checked_at"] < _check_seconds():
+        return cached["ids"], cached["matrix"]
+
+    signature = _signature(db)
+    if cached is not None and cached["signature"] == signature:
+        cached["checked_at"] = now
+        return cached["ids"], cached["matrix"]
+
+    with _LOCK:
+        # 다른 스레드가 먼저 다시 로드했으면 그대로 사용
+        cached = _CACHE
+        if cached is not None and cached["signature"] == signature:
+            return cached["ids"], cached["matrix"]
+        rows = (
+            db.query(Recipe.id, Recipe.embedding)
+            .filter(Recipe.embedding.isnot(None))
+            .order_by(Recipe.id)
+            .all()
+        )
+        ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        matrix = _normalized([r[1] for r in rows]) if rows else np.zeros((0, 0), dtype=np.float32)
+        _CACHE = {"signature": signature, "checked_at": time.monotonic(), "ids": ids, "matrix": matrix}
+    return ids, matrix
+
+
+def recommend_for_products(db: Session, product_ids: Sequence[int], limit: int = 4) -> List[int]:
+    """장바구니 상품별 코사인 유사도의 최댓값이 높은 레시피 id(점수 내림차순, 동점은 id 순).
+
+    상품이 하나도 없으면 빈 목록, 임베딩 있는 상품이 없으면 모든 레시피가 동점(-1)이다.
+    """
+    rows = db.query(Product.id, Product.embedding).filter(Product.id.in_(list(product_ids))).all()
+    if not rows:
+        return []
+    ids, matrix = recipe_matrix(db)
+    if not len(ids) or limit <= 0:
+        return []
+
+    vectors = [embedding for _, embedding in rows if embedding is not None]
+    if vectors:
+        scores = (_normalized(vectors) @ matrix.T).max(axis=0)
+    else:
+        scores = np.full(len(ids), -1.0, dtype=np.float32)
+
+    k = min(limit, len(ids))
+    if k < len(ids):
+        # 경계 점수와 같은 레시피는 모두 포함해 동점 순서가 전체 정렬과 같도록 함
+        threshold = scores[np.argpartition(-scores, k - 1)[:k]].min()
+        top = np.flatnonzero(scores >= threshold)
+    else:
+        top = np.arange(len(ids))
+    top = top[np.lexsort((ids[top], -scores[top]))][:k]
+    return ids[top].tolist()
@@ -0,0 +1,176 @@
+"""채팅 레시피 검색(ORDER BY embedding <=> :query LIMIT k)의 HNSW ef_search별 재현율/지연 벤치마크.
+
+질의 벡터는 --query-table의 임베딩을 표본 추출해 가우시안 잡음(--noise, 벡터 노름 대비)을 섞어 만든다.
+기준값은 인덱스를 끈 정확한 순차 검색 결과다. 읽기 전용(각 질의 후 롤백).
+
+    python -m embedding_services.vector_bench --table recipe --k 20 --ef 10,20,40,80,160
+"""
+import json
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import Product, Recipe, RecipeProduct
+from embedding_services import vector_search
+
+TABLES = {"recipe": Recipe, "product": Product, "recipe_product": RecipeProduct}
+
+
+def _sample_queries(db: Session, model, count: int, noise: float, seed: int) -> np.ndarray:
+    rows = (
+        db.query(model.embedding)
+        .filter(model.embedding.isnot(None))
+        .order_by(func.md5(func.concat(model.id, str(seed))))
+        .limit(count)
+        .all()
+    )
+    if not rows:
+        return np.zeros((0, 0), dtype=np.float32)
+    vectors = np.asarray([np.asarray(r[0], dtype=np.float32) for r in rows])
+    rng = np.random.default_rng(seed)
+    scale = noise * np.linalg.norm(vectors, axis=1, keepdims=True) / np.sqrt(vectors.shape[1])
+    return (vectors + rng.standard_normal(vectors.shape).astype(np.float32) * scale).astype(np.float32)
+
+
+def _search(db: Session, model, vector: np.ndarray, k: int) -> List[int]:
+    return [
+        rid for (rid,) in db.query(model.id)
+        .order_by(model.embedding.cosine_distance(vector))
+        .limit(k)
+        .all()
+    ]
+
+
+def _uses_index(db: Session, model, vector: np.ndarray, k: int, ef: int) -> bool:
+    """실제 실행 계획이 HNSW 인덱스를 타는지(작은 테이블은 순차 스캔이 선택될 수 있음)."""
+    vector_search.apply_search_params(db, limit=k, ef=ef)
+    plan = db.execute(
+        text(f"EXPLAIN SELECT id FROM {model.__tablename__} ORDER BY embedding <=> CAST(:query AS vector) LIMIT :k"),
+        {"query": "[" + ",".join(map(str, vector.tolist())) + "]", "k": k},
+    ).scalars().all()
+    db.rollback()
+    return any("embedding_hnsw" in line for line in plan)
+
+
+def _timed(db: Session, model, vector: np.ndarray, k: int, ef: Optional[int], exact: bool = False):
+    vector_search.apply_search_params(db, limit=k, ef=ef, exact=exact)
+    started = time.perf_counter()
+    ids = _search(db, model, vector, k)
+    elapsed = (time.perf_counter() - started) * 1000.0
+    db.rollback()
+    return ids, elapsed
+
+
+def run(
+    db: Session,
+    table: str = "recipe",
+    query_table: Optional[str] = None,
+    k: int = 20,
+    efs: Sequence[int] = (10, 20, 40, 80, 160),
+    queries: int = 100,
+    noise: float = 0.1,
+    seed: int = 42,
+) -> Dict[str, Any]:
+    model = TABLES[table]
+    vectors = _sample_queries(db, TABLES[query_table or table], queries, noise, seed)
+    db.rollback()
+    if not len(vectors):
+        return {"meta": {"table": table, "queries": 0}, "results": []}
+    rows = db.query(func.count(model.id)).filter(model.embedding.isnot(None)).scalar()
+    db.rollback()
+
+    exact_ids, exact_ms = [], []
+    for vector in vectors:
+        ids, elapsed = _timed(db, model, vector, k, None, exact=True)
+        exact_ids.append(set(ids))
+        exact_ms.append(elapsed)
+
+    results: List[Dict[str, Any]] = [{
+        "ef_search": "exact",
+        "recall": 1.0,
+        "latency_p50_ms": float(np.percentile(exact_ms, 50)),
+        "latency_p95_ms": float(np.percentile(exact_ms, 95)),
+        "index_used": False,
+    }]
+    # HNSW는 ef_search개까지만 돌려주므로 k보다 작은 값은 k로 올라간다
+    for ef in sorted({max(int(ef), k) for ef in efs}):
+        recalls, latencies = [], []
+        for vector, truth in zip(vectors, exact_ids):
+            ids, elapsed = _timed(db, model, vector, k, ef)
+            recalls.append(len(truth & set(ids)) / len(truth) if truth else 1.0)
+            latencies.append(elapsed)
+        results.append({
+            "ef_search": ef,
+            "recall": float(np.mean(recalls)),
+            "latency_p50_ms": float(np.percentile(latencies, 50)),
+            "latency_p95_ms": float(np.percentile(latencies, 95)),
+            "index_used": _uses_index(db, model, vectors[0], k, ef),
+        })
+    return {
+        "meta": {
+            "table": table,
+            "query_table": query_table or table,
+            "rows": int(rows),
+            "k": k,
+            "queries": int(len(vectors)),
+            "noise": noise,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="vector_bench")
+    parser.add_argument("--table", choices=sorted(TABLES), default="recipe")
+    parser.add_argument("--query-table", choices=sorted(TABLES), default=None, help="질의 벡터를 뽑을 테이블(기본: --table)")
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--ef", default="10,20,40,80,160", help="쉼표 구분 hnsw.ef_search 값(k보다 작으면 k)")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--noise", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=None, help="JSON 리포트 경로")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        report = run(
+            db,
+            table=args.table,
+            query_table=args.query_table,
+            k=args.k,
+            efs=[int(v) for v in args.ef.split(",") if v.strip()],
+            queries=args.queries,
+            noise=args.noise,
+            seed=args.seed,
+        )
+    finally:
+        db.close()
+
+    meta = report["meta"]
+    if not meta["queries"]:
+        print(f"No embeddings in {meta['table']}.")
+        return
+    print(f"table={meta['table']} rows={meta['rows']} k={meta['k']} queries={meta['queries']}")
+    for row in report["results"]:
+        print(
+            f"ef_search={row['ef_search']}",
+            f"recall@{meta['k']}={row['recall']:.4f}",
+            f"p50_ms={row['latency_p50_ms']:.2f}",
+            f"p95_ms={row['latency_p95_ms']:.2f}",
+            f"index_used={row['index_used']}",
+        )
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"report={args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""pgvector 근사 검색 설정(쿼리별 hnsw.ef_search / ivfflat.probes).
+
+embedding 컬럼에는 HNSW 코사인 인덱스(models._embedding_hnsw_index)가 있어
+ORDER BY embedding <=> :query LIMIT n 쿼리가 인덱스를 탄다. 설정은 현재 트랜잭션에만 적용된다.
+"""
+import os
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+
+def ef_search() -> int:
+    """HNSW 검색 후보 수(VECTOR_EF_SEARCH, pgvector 기본 40). 클수록 재현율↑ 지연↑."""
+    try:
+        return max(1, int(os.getenv("VECTOR_EF_SEARCH", "40")))
+    except ValueError:
+        return 40
+
+
+def ivfflat_probes() -> Optional[int]:
+    """IVFFlat 인덱스를 쓸 때 탐색할 리스트 수(VECTOR_IVFFLAT_PROBES). 없으면 서버 기본값."""
+    value = os.getenv("VECTOR_IVFFLAT_PROBES", "").strip()
+    if not value:
+        return None
+    try:
+        return max(1, int(value))
+    except ValueError:
+        return None
+
+
+def apply_search_params(db: Session, limit: int = 0, ef: Optional[int] = None, exact: bool = False):
+    """이번 트랜잭션의 벡터 검색 설정.
+
+    HNSW는 ef_search개까지만 돌려주므로 ef_search는 최소 limit으로 맞춘다.
+    exact=True면 인덱스를 끄고 정확한 순차 검색(벤치마크 기준값용).
+    """
+    ef = max(ef or ef_search(), limit)
+    db.execute(text("SELECT set_config('hnsw.ef_search', :value, true)"), {"value": str(ef)})
+    probes = ivfflat_probes()
+    if probes is not None:
+        db.execute(text("SELECT set_config('ivfflat.probes', :value, true)"), {"value": str(probes)})
+    if exact:
+        db.execute(text("SELECT set_config('enable_indexscan', 'off', true)"))
@@ -9,6 +9,7 @@ from data_scripts.data_insert import data_insert_func
 from data.insert_cookingtips import insert_cookingtips_func
 from data_scripts.data_embedding import data_embedding_func
 from mf_services.mf_services import run_mf_pipeline
+from mf_services import mf_category_stats, mf_retrain, mf_trending
 from routers.recommendations import start_scheduler, shutdown_scheduler
 
 # 1. 서버 시작 시 실행될 로직 분리
@@ -20,6 +21,8 @@ async def lifespan(app: FastAPI):
         data_insert_func()
         insert_cookingtips_func()
         data_embedding_func()
+        mf_category_stats.backfill()
+        mf_trending.backfill()
         run_mf_pipeline()
         start_scheduler()
     except Exception as e:
@@ -27,6 +30,7 @@ async def lifespan(app: FastAPI):
     yield
     print("서버를 종료합니다.")
     shutdown_scheduler()
+    mf_retrain.shutdown()
 
 app = FastAPI(title="Resiply Backend", lifespan=lifespan)
 
@@ -0,0 +1,229 @@
+"""MF 아이템 벡터용 근사 최대 내적 검색(IVF, numpy).
+
+점수 = global_mean + user_bias + item_bias + u·v 이므로 순위는 [v, b_i]·[u, 1]로 정해진다.
+아이템 벡터에 sqrt(M^2 - |x|^2) 차원을 붙여 내적 검색을 L2 최근접 검색으로 바꾼 뒤
+k-means로 나눈 리스트 중 질의와 가까운 몇 개만 정확히 점수 계산한다.
+"""
+import os
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from . import mf_quant
+
+ANN_KEYS = ("ann_centroids", "ann_order", "ann_offsets")
+
+
+def enabled() -> bool:
+    return os.getenv("MF_ANN_ENABLED", "false").lower() in {"1", "true", "yes"}
+
+
+def min_items() -> int:
+    """이 개수 이상의 아이템에서만 인덱스를 쓴다(작은 카탈로그는 전체 계산이 더 빠름)."""
+    try:
+        return max(1, int(os.getenv("MF_ANN_MIN_ITEMS", "20000")))
+    except ValueError:
+        return 20000
+
+
+def pool_size() -> int:
+    """인덱스에서 꺼낼 후보 수(카테고리 보너스/정규화/다양성은 이 후보 안에서 적용)."""
+    try:
+        return max(1, int(os.getenv("MF_ANN_POOL", "500")))
+    except ValueError:
+        return 500
+
+
+def _nprobe() -> int:
+    try:
+        return max(1, int(os.getenv("MF_ANN_NPROBE", "16")))
+    except ValueError:
+        return 16
+
+
+def _nlist(num_items: int) -> int:
+    try:
+        value = int(os.getenv("MF_ANN_NLIST", "0"))
+    except ValueError:
+        value = 0
+    if value <= 0:
+        value = int(np.sqrt(num_items))
+    return max(1, min(value, num_items))
+
+
+def should_build(num_items: int) -> bool:
+    return enabled() and num_items >= min_items()
+
+
+def _augment(item_factors: np.ndarray, item_bias: np.ndarray) -> np.ndarray:
+    """[v, b] + 노름 보정 차원(모든 행의 노름이 같아져 내적 순위 = L2 거리 순위)."""
+    x = np.hstack([
+        np.asarray(item_factors, dtype=np.float32),
+        np.asarray(item_bias, dtype=np.float32)[:, None],
+    ])
+    sq = np.einsum("ij,ij->i", x, x)
+    extra = np.sqrt(np.maximum(sq.max() - sq, 0.0))
+    return np.hstack([x, extra[:, None]]).astype(np.float32)
+
+
+def _assign(x: np.ndarray, centroids: np.ndarray, chunk: int = 8192) -> np.ndarray:
+    """가장 가까운 중심 인덱스(|c|^2 - 2 x·c 최소, 청크 단위)."""
+    c_sq = np.einsum("ij,ij->i", centroids, centroids)
+    out = np.empty(len(x), dtype=np.int64)
+    for start in range(0, len(x), chunk):
+        block = x[start:start + chunk]
+        out[start:start + chunk] = np.argmin(c_sq[None, :] - 2.0 * (block @ centroids.T), axis=1)
+    return out
+
+
+def build_index(
+    item_factors: np.ndarray,
+    item_bias: np.ndarray,
+    nlist: Optional[int] = None,
+    iters: int = 10,
+    seed: int = 42,
+) -> Dict[str, np.ndarray]:
+    """k-means로 아이템을 nlist개 리스트로 나눈 IVF 인덱스(ann_* 배열 dict)."""
+    x = _augment(item_factors, item_bias)
+    n = len(x)
+    nlist = nlist or _nlist(n)
+    rng = np.random.default_rng(seed)
+
+    # 중심 학습은 표본으로(리스트당 최대 64개), 할당은 전체
+    sample = x[rng.choice(n, size=min(n, nlist * 64), replace=False)]
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+    for _ in range(iters):
+        labels = _assign(sample, centroids)
+        counts = np.bincount(labels, minlength=nlist)
+        sums = np.zeros_like(centroids, dtype=np.float64)
+        np.add.at(sums, labels, sample)
+        empty = counts == 0
+        centroids[~empty] = (sums[~empty] / counts[~empty, None]).astype(np.float32)
+        if empty.any():
+            # 빈 리스트는 임의 표본으로 다시 시작
+            centroids[empty] = sample[rng.choice(len(sample), size=int(empty.sum()), replace=False)]
+
+    labels = _assign(x, centroids)
+    order = np.argsort(labels, kind="stable").astype(np.int64)
+    offsets = np.zeros(nlist + 1, dtype=np.int64)
+    np.cumsum(np.bincount(labels, minlength=nlist), out=offsets[1:])
+    return {"ann_centroids": centroids, "ann_order": order, "ann_offsets": offsets}
+
+
+def index_for(model: Dict[str, np.ndarray]) -> Optional[Dict[str, np.ndarray]]:
+    """모델에 저장된 인덱스, 없으면(구버전 npz 등) 한 번 만들어 모델 dict에 넣어 둔다.
+
+    인덱스가 모델과 함께 살고 죽으므로 교체된 모델의 인덱스가 새 모델에 쓰일 일이 없다.
+    """
+    if all(model.get(key) is not None for key in ANN_KEYS):
+        return {key: model[key] for key in ANN_KEYS}
+    if not should_build(len(model["item_ids"])):
+        return None
+    # 동시에 두 요청이 만들면 같은 결과를 두 번 계산할 뿐(dict 갱신은 키 단위로 원자적)
+    index = build_index(mf_quant.rows(model, "item_factors"), model["item_bias"])
+    model.update(index)
+    return index
+
+
+def search(
+    model: Dict[str, np.ndarray],
+    index: Dict[str, np.ndarray],
+    user_vector: np.ndarray,
+    k: int,
+    nprobe: Optional[int] = None,
+) -> np.ndarray:
+    """근사 상위 k개 아이템 위치(점수 내림차순). 탐색 리스트가 k개보다 적으면 리스트를 더 연다."""
+    centroids, order, offsets = index["ann_centroids"], index["ann_order"], index["ann_offsets"]
+    query = np.zeros(centroids.shape[1], dtype=np.float32)
+    query[:-2] = user_vector
+    query[-2] = 1.0
+    c_sq = np.einsum("ij,ij->i", centroids, centroids)
+    probe_order = np.argsort(c_sq - 2.0 * (centroids @ query))
+
+    sizes = np.diff(offsets)[probe_order]
+    need = np.searchsorted(np.cumsum(sizes), k) + 1
+    probes = probe_order[: max(nprobe or _nprobe(), int(need))]
+    positions = np.concatenate([order[offsets[c]:offsets[c + 1]] for c in probes])
+
+    scores = mf_quant.matvec(model, "item_factors", user_vector, positions)
+    scores += model["item_bias"][positions]
+    if len(positions) > k:
+        top = np.argpartition(-scores, k - 1)[:k]
+        positions, scores = positions[top], scores[top]
+    return positions[np.argsort(-scores, kind="stable")]
+
+
+def benchmark(
+    model: Dict[str, np.ndarray],
+    k: int = 100,
+    queries: int = 200,
+    nprobes: Optional[List[int]] = None,
+    seed: int = 42,
+) -> List[Dict[str, float]]:
+    """학습된 회원 벡터로 정확 검색 대비 recall@k와 질의 지연(ms) 비교."""
+    rng = np.random.default_rng(seed)
+    users = rng.choice(len(model["user_ids"]), size=min(queries, len(model["user_ids"])), replace=False)
+    started = time.perf_counter()
+    index = build_index(mf_quant.rows(model, "item_factors"), model["item_bias"])
+    build_sec = time.perf_counter() - started
+
+    exact_ms: List[float] = []
+    truth = []
+    for u in users:
+        t = time.perf_counter()
+        scores = mf_quant.matvec(model, "item_factors", mf_quant.rows(model, "user_factors", u)) + model["item_bias"]
+        top = np.argpartition(-scores, k - 1)[:k]
+        exact_ms.append((time.perf_counter() - t) * 1000)
+        truth.append(top)
+
+    rows = [{
+        "method": "exact", "nprobe": 0, "recall": 1.0,
+        "p50_ms": float(np.percentile(exact_ms, 50)), "p95_ms": float(np.percentile(exact_ms, 95)),
+        "build_sec": 0.0,
+    }]
+    for nprobe in nprobes or [1, 2, 4, 8, 16, 32]:
+        latencies: List[float] = []
+        hits = 0
+        for u, expected in zip(users, truth):
+            t = time.perf_counter()
+            found = search(model, index, mf_quant.rows(model, "user_factors", u), k, nprobe=nprobe)
+            latencies.append((time.perf_counter() - t) * 1000)
+            hits += len(np.intersect1d(found, expected))
+        rows.append({
+            "method": "ivf", "nprobe": nprobe, "recall": hits / (k * len(users)),
+            "p50_ms": float(np.percentile(latencies, 50)), "p95_ms": float(np.percentile(latencies, 95)),
+            "build_sec": build_sec,
+        })
+    return rows
+
+
+def main():
+    import argparse
+
+    from . import mf_services
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["bench"])
+    parser.add_argument("--k", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    model = mf_services.load_mf_model()
+    if not model:
+        print("Model not found.")
+        return
+    print(f"items={len(model['item_ids'])} users={len(model['user_ids'])} k={args.k}")
+    for row in benchmark(model, k=args.k, queries=args.queries):
+        print(
+            f"method={row['method']}",
+            f"nprobe={row['nprobe']}",
+            f"recall@{args.k}={row['recall']:.3f}",
+            f"p50_ms={row['p50_ms']:.3f}",
+            f"p95_ms={row['p95_ms']:.3f}",
+            f"build_sec={row['build_sec']:.2f}",
+        )
+
+
+if __name__ == "__main__":
+    main()
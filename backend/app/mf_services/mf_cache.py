@@ -0,0 +1,250 @@
+"""MF 추천 결과 캐시(프로세스 내 LRU / Redis).
+
+키에 모델 버전과 회원 세대(generation)를 넣어 무효화한다.
+- 새 모델 버전이 공개되면 키가 바뀌어 이전 항목은 자연히 쓰이지 않는다(전역 무효화).
+- 회원이 주문/위시/리뷰하면 그 회원의 세대를 올린다(회원 단위 무효화).
+프로세스 내 LRU는 워커마다 따로라 다른 워커의 무효화를 보지 못하므로, 워커가 여럿이면 redis를 쓴다.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (product_id, avg_rating, review_count, score)
+CachedRow = Tuple[int, float, int, Optional[float]]
+
+DEFAULT_MAX_ENTRIES = 10000
+
+
+def _backend_name() -> str:
+    """캐시 백엔드(memory/redis)."""
+    return os.getenv("MF_CACHE_BACKEND", "memory").lower()
+
+
+def _max_entries() -> int:
+    try:
+        return max(1, int(os.getenv("MF_CACHE_MAX_ENTRIES", str(DEFAULT_MAX_ENTRIES))))
+    except ValueError:
+        return DEFAULT_MAX_ENTRIES
+
+
+class LRUBackend:
+    """크기 상한이 있는 프로세스 내 LRU(항목별 만료 시각 포함).
+
+    회원 세대도 같은 상한의 LRU로 두고, 밀려난 회원은 남은 항목까지 지워 세대 0부터 다시 시작해도 안전하다.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, List[CachedRow]]]" = OrderedDict()
+        self._generations: "OrderedDict[int, int]" = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[List[CachedRow]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, rows = entry
+            if time.time() > expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return rows
+
+    def set(self, key: str, rows: List[CachedRow], ttl: int):
+        limit = self._max_entries or _max_entries()
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, rows)
+            self._entries.move_to_end(key)
+            while len(self._entries) > limit:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def generation(self, member_id: int) -> int:
+        return self._generations.get(int(member_id), 0)
+
+    def bump(self, member_id: int) -> int:
+        limit = self._max_entries or _max_entries()
+        with self._lock:
+            value = self._generations.get(int(member_id), 0) + 1
+            self._generations[int(member_id)] = value
+            self._generations.move_to_end(int(member_id))
+            # 이전 세대 항목은 다시 조회되지 않으므로 바로 비워 자리 확보
+            prefixes = [f"{int(member_id)}:"]
+            while len(self._generations) > limit:
+                dropped, _ = self._generations.popitem(last=False)
+                prefixes.append(f"{dropped}:")
+            prefixes = tuple(prefixes)
+            for key in [k for k in self._entries if k.startswith(prefixes)]:
+                del self._entries[key]
+            return value
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+
+class RedisBackend:
+    """Redis 백엔드. 결과는 JSON, 회원 세대는 INCR 카운터라 워커 간에 공유된다."""
+
+    name = "redis"
+
+    def __init__(self, client=None, prefix: str = "mf:rec"):
+        self._client = client
+        self._prefix = prefix
+
+    @property
+    def client(self):
+        if self._client is None:
+            import redis
+
+            self._client = redis.Redis.from_url(os.getenv("MF_CACHE_REDIS_URL", "redis://localhost:6379/0"))
+        return self._client
+
+    def _gen_key(self, member_id: int) -> str:
+        return f"{self._prefix}:gen:{int(member_id)}"
+
+    def get(self, key: str) -> Optional[List[CachedRow]]:
+        raw = self.client.get(f"{self._prefix}:{key}")
+        if raw is None:
+            return None
+        return [tuple(row) for row in json.loads(raw)]
+
+    def set(self, key: str, rows: List[CachedRow], ttl: int):
+        self.client.set(f"{self._prefix}:{key}", json.dumps(rows), ex=max(1, int(ttl)))
+
+    def generation(self, member_id: int) -> int:
+        raw = self.client.get(self._gen_key(member_id))
+        return int(raw) if raw is not None else 0
+
+    def bump(self, member_id: int) -> int:
+        return int(self.client.incr(self._gen_key(member_id)))
+
+    def size(self) -> Optional[int]:
+        return None
+
+    def clear(self):
+        for key in self.client.scan_iter(match=f"{self._prefix}:*"):
+            self.client.delete(key)
+
+
+class RecommendCache:
+    """백엔드 위에 키 구성/세대 무효화/적중률 집계를 얹은 캐시."""
+
+    def __init__(self, backend=None):
+        self._backend = backend
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._sets = 0
+        self._invalidations = 0
+        self._errors = 0
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = RedisBackend() if _backend_name() == "redis" else LRUBackend()
+        return self._backend
+
+    def key(self, version: Optional[str], member_id: Optional[int], variant: Tuple[Any, ...]) -> Optional[str]:
+        """회원/세대/모델 버전/요청 값으로 키 구성(백엔드 장애 시 None: 캐시 우회)."""
+        member = "anon" if member_id is None else str(int(member_id))
+        try:
+            generation = 0 if member_id is None else self.backend.generation(member_id)
+        except Exception as exc:
+            logger.warning("MF cache generation lookup failed: %s", exc)
+            with self._lock:
+                self._errors += 1
+            return None
+        suffix = ":".join(str(part) for part in variant)
+        return f"{member}:{generation}:{version or '-'}:{suffix}"
+
+    def get(self, key: str) -> Optional[List[CachedRow]]:
+        try:
+            rows = self.backend.get(key)
+        except Exception as exc:
+            # 캐시 장애는 추천 실패로 이어지지 않게 미스로 처리
+            logger.warning("MF cache get failed: %s", exc)
+            with self._lock:
+                self._errors += 1
+                self._misses += 1
+            return None
+        with self._lock:
+            if rows is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return rows
+
+    def set(self, key: str, rows: List[CachedRow], ttl: int):
+        try:
+            self.backend.set(key, rows, ttl)
+        except Exception as exc:
+            logger.warning("MF cache set failed: %s", exc)
+            with self._lock:
+                self._errors += 1
+            return
+        with self._lock:
+            self._sets += 1
+
+    def invalidate_member(self, member_id: int):
+        try:
+            self.backend.bump(member_id)
+        except Exception as exc:
+            logger.warning("MF cache invalidate failed member_id=%s: %s", member_id, exc)
+            with self._lock:
+                self._errors += 1
+            return
+        with self._lock:
+            self._invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "backend": self.backend.name,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": (self._hits / lookups) if lookups else 0.0,
+                "sets": self._sets,
+                "invalidations": self._invalidations,
+                "errors": self._errors,
+                # Redis는 maxmemory 정책으로 서버에서 내보내므로 여기서는 집계하지 않음(None)
+                "evictions": getattr(self.backend, "evictions", None),
+                "entries": self.backend.size(),
+            }
+
+
+_CACHE = RecommendCache()
+
+
+def get_cache() -> RecommendCache:
+    return _CACHE
+
+
+def set_backend(backend) -> RecommendCache:
+    """백엔드 교체(로컬 대체 Redis 클라이언트 주입 등)."""
+    global _CACHE
+    _CACHE = RecommendCache(backend)
+    return _CACHE
+
+
+def invalidate_member(member_id: int):
+    _CACHE.invalidate_member(member_id)
+
+
+def stats() -> Dict[str, Any]:
+    return _CACHE.stats()
@@ -0,0 +1,129 @@
+"""회원×카테고리 상호작용 카운터(member_category_stats) 조회/재구성.
+
+리뷰/위시/주문 ORM 쓰기는 models의 매퍼 이벤트가 같은 트랜잭션에서 카운터를 증감한다.
+bulk_save_objects/Core insert 같은 대량 적재는 이벤트를 거치지 않으므로 시작 시와 적재 후 rebuild()로 다시 맞춘다.
+"""
+import logging
+import time
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+import database
+import models
+
+logger = logging.getLogger(__name__)
+
+# (카테고리별 정규화 선호 가중치, 카테고리별 상호작용 수, 총 상호작용 수)
+CategoryStats = Tuple[Dict[int, float], Dict[int, int], int]
+
+REVIEW_WEIGHT = 1.0
+WISHLIST_WEIGHT = 0.8
+ORDER_WEIGHT = 1.2
+
+# 쓰기 트랜잭션의 증감과 섞이지 않도록 테이블을 잠근 채 원본에서 다시 집계
+_REBUILD_SQL = [
+    "LOCK TABLE member_category_stats IN EXCLUSIVE MODE",
+    "DELETE FROM member_category_stats",
+    """
+    INSERT INTO member_category_stats
+        (member_id, category_id, review_count, rating_sum, wishlist_count, order_count, updated_at)
+    SELECT member_id, category_id, SUM(reviews), SUM(ratings), SUM(wishlists), SUM(orders), now()
+    FROM (
+        SELECT r.member_id, p.category_id, 1 AS reviews, r.rating AS ratings, 0 AS wishlists, 0 AS orders
+        FROM product_review r JOIN product p ON p.id = r.product_id
+        UNION ALL
+        SELECT w.member_id, p.category_id, 0, 0, 1, 0
+        FROM wishlist w JOIN product p ON p.id = w.product_id
+        UNION ALL
+        SELECT o.member_id, p.category_id, 0, 0, 0, 1
+        FROM order_detail d
+        JOIN "order" o ON o.id = d.order_id
+        JOIN product p ON p.id = d.product_id
+    ) src
+    WHERE member_id IS NOT NULL
+    GROUP BY member_id, category_id
+    """,
+]
+
+
+def rebuild() -> Dict[str, Any]:
+    """원본 테이블에서 카운터 전체를 한 트랜잭션으로 다시 계산."""
+    started = time.perf_counter()
+    with database.engine.begin() as conn:
+        for sql in _REBUILD_SQL:
+            result = conn.execute(text(sql))
+    summary = {"rows": result.rowcount, "duration_sec": time.perf_counter() - started}
+    logger.info("member_category_stats rebuilt rows=%d in %.2fs", summary["rows"], summary["duration_sec"])
+    return summary
+
+
+def backfill():
+    """서버 시작/대량 적재 후 호출(실패해도 진행)."""
+    try:
+        rebuild()
+    except Exception as exc:
+        logger.warning("member_category_stats rebuild failed: %s", exc, exc_info=True)
+
+
+def member_rows(db: Session, member_ids: List[int]) -> List[models.MemberCategoryStats]:
+    """회원들의 카운터 행(기본키 인덱스 조회, 회원/카테고리 id 순)."""
+    ids = [int(mid) for mid in member_ids]
+    if not ids:
+        return []
+    stats = models.MemberCategoryStats
+    return (
+        db.query(stats)
+        .filter(stats.member_id.in_(ids))
+        .order_by(stats.member_id, stats.category_id)
+        .all()
+    )
+
+
+def category_stats_batch(db: Session, member_ids: List[int]) -> Dict[int, CategoryStats]:
+    """여러 회원의 카테고리 선호 가중치/상호작용 수(쿼리 한 번).
+
+    카테고리 순서가 동점 선호 카테고리의 우선순위가 되므로 카테고리 id 순으로 고정한다.
+    """
+    ids = [int(mid) for mid in member_ids]
+    weights: Dict[int, Dict[int, float]] = {mid: {} for mid in ids}
+    counts: Dict[int, Dict[int, int]] = {mid: {} for mid in ids}
+    for row in member_rows(db, ids):
+        total = row.review_count + row.wishlist_count + row.order_count
+        if total <= 0:
+            continue
+        mid, cid = int(row.member_id), int(row.category_id)
+        weights[mid][cid] = (
+            row.review_count * REVIEW_WEIGHT + row.wishlist_count * WISHLIST_WEIGHT + row.order_count * ORDER_WEIGHT
+        )
+        counts[mid][cid] = int(total)
+
+    stats: Dict[int, CategoryStats] = {}
+    for mid in ids:
+        member_weights, member_counts = weights[mid], counts[mid]
+        total_interactions = sum(member_counts.values())
+        max_weight = max(member_weights.values()) if member_weights else 0.0
+        if max_weight <= 0.0:
+            stats[mid] = ({}, member_counts, total_interactions)
+        else:
+            stats[mid] = (
+                {cid: w / max_weight for cid, w in member_weights.items()},
+                member_counts,
+                total_interactions,
+            )
+    return stats
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+    summary = rebuild()
+    print(f"rows={summary['rows']} duration_sec={summary['duration_sec']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,449 @@
+"""MF 학습 엔진(numpy 미니배치 SGD / ALS / 암시적 피드백 ALS).
+
+`mf_services._train_biased_mf`(샘플 단위 SGD)와 같은 입력을 받아 같은 결과 dict를 반환한다.
+암시적 엔진(ials)은 값을 평점이 아니라 상호작용 강도(신뢰도)로 해석한다.
+"""
+import os
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+Ratings = Union[List[Tuple[int, int, float]], Tuple[np.ndarray, np.ndarray, np.ndarray]]
+
+# ALS에서 한 번에 쌓는 (평점 수 x k x k) 외적 블록 상한
+ALS_BLOCK_ROWS = 8192
+# 암시적 ALS에서 한 번에 모으는 (행 수 x 최대 길이) 패딩 블록 상한(x k개 실수)
+IALS_BLOCK_NNZ = 262144
+# 검증 AUC 계산 시 양성 하나당 뽑는 무작위 음성 수
+IALS_VAL_NEGATIVES = 4
+
+
+def as_arrays(ratings: Ratings) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(member_id, product_id, rating) 목록 또는 배열 3개를 배열 3개로 통일."""
+    if isinstance(ratings, tuple) and len(ratings) == 3 and isinstance(ratings[0], np.ndarray):
+        users, items, values = ratings
+        return (
+            np.asarray(users, dtype=np.int64),
+            np.asarray(items, dtype=np.int64),
+            np.asarray(values, dtype=np.float64),
+        )
+    if not ratings:
+        return np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0, np.float64)
+    data = np.asarray(ratings, dtype=np.float64)
+    return data[:, 0].astype(np.int64), data[:, 1].astype(np.int64), data[:, 2]
+
+
+def _prepare(ratings: Ratings, seed: int, center_user: bool):
+    """id 인덱싱, 셔플 후 검증 분할, 유저 평균 계산."""
+    rng = np.random.default_rng(seed)
+    users, items, values = as_arrays(ratings)
+    user_ids, u_idx = np.unique(users, return_inverse=True)
+    item_ids, i_idx = np.unique(items, return_inverse=True)
+
+    perm = rng.permutation(len(values))
+    u_idx, i_idx, values = u_idx[perm], i_idx[perm], values[perm]
+
+    val_size = max(1, int(0.1 * len(values)))
+    split = {
+        "val": (u_idx[:val_size], i_idx[:val_size], values[:val_size]),
+        "train": (u_idx[val_size:], i_idx[val_size:], values[val_size:]),
+    }
+
+    num_users = len(user_ids)
+    user_mean = np.zeros(num_users, dtype=np.float64)
+    if center_user and len(values):
+        sums = np.bincount(u_idx, weights=values, minlength=num_users)
+        counts = np.bincount(u_idx, minlength=num_users)
+        user_mean = sums / np.maximum(counts, 1)
+    return rng, user_ids, item_ids, split, user_mean
+
+
+def _val_rmse(val, user_mean, global_mean, user_bias, item_bias, user_factors, item_factors, center_user) -> float:
+    u, i, r = val
+    if not len(r):
+        return 0.0
+    pred = global_mean + user_bias[u] + item_bias[i] + np.einsum("ij,ij->i", user_factors[u], item_factors[i])
+    if center_user:
+        pred = pred + user_mean[u]
+    return float(np.sqrt(np.mean((r - pred) ** 2)))
+
+
+def _result(user_ids, item_ids, user_mean, center_user, best_rmse, state, global_mean) -> Dict:
+    user_factors, item_factors, user_bias, item_bias = state
+    return {
+        "user_factors": user_factors.astype(np.float32),
+        "item_factors": item_factors.astype(np.float32),
+        "user_bias": user_bias.astype(np.float32),
+        "item_bias": item_bias.astype(np.float32),
+        "global_mean": np.array(global_mean, dtype=np.float32),
+        "user_ids": user_ids.astype(np.int64),
+        "item_ids": item_ids.astype(np.int64),
+        "user_mean": user_mean.astype(np.float32),
+        "center_user": center_user,
+        "rmse": best_rmse,
+    }
+
+
+def _scatter_mean(inverse: np.ndarray, grads: np.ndarray, size: int) -> np.ndarray:
+    """같은 파라미터에 모인 그래디언트를 평균(배치 내 중복 업데이트 폭주 방지)."""
+    counts = np.bincount(inverse, minlength=size).astype(np.float64)
+    if grads.ndim == 1:
+        return np.bincount(inverse, weights=grads, minlength=size) / counts
+    summed = np.zeros((size, grads.shape[1]), dtype=np.float64)
+    np.add.at(summed, inverse, grads)
+    return summed / counts[:, None]
+
+
+def train_minibatch_sgd(
+    ratings: Ratings,
+    factors: int,
+    epochs: int,
+    lr: float,
+    reg: float,
+    seed: int,
+    center_user: bool,
+    patience: int = 3,
+    batch_size: int = 512,
+) -> Dict:
+    """미니배치 SGD. 배치 안에서 같은 유저/아이템 그래디언트는 평균 후 한 번에 반영."""
+    rng, user_ids, item_ids, split, user_mean = _prepare(ratings, seed, center_user)
+    num_users, num_items = len(user_ids), len(item_ids)
+    tu, ti, tr = split["train"]
+    targets = tr - user_mean[tu] if center_user else tr
+
+    global_mean = float(targets.mean()) if len(targets) else 0.0
+    user_bias = np.zeros(num_users, dtype=np.float64)
+    item_bias = np.zeros(num_items, dtype=np.float64)
+    user_factors = rng.normal(0, 0.1, size=(num_users, factors)).astype(np.float64)
+    item_factors = rng.normal(0, 0.1, size=(num_items, factors)).astype(np.float64)
+
+    best_rmse = float("inf")
+    best_state = None
+    patience_left = patience
+    batch_size = max(1, int(batch_size))
+
+    for _ in range(epochs):
+        order = rng.permutation(len(targets))
+        for start in range(0, len(order), batch_size):
+            b = order[start:start + batch_size]
+            u, i, t = tu[b], ti[b], targets[b]
+            uf = user_factors[u]
+            it = item_factors[i]
+            err = t - (global_mean + user_bias[u] + item_bias[i] + np.einsum("ij,ij->i", uf, it))
+
+            bu, u_inv = np.unique(u, return_inverse=True)
+            bi, i_inv = np.unique(i, return_inverse=True)
+            user_bias[bu] += lr * _scatter_mean(u_inv, err - reg * user_bias[u], len(bu))
+            item_bias[bi] += lr * _scatter_mean(i_inv, err - reg * item_bias[i], len(bi))
+            user_factors[bu] += lr * _scatter_mean(u_inv, err[:, None] * it - reg * uf, len(bu))
+            item_factors[bi] += lr * _scatter_mean(i_inv, err[:, None] * uf - reg * it, len(bi))
+
+        rmse = _val_rmse(
+            split["val"], user_mean, global_mean, user_bias, item_bias, user_factors, item_factors, center_user
+        )
+        if rmse + 1e-5 < best_rmse:
+            best_rmse = rmse
+            best_state = (user_factors.copy(), item_factors.copy(), user_bias.copy(), item_bias.copy())
+            patience_left = patience
+        else:
+            patience_left -= 1
+            if patience_left <= 0:
+                break
+
+    state = best_state or (user_factors, item_factors, user_bias, item_bias)
+    return _result(
+        user_ids, item_ids, user_mean, center_user,
+        best_rmse if best_state is not None else 0.0, state, global_mean,
+    )
+
+
+def _groups(index: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """index 기준 정렬 순서와 구간 포인터(CSR indptr)."""
+    order = np.argsort(index, kind="stable")
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(index, minlength=size), out=indptr[1:])
+    return order, indptr
+
+
+def _length_blocks(counts: np.ndarray, budget: int):
+    """평점 수가 비슷한 행끼리 묶어 (행 수 x 최대 길이)가 budget 이하인 블록을 만든다."""
+    rank = np.argsort(counts, kind="stable")
+    rank = rank[counts[rank] > 0]
+    pos = 0
+    while pos < len(rank):
+        window = counts[rank[pos:pos + budget]]
+        fits = np.arange(1, len(window) + 1) * window <= budget
+        size = max(1, int(np.count_nonzero(fits)))
+        yield rank[pos:pos + size]
+        pos += size
+
+
+def _als_solve(
+    groups: Tuple[np.ndarray, np.ndarray],
+    other_index: np.ndarray,
+    other_aug: np.ndarray,
+    target: np.ndarray,
+    reg: float,
+) -> np.ndarray:
+    """모든 행에 대해 (X^T X + reg * n I) w = X^T y 를 패딩 배치 행렬곱 + 배치 solve로 푼다."""
+    order, indptr = groups
+    n = len(indptr) - 1
+    k = other_aug.shape[1]
+    out = np.zeros((n, k), dtype=np.float64)
+    eye = np.eye(k)
+    counts = np.diff(indptr)
+    for rows in _length_blocks(counts, ALS_BLOCK_ROWS):
+        lengths = counts[rows]
+        offsets = np.arange(int(lengths.max()))
+        mask = offsets[None, :] < lengths[:, None]
+        pos = np.where(mask, indptr[rows][:, None] + offsets[None, :], 0)
+        idx = order[pos]
+        x = other_aug[other_index[idx]] * mask[:, :, None]
+        y = target[idx] * mask
+        gram = np.matmul(x.transpose(0, 2, 1), x)
+        rhs = np.einsum("gmk,gm->gk", x, y)
+        # ALS-WR: 평점 수에 비례하는 정규화
+        ridge = (reg * lengths)[:, None, None] * eye
+        out[rows] = np.linalg.solve(gram + ridge, rhs[:, :, None])[:, :, 0]
+    return out
+
+
+def train_als(
+    ratings: Ratings,
+    factors: int,
+    epochs: int,
+    lr: float,
+    reg: float,
+    seed: int,
+    center_user: bool,
+    patience: int = 3,
+) -> Dict:
+    """편향 포함 ALS. 한쪽을 고정하고 다른 쪽 [벡터, 편향]을 릿지 회귀로 한 번에 푼다.
+
+    lr은 쓰지 않으며(인터페이스 통일용), reg는 평점 수에 비례해 스케일된다.
+    """
+    del lr
+    rng, user_ids, item_ids, split, user_mean = _prepare(ratings, seed, center_user)
+    num_users, num_items = len(user_ids), len(item_ids)
+    tu, ti, tr = split["train"]
+    targets = tr - user_mean[tu] if center_user else tr
+
+    global_mean = float(targets.mean()) if len(targets) else 0.0
+    user_bias = np.zeros(num_users, dtype=np.float64)
+    item_bias = np.zeros(num_items, dtype=np.float64)
+    user_factors = rng.normal(0, 0.1, size=(num_users, factors)).astype(np.float64)
+    item_factors = rng.normal(0, 0.1, size=(num_items, factors)).astype(np.float64)
+
+    user_groups = _groups(tu, num_users)
+    item_groups = _groups(ti, num_items)
+    ones_u = np.ones((num_users, 1))
+    ones_i = np.ones((num_items, 1))
+
+    best_rmse = float("inf")
+    best_state = None
+    patience_left = patience
+
+    for _ in range(epochs):
+        item_aug = np.hstack([item_factors, ones_i])
+        solved = _als_solve(user_groups, ti, item_aug, targets - global_mean - item_bias[ti], reg)
+        user_factors, user_bias = solved[:, :factors], solved[:, factors]
+
+        user_aug = np.hstack([user_factors, ones_u])
+        solved = _als_solve(item_groups, tu, user_aug, targets - global_mean - user_bias[tu], reg)
+        item_factors, item_bias = solved[:, :factors], solved[:, factors]
+
+        rmse = _val_rmse(
+            split["val"], user_mean, global_mean, user_bias, item_bias, user_factors, item_factors, center_user
+        )
+        if rmse + 1e-5 < best_rmse:
+            best_rmse = rmse
+            best_state = (user_factors.copy(), item_factors.copy(), user_bias.copy(), item_bias.copy())
+            patience_left = patience
+        else:
+            patience_left -= 1
+            if patience_left <= 0:
+                break
+
+    state = best_state or (user_factors, item_factors, user_bias, item_bias)
+    return _result(
+        user_ids, item_ids, user_mean, center_user,
+        best_rmse if best_state is not None else 0.0, state, global_mean,
+    )
+
+
+def _ials_alpha() -> float:
+    """신뢰도 c = 1 + alpha * 강도."""
+    try:
+        return max(0.0, float(os.getenv("MF_IALS_ALPHA", "10.0")))
+    except ValueError:
+        return 10.0
+
+
+def _ials_reg() -> float:
+    """암시적 ALS 정규화(신뢰도 합이 이미 상호작용 수를 반영하므로 평점 수로 스케일하지 않음)."""
+    try:
+        return max(1e-6, float(os.getenv("MF_IALS_REG", "0.1")))
+    except ValueError:
+        return 0.1
+
+
+def _ials_cg_steps() -> int:
+    """에폭마다 한쪽 행렬을 풀 때 쓰는 켤레 기울기 반복 수(이전 해에서 이어서 시작)."""
+    try:
+        return max(1, int(os.getenv("MF_IALS_CG_STEPS", "3")))
+    except ValueError:
+        return 3
+
+
+def _ials_solve(
+    groups: Tuple[np.ndarray, np.ndarray],
+    other_index: np.ndarray,
+    confidence: np.ndarray,
+    fixed: np.ndarray,
+    current: np.ndarray,
+    reg: float,
+    steps: int,
+) -> np.ndarray:
+    """모든 행에 대해 (Y^T C_u Y + reg I) x_u = Y^T C_u 1 을 켤레 기울기로 푼다.
+
+    Y^T C_u Y = Y^T Y + Y_u^T (C_u - I) Y_u 이므로 공통 k x k 그람 행렬 하나와 상호작용한 행만으로
+    행렬-벡터 곱을 계산한다(행마다 k x k 행렬을 만들지 않음). 상호작용 행은 _als_solve처럼 길이가 비슷한
+    행끼리 패딩 블록으로 한 번 모아 두고 CG 반복마다 배치 행렬곱 두 번으로 쓴다.
+    """
+    order, indptr = groups
+    k = fixed.shape[1]
+    gram = fixed.T @ fixed + reg * np.eye(k)
+    out = current.copy()
+    counts = np.diff(indptr)
+    for rows in _length_blocks(counts, IALS_BLOCK_NNZ):
+        lengths = counts[rows]
+        offsets = np.arange(int(lengths.max()))
+        mask = offsets[None, :] < lengths[:, None]
+        idx = order[np.where(mask, indptr[rows][:, None] + offsets[None, :], 0)]
+        y = fixed[other_index[idx]] * mask[:, :, None]
+        conf = confidence[idx] * mask
+
+        def _apply(v: np.ndarray) -> np.ndarray:
+            dots = np.matmul(y, v[:, :, None])[:, :, 0] * (conf - mask)
+            return v @ gram + np.matmul(dots[:, None, :], y)[:, 0, :]
+
+        x = out[rows]
+        residual = np.matmul(conf[:, None, :], y)[:, 0, :] - _apply(x)
+        direction = residual.copy()
+        rs = np.einsum("ij,ij->i", residual, residual)
+        for _ in range(steps):
+            if rs.max(initial=0.0) < 1e-10:
+                break
+            ad = _apply(direction)
+            step = rs / np.maximum(np.einsum("ij,ij->i", direction, ad), 1e-12)
+            x = x + step[:, None] * direction
+            residual = residual - step[:, None] * ad
+            rs_next = np.einsum("ij,ij->i", residual, residual)
+            direction = residual + (rs_next / np.maximum(rs, 1e-12))[:, None] * direction
+            rs = rs_next
+        out[rows] = x
+    # 상호작용이 없는 행의 해는 0(Y^T C_u 1 = 0)
+    out[counts == 0] = 0.0
+    return out
+
+
+def _val_auc(val, user_factors, item_factors, rng) -> float:
+    """검증 양성이 무작위 상품보다 높게 점수 매겨지는 비율(표본 AUC)."""
+    u, i, _ = val
+    if not len(u):
+        return 0.0
+    pos = np.einsum("ij,ij->i", user_factors[u], item_factors[i])
+    wins = 0.0
+    for _ in range(IALS_VAL_NEGATIVES):
+        neg_items = rng.integers(0, len(item_factors), size=len(u))
+        neg = np.einsum("ij,ij->i", user_factors[u], item_factors[neg_items])
+        wins += float(np.mean(pos > neg)) + 0.5 * float(np.mean(pos == neg))
+    return wins / IALS_VAL_NEGATIVES
+
+
+def train_implicit_als(
+    ratings: Ratings,
+    factors: int,
+    epochs: int,
+    lr: float,
+    reg: float,
+    seed: int,
+    center_user: bool,
+    patience: int = 3,
+) -> Dict:
+    """암시적 피드백 ALS(Hu, Koren, Volinsky). 상호작용한 쌍은 선호 1, 나머지는 모두 선호 0으로 보고
+    신뢰도 1 + alpha * 강도로 가중한 제곱 오차를 번갈아 푼다. 한 에폭은 행렬곱 몇 번 수준이다.
+
+    lr/center_user는 쓰지 않으며(인터페이스 통일용), 편향 없이 내적만 점수로 쓴다.
+    조기 종료는 검증 양성의 표본 AUC로 하고, 결과의 rmse는 검증 양성 선호(1)에 대한 RMSE다.
+    """
+    del lr, center_user
+    rng, user_ids, item_ids, split, _ = _prepare(ratings, seed, False)
+    num_users, num_items = len(user_ids), len(item_ids)
+    tu, ti, tr = split["train"]
+    confidence = 1.0 + _ials_alpha() * np.maximum(tr, 0.0)
+    steps = _ials_cg_steps()
+
+    by_user = (_groups(tu, num_users), ti, confidence)
+    by_item = (_groups(ti, num_items), tu, confidence)
+
+    user_factors = rng.normal(0, 0.01, size=(num_users, factors)).astype(np.float64)
+    item_factors = rng.normal(0, 0.01, size=(num_items, factors)).astype(np.float64)
+    val_rng = np.random.default_rng(seed + 1)
+
+    best_auc = -1.0
+    best_state = None
+    patience_left = patience
+
+    for _ in range(epochs):
+        user_factors = _ials_solve(*by_user, item_factors, user_factors, reg, steps)
+        item_factors = _ials_solve(*by_item, user_factors, item_factors, reg, steps)
+
+        auc = _val_auc(split["val"], user_factors, item_factors, val_rng)
+        if auc > best_auc + 1e-5:
+            best_auc = auc
+            best_state = (user_factors.copy(), item_factors.copy())
+            patience_left = patience
+        else:
+            patience_left -= 1
+            if patience_left <= 0:
+                break
+
+    user_factors, item_factors = best_state or (user_factors, item_factors)
+    vu, vi, _ = split["val"]
+    rmse = 0.0
+    if len(vu):
+        pred = np.einsum("ij,ij->i", user_factors[vu], item_factors[vi])
+        rmse = float(np.sqrt(np.mean((1.0 - pred) ** 2)))
+    state = (user_factors, item_factors, np.zeros(num_users), np.zeros(num_items))
+    result = _result(user_ids, item_ids, np.zeros(num_users), False, rmse, state, 0.0)
+    result.update({"implicit": True, "implicit_alpha": _ials_alpha(), "val_auc": max(best_auc, 0.0)})
+    return result
+
+
+ENGINES = {
+    "minibatch": train_minibatch_sgd,
+    "als": train_als,
+    "ials": train_implicit_als,
+}
+
+# 값을 평점이 아니라 상호작용 신뢰도로 받는 엔진
+IMPLICIT_ENGINES = frozenset({"ials"})
+
+
+def is_implicit(name: Optional[str]) -> bool:
+    return (name or "sgd").lower() in IMPLICIT_ENGINES
+
+
+def available_engines() -> Sequence[str]:
+    return ("sgd",) + tuple(ENGINES)
+
+
+def get_engine(name: Optional[str]):
+    """엔진 이름 -> 학습 함수(sgd는 None: 기존 mf_services 구현 사용)."""
+    key = (name or "sgd").lower()
+    if key == "sgd":
+        return None
+    if key not in ENGINES:
+        raise ValueError(f"Unknown MF engine: {name} (available: {', '.join(available_engines())})")
+    return ENGINES[key]
@@ -0,0 +1,27 @@
+"""회원 상호작용(주문/위시/리뷰) 발생 시 MF 관련 후처리를 한 곳에서 호출."""
+import logging
+
+from . import mf_cache, mf_interactions, mf_online, mf_precompute, mf_recommend_view, mf_services, mf_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+def record_interaction(member_id: int, reason: str = "") -> None:
+    """커밋 이후 호출: 재학습 예약 + 상호작용 목록/회원 벡터 즉시 갱신(fold-in) + 미리 계산된 추천/캐시 무효화."""
+    # 재학습이 스냅샷을 갱신할 때 이 회원을 다시 집계(위시 해제 같은 삭제는 워터마크로 잡히지 않음)
+    mf_snapshot.mark_dirty(int(member_id))
+    mf_services.trigger_retrain(reason=reason)
+    if reason.startswith("review"):
+        # 구체화된 recommend_view는 리뷰 쓰기를 모아 한 번에 갱신
+        mf_recommend_view.request_refresh(reason)
+    try:
+        mf_interactions.refresh_member(int(member_id))
+    except Exception as exc:
+        logger.warning("MF interaction refresh failed member_id=%s reason=%s: %s", member_id, reason, exc)
+    try:
+        mf_online.refresh_member(int(member_id))
+    except Exception as exc:
+        logger.warning("MF online refresh failed member_id=%s reason=%s: %s", member_id, reason, exc)
+    mf_precompute.invalidate_member(int(member_id))
+    # 벡터 갱신 뒤에 무효화해야 갱신 전 벡터로 계산한 결과가 새 세대로 캐시되지 않는다
+    mf_cache.invalidate_member(int(member_id))
@@ -1,10 +1,25 @@
+"""MF 실험 도구.
+
+- coverage: 현재 데이터로 학습 후 추천 분포(커버리지/상위 N 점유율/회원 간 Jaccard) 출력
+- bench: 시간 기준 홀드아웃으로 엔진/설정별 recall@K, NDCG@K, MAP@K와 학습 시간,
+  초당 평점 처리량, 추천 지연(p50/p95), 최대 메모리를 측정해 JSON/CSV 리포트로 저장
+- compare: 두 bench 리포트(커밋 간)의 지표 차이 출력
+"""
+import csv
+import itertools
+import json
 import os
 import random
 import subprocess
 import sys
+import time
 from collections import Counter
+from datetime import datetime
 from pathlib import Path
 from statistics import pstdev
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
 
 
 ROOT = Path(__file__).resolve().parents[3]
@@ -15,11 +30,7 @@ if str(APP_DIR) not in sys.path:
 
 import database
 import models
-from mf_services import mf_recommend
-
-
-def _run(cmd):
-    subprocess.run(cmd, check=True)
+from mf_services import mf_engines, mf_quant, mf_recommend, mf_services
 
 
 def _load_member_ids(session):
@@ -64,13 +75,7 @@ def _collect_recommendations(session, member_ids, rec_limit, seed):
     if member_limit > 0 and len(member_ids) > member_limit:
         member_ids = rng.sample(member_ids, member_limit)
 
-    for member_id in member_ids:
-        recs, _ = mf_recommend.recommend_for_member_with_score(
-            session,
-            member_id,
-            limit=rec_limit,
-            debug=False,
-        )
+    for member_id, recs in mf_recommend.recommend_for_members(session, member_ids, limit=rec_limit):
         if not recs:
             continue
         for prod, _, _, score in recs:
@@ -128,10 +133,498 @@ def _compute_metrics(user_items, user_scores, item_counts, total_rows, seed):
     }
 
 
-def main():
+# 평점 쌍(회원, 상품)이 처음 생긴 시각. 평점 값은 학습과 같은 mf_services._load_ratings_from_db를 쓴다
+_FIRST_SEEN_SQL = """
+SELECT member_id, product_id, CAST(EXTRACT(EPOCH FROM MIN(ts)) AS DOUBLE PRECISION)
+FROM (
+    SELECT member_id, product_id, COALESCE(created_at, updated_at) AS ts
+    FROM product_review WHERE member_id IS NOT NULL AND product_id IS NOT NULL
+    UNION ALL
+    SELECT member_id, product_id, created_at FROM wishlist
+    WHERE member_id IS NOT NULL AND product_id IS NOT NULL
+    UNION ALL
+    SELECT o.member_id, d.product_id, o.created_at
+    FROM "order" o JOIN order_detail d ON d.order_id = o.id
+    WHERE o.member_id IS NOT NULL AND d.product_id IS NOT NULL
+) interactions
+GROUP BY member_id, product_id
+"""
+
+METRIC_KEYS = ("recall", "ndcg", "map", "coverage")
+
+
+def _load_dataset() -> Dict[str, np.ndarray]:
+    """학습용 평점/신뢰도 배열 + 쌍별 최초 상호작용 시각(없으면 0)."""
+    users, items, values, confidence = mf_services._load_interactions_from_db()
+    seen = mf_services.fetch_array(_FIRST_SEEN_SQL, {}, columns=3, dtype=np.float64)
+    ts = np.zeros(len(values), dtype=np.float64)
+    if len(seen) and len(values):
+        # 두 쿼리 사이에 쓰기가 있어도 되도록 (회원, 상품) 키로 맞춘다
+        width = int(max(items.max(), seen[:, 1].max())) + 1
+        keys = users * width + items
+        seen_keys = seen[:, 0].astype(np.int64) * width + seen[:, 1].astype(np.int64)
+        order = np.argsort(seen_keys)
+        pos = np.minimum(np.searchsorted(seen_keys[order], keys), len(order) - 1)
+        found = seen_keys[order][pos] == keys
+        ts[found] = np.nan_to_num(seen[order[pos[found]], 2])
+    return {"users": users, "items": items, "values": values, "confidence": confidence, "ts": ts}
+
+
+def _split(data: Dict[str, np.ndarray], holdout: float, mode: str, seed: int) -> np.ndarray:
+    """평가용(True) 마스크. time: 최초 상호작용이 가장 늦은 holdout 비율, random: 무작위 holdout 비율."""
+    n = len(data["values"])
+    rng = np.random.default_rng(seed)
+    test_size = int(round(n * holdout))
+    if mode == "random":
+        order = rng.permutation(n)
+    else:
+        # 같은 시각(일괄 적재)은 시드 고정 무작위로 순서를 정함
+        order = np.lexsort((rng.permutation(n), data["ts"]))
+    mask = np.zeros(n, dtype=bool)
+    if test_size > 0:
+        mask[order[n - test_size:]] = True
+    return mask
+
+
+class _PeakMemory:
+    """구간 최대 RSS 증가량(MB). /proc/self/clear_refs로 최고치를 초기화할 수 있는 리눅스에서만 측정.
+
+    tracemalloc은 파이썬 루프 학습(sgd)을 수십 배 느리게 해 학습 시간 측정과 함께 쓸 수 없다.
+    """
+
+    def __init__(self):
+        self.peak_mb: Optional[float] = None
+        self._baseline_kb: Optional[int] = None
+
+    @staticmethod
+    def _status_kb(field: str) -> int:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+        raise OSError(field)
+
+    def __enter__(self):
+        try:
+            with open("/proc/self/clear_refs", "w") as f:
+                f.write("5")
+            self._baseline_kb = self._status_kb("VmRSS")
+        except OSError:
+            self._baseline_kb = None
+        return self
+
+    def __exit__(self, *exc):
+        if self._baseline_kb is not None:
+            try:
+                self.peak_mb = max(0, self._status_kb("VmHWM") - self._baseline_kb) / 1024.0
+            except OSError:
+                self.peak_mb = None
+        return False
+
+
+def _default_reg(engine: str) -> float:
+    return mf_services._engine_reg(engine, float(os.getenv("MF_REG", "0.02")))
+
+
+def _train_arrays(engine: str, data: Dict[str, np.ndarray], mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """mask 행의 학습 배열. 암시적 엔진은 의사 평점 대신 신뢰도 강도를 받는다."""
+    values = data["confidence"] if mf_engines.is_implicit(engine) and "confidence" in data else data["values"]
+    return data["users"][mask], data["items"][mask], values[mask]
+
+
+def _train(engine: str, ratings: Tuple[np.ndarray, np.ndarray, np.ndarray], config: Dict[str, Any]) -> Dict:
+    train_fn = mf_engines.get_engine(engine)
+    args = (config["factors"], config["epochs"], config["lr"], config["reg"], config["seed"], config["center_user"])
+    # 검증 RMSE가 patience 에폭 연속 나빠지면 조기 종료(엔진 공통)
+    patience = int(config.get("patience", 3))
+    if train_fn is None:
+        users, items, values = ratings
+        return mf_services._train_biased_mf(
+            list(zip(users.tolist(), items.tolist(), values.tolist())), *args, patience=patience
+        )
+    return train_fn(ratings, *args, patience=patience)
+
+
+def _csr(rows: np.ndarray, cols: np.ndarray, num_rows: int) -> Tuple[np.ndarray, np.ndarray]:
+    order = np.argsort(rows, kind="stable")
+    indptr = np.zeros(num_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=num_rows), out=indptr[1:])
+    return indptr, cols[order]
+
+
+def _eval_sets(model: Dict, data: Dict[str, np.ndarray], test_mask: np.ndarray) -> Dict[str, Any]:
+    """평가 대상(학습에 있고 홀드아웃이 있는 회원)의 학습/정답 아이템 위치 CSR."""
+    user_ids = np.asarray(model["user_ids"], dtype=np.int64)
+    test_users = np.unique(data["users"][test_mask])
+    pos = np.minimum(np.searchsorted(user_ids, test_users), max(len(user_ids) - 1, 0))
+    in_model = user_ids[pos] == test_users if len(user_ids) else np.zeros(len(test_users), dtype=bool)
+    eval_members = test_users[in_model]
+    eval_rows = pos[in_model]
+
+    def _rows_for(mask):
+        member_rows = np.searchsorted(eval_members, data["users"][mask])
+        member_rows = np.minimum(member_rows, max(len(eval_members) - 1, 0))
+        keep = eval_members[member_rows] == data["users"][mask] if len(eval_members) else np.zeros(int(mask.sum()), dtype=bool)
+        positions, known = mf_services.item_positions(model, data["items"][mask])
+        return member_rows[keep], positions[keep], known[keep]
+
+    train_rows, train_pos, train_known = _rows_for(~test_mask)
+    train_indptr, train_cols = _csr(train_rows[train_known], train_pos[train_known], len(eval_members))
+    test_rows, test_pos, test_known = _rows_for(test_mask)
+    # 학습에 없던 상품은 추천될 수 없지만 정답 수(분모)에는 포함
+    test_counts = np.bincount(test_rows, minlength=len(eval_members))
+    test_indptr, test_cols = _csr(test_rows[test_known], test_pos[test_known], len(eval_members))
+    return {
+        "members": eval_members,
+        "model_rows": eval_rows,
+        "train": (train_indptr, train_cols),
+        "test": (test_indptr, test_cols),
+        "test_counts": test_counts,
+        "skipped_users": int(len(test_users) - len(eval_members)),
+    }
+
+
+def _user_offsets(model: Dict, rows: np.ndarray) -> np.ndarray:
+    offsets = np.asarray(model["user_bias"][rows], dtype=np.float64)
+    if model.get("center_user") and model.get("user_mean") is not None:
+        offsets = offsets + np.asarray(model["user_mean"][rows], dtype=np.float64)
+    return offsets
+
+
+def _top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """행별 점수 내림차순 상위 k개 열 위치."""
+    k = min(k, scores.shape[1])
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1)
+
+
+def _chunk_top(model: Dict, sets: Dict[str, Any], start: int, end: int, k: int) -> np.ndarray:
+    """평가 회원 [start, end)의 학습 상호작용 제외 상위 k개 아이템 위치."""
+    train_indptr, train_cols = sets["train"]
+    rows = sets["model_rows"][start:end]
+    scores = mf_services.score_matrix(
+        model, mf_quant.rows(model, "user_factors", rows), _user_offsets(model, rows)
+    )
+    lo, hi = train_indptr[start], train_indptr[end]
+    local = np.repeat(np.arange(end - start), np.diff(train_indptr[start:end + 1]))
+    scores[local, train_cols[lo:hi]] = -np.inf
+    return _top_k_rows(scores, k)
+
+
+def _ranking_metrics(model: Dict, sets: Dict[str, Any], ks: Sequence[int], chunk: int = 256) -> Dict[str, float]:
+    """학습 상호작용을 제외한 전체 아이템 순위로 recall/NDCG/MAP@K와 아이템 커버리지 계산(회원 평균)."""
+    num_items = len(model["item_ids"])
+    num_users = len(sets["members"])
+    kmax = min(max(ks), num_items)
+    sums = {f"{name}@{k}": 0.0 for k in ks for name in METRIC_KEYS if name != "coverage"}
+    recommended = {k: np.zeros(num_items, dtype=bool) for k in ks}
+    discounts = 1.0 / np.log2(np.arange(kmax) + 2.0)
+    test_indptr, test_cols = sets["test"]
+
+    for start in range(0, num_users, chunk):
+        end = min(start + chunk, num_users)
+        top = _chunk_top(model, sets, start, end, kmax)
+
+        lo, hi = test_indptr[start], test_indptr[end]
+        local = np.repeat(np.arange(end - start), np.diff(test_indptr[start:end + 1]))
+        truth = np.sort(local * num_items + test_cols[lo:hi])
+        hits = np.isin(np.arange(end - start)[:, None] * num_items + top, truth)
+        counts = sets["test_counts"][start:end].astype(np.float64)
+
+        cum_hits = np.cumsum(hits, axis=1)
+        precision_at = cum_hits / np.arange(1, kmax + 1)
+        for k in ks:
+            kk = min(k, kmax)
+            h = hits[:, :kk]
+            ideal = np.cumsum(discounts)[np.minimum(counts, kk).astype(np.int64) - 1]
+            sums[f"recall@{k}"] += float((h.sum(axis=1) / counts).sum())
+            sums[f"ndcg@{k}"] += float(((h * discounts[:kk]).sum(axis=1) / ideal).sum())
+            sums[f"map@{k}"] += float(((precision_at[:, :kk] * h).sum(axis=1) / np.minimum(counts, kk)).sum())
+            recommended[k][np.unique(top[:, :kk])] = True
+
+    metrics = {key: (value / num_users if num_users else 0.0) for key, value in sums.items()}
+    for k in ks:
+        metrics[f"coverage@{k}"] = float(recommended[k].mean()) if num_items else 0.0
+    return metrics
+
+
+def _latency(model: Dict, sets: Dict[str, Any], k: int, samples: int, seed: int) -> Dict[str, float]:
+    """회원 한 명 추천(점수 계산 -> 학습 상호작용 제외 -> 상위 k 정렬) 지연(ms)."""
+    num_users = len(sets["members"])
+    if not num_users or samples <= 0:
+        return {"latency_p50_ms": 0.0, "latency_p95_ms": 0.0}
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(num_users, size=min(samples, num_users), replace=False)
+    train_indptr, train_cols = sets["train"]
+    timings: List[float] = []
+    for idx in picks:
+        row = sets["model_rows"][idx]
+        started = time.perf_counter()
+        scores = mf_services.score_vector(
+            model, mf_quant.rows(model, "user_factors", row), float(_user_offsets(model, np.array([row]))[0])
+        )
+        scores[train_cols[train_indptr[idx]:train_indptr[idx + 1]]] = -np.inf
+        _top_k_rows(scores[None, :], k)
+        timings.append((time.perf_counter() - started) * 1000.0)
+    return {
+        "latency_p50_ms": float(np.percentile(timings, 50)),
+        "latency_p95_ms": float(np.percentile(timings, 95)),
+    }
+
+
+def _top_lists(model: Dict, sets: Dict[str, Any], k: int, chunk: int = 256) -> np.ndarray:
+    """평가 회원 전체의 상위 k개 아이템 위치((회원 수 x k))."""
+    num_users = len(sets["members"])
+    k = min(k, len(model["item_ids"]))
+    if not num_users:
+        return np.zeros((0, k), dtype=np.int64)
+    return np.vstack([
+        _chunk_top(model, sets, start, min(start + chunk, num_users), k) for start in range(0, num_users, chunk)
+    ])
+
+
+def run_quant_benchmark(
+    config: Dict[str, Any],
+    dtypes: Sequence[str] = mf_quant.FACTOR_DTYPES,
+    ks: Sequence[int] = (10, 20),
+    holdout: float = 0.2,
+    split: str = "time",
+    seed: int = 42,
+    latency_samples: int = 200,
+    data: Optional[Dict[str, np.ndarray]] = None,
+) -> Dict[str, Any]:
+    """한 번 학습한 모델을 저장 형식별로 양자화해 요인 메모리, 점수 지연, float32 대비 순위 지표 변화 비교."""
+    data = data if data is not None else _load_dataset()
+    test_mask = _split(data, holdout, split, seed)
+    model = _train(config["engine"], _train_arrays(config["engine"], data, ~test_mask), config)
+    sets = _eval_sets(model, data, test_mask)
+    kmax = max(ks)
+    # 변화량 기준이 되도록 float32를 먼저
+    dtypes = ["float32"] + [d for d in dtypes if d != "float32"]
+
+    results: List[Dict[str, Any]] = []
+    baseline: Optional[Dict[str, Any]] = None
+    baseline_top: Optional[np.ndarray] = None
+    for dtype in dtypes:
+        quantized = mf_quant.quantize_result(model, dtype)
+        row: Dict[str, Any] = {**config, "factor_dtype": dtype}
+        row["factor_mb"] = mf_quant.factor_bytes(quantized) / (1024.0 * 1024.0)
+        started = time.perf_counter()
+        row.update(_ranking_metrics(quantized, sets, ks))
+        row["eval_sec"] = time.perf_counter() - started
+        row.update(_latency(quantized, sets, kmax, latency_samples, seed))
+
+        top = _top_lists(quantized, sets, kmax)
+        if baseline is None:
+            baseline, baseline_top = row, top
+        row["memory_ratio"] = row["factor_mb"] / baseline["factor_mb"] if baseline["factor_mb"] else 0.0
+        overlap = (top[:, :, None] == baseline_top[:, None, :]).any(axis=2).sum(axis=1) if len(top) else np.zeros(0)
+        row[f"top{kmax}_overlap"] = float(overlap.mean() / top.shape[1]) if len(top) else 1.0
+        for key in [f"{name}@{k}" for k in ks for name in METRIC_KEYS]:
+            row[f"{key}_drift"] = row[key] - baseline[key]
+        results.append(row)
+        print(
+            f"factor_dtype={dtype}",
+            f"factor_mb={row['factor_mb']:.2f}",
+            f"memory_ratio={row['memory_ratio']:.2f}",
+            f"p50_ms={row['latency_p50_ms']:.3f}",
+            f"p95_ms={row['latency_p95_ms']:.3f}",
+            f"eval_sec={row['eval_sec']:.2f}",
+            f"ndcg@{kmax}={row[f'ndcg@{kmax}']:.4f}",
+            f"ndcg@{kmax}_drift={row[f'ndcg@{kmax}_drift']:+.4f}",
+            f"top{kmax}_overlap={row[f'top{kmax}_overlap']:.4f}",
+            flush=True,
+        )
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "split": split,
+            "holdout": holdout,
+            "seed": seed,
+            "ks": list(ks),
+            "pairs": int(len(data["values"])),
+            "num_users": int(len(model["user_ids"])),
+            "num_items": int(len(model["item_ids"])),
+            "eval_users": int(len(sets["members"])),
+        },
+        "results": results,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=str(APP_DIR), capture_output=True, text=True, check=True
+        )
+        return out.stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(
+    configs: List[Dict[str, Any]],
+    ks: Sequence[int] = (10, 20),
+    holdout: float = 0.2,
+    split: str = "time",
+    seed: int = 42,
+    latency_samples: int = 200,
+    data: Optional[Dict[str, np.ndarray]] = None,
+) -> Dict[str, Any]:
+    """설정마다 학습 -> 홀드아웃 순위 평가 -> 지연 측정. 리포트 dict 반환."""
+    data = data if data is not None else _load_dataset()
+    test_mask = _split(data, holdout, split, seed)
+    results: List[Dict[str, Any]] = []
+
+    for config in configs:
+        row: Dict[str, Any] = dict(config)
+        train = _train_arrays(config["engine"], data, ~test_mask)
+        with _PeakMemory() as train_mem:
+            started = time.perf_counter()
+            model = _train(config["engine"], train, config)
+            train_sec = time.perf_counter() - started
+        row.update({
+            "train_sec": train_sec,
+            "ratings_per_sec": len(train[0]) / train_sec if train_sec > 0 else 0.0,
+            "train_peak_mb": train_mem.peak_mb,
+            "val_rmse": float(model.get("rmse", 0.0)),
+        })
+
+        with _PeakMemory() as eval_mem:
+            sets = _eval_sets(model, data, test_mask)
+            started = time.perf_counter()
+            row.update(_ranking_metrics(model, sets, ks))
+            row["eval_sec"] = time.perf_counter() - started
+        row.update(_latency(model, sets, max(ks), latency_samples, seed))
+        row.update({
+            "eval_peak_mb": eval_mem.peak_mb,
+            "eval_users": int(len(sets["members"])),
+            "skipped_users": sets["skipped_users"],
+        })
+        results.append(row)
+        print(_format_row(row, ks), flush=True)
+
+    cutoff = float(data["ts"][test_mask].min()) if test_mask.any() else None
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "split": split,
+            "holdout": holdout,
+            "seed": seed,
+            "ks": list(ks),
+            "pairs": int(len(data["values"])),
+            "train_pairs": int((~test_mask).sum()),
+            "test_pairs": int(test_mask.sum()),
+            "users": int(len(np.unique(data["users"]))),
+            "items": int(len(np.unique(data["items"]))),
+            "test_cutoff_ts": cutoff if split == "time" else None,
+        },
+        "results": results,
+    }
+
+
+def _format_row(row: Dict[str, Any], ks: Sequence[int]) -> str:
+    parts = [
+        f"engine={row['engine']}",
+        f"factors={row['factors']}",
+        f"epochs={row['epochs']}",
+        f"lr={row['lr']}",
+        f"reg={row['reg']}",
+    ]
+    for k in ks:
+        parts.extend(f"{name}@{k}={row[f'{name}@{k}']:.4f}" for name in METRIC_KEYS)
+    parts.extend([
+        f"train_sec={row['train_sec']:.2f}",
+        f"ratings_per_sec={row['ratings_per_sec']:.0f}",
+        f"p50_ms={row['latency_p50_ms']:.3f}",
+        f"p95_ms={row['latency_p95_ms']:.3f}",
+        f"train_peak_mb={row['train_peak_mb']:.1f}" if row["train_peak_mb"] is not None else "train_peak_mb=n/a",
+    ])
+    return " ".join(parts)
+
+
+def write_report(report: Dict[str, Any], path: str):
+    """확장자에 따라 JSON(메타 포함) 또는 CSV(설정당 한 행, 커밋/분할 정보 열 포함)로 저장."""
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if target.suffix.lower() == ".csv":
+        meta = report["meta"]
+        rows = [{"commit": meta["commit"], "split": meta["split"], "holdout": meta["holdout"], **r} for r in report["results"]]
+        fields = list(dict.fromkeys(key for r in rows for key in r))
+        with open(target, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(target, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+CONFIG_KEYS = ("engine", "factors", "epochs", "lr", "reg", "center_user", "seed")
+
+
+def _config_key(row: Dict[str, Any]) -> Tuple:
+    return tuple(row.get(key) for key in CONFIG_KEYS)
+
+
+def compare_reports(base_path: str, new_path: str) -> List[Dict[str, Any]]:
+    """같은 설정끼리 두 JSON 리포트의 지표 차이(new - base)."""
+    with open(base_path, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    with open(new_path, "r", encoding="utf-8") as f:
+        new = json.load(f)
+    base_rows = {_config_key(r): r for r in base["results"]}
+    diffs = []
+    for row in new["results"]:
+        old = base_rows.get(_config_key(row))
+        if old is None:
+            continue
+        diff = {key: row.get(key) for key in CONFIG_KEYS}
+        for key, value in row.items():
+            if key in CONFIG_KEYS or not isinstance(value, (int, float)) or isinstance(value, bool):
+                continue
+            if isinstance(old.get(key), (int, float)):
+                diff[key] = value - old[key]
+        diffs.append(diff)
+    return diffs
+
+
+def _float_list(raw: str) -> List[float]:
+    return [float(v) for v in raw.split(",") if v.strip()]
+
+
+def _int_list(raw: str) -> List[int]:
+    return [int(v) for v in raw.split(",") if v.strip()]
+
+
+def _bench_configs(args) -> List[Dict[str, Any]]:
+    engines = [e.strip().lower() for e in args.engines.split(",") if e.strip()]
+    configs = []
+    for engine, factors, epochs, lr in itertools.product(
+        engines, _int_list(args.factors), _int_list(args.epochs), _float_list(args.lr)
+    ):
+        regs = _float_list(args.reg) if args.reg else [_default_reg(engine)]
+        for reg in regs:
+            configs.append({
+                "engine": engine,
+                "factors": factors,
+                "epochs": epochs,
+                "lr": lr,
+                "reg": reg,
+                "seed": args.seed,
+                "center_user": args.center_user,
+            })
+    return configs
+
+
+def run_coverage():
+    """현재 데이터로 학습(같은 프로세스) 후 추천 분포 지표 출력."""
     seed = int(os.getenv("REC_SEED", os.getenv("MF_SEED", "42")))
 
-    _run([sys.executable, "-m", "mf_services.mf_services", "train"])
+    mf_services._train_from_source()
     rec_limit = int(os.getenv("MF_EXPERIMENT_REC_LIMIT", "20"))
     with database.SessionLocal() as session:
         member_ids = _load_member_ids(session)
@@ -162,5 +655,71 @@ def main():
     )
 
 
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", nargs="?", default="coverage", choices=["coverage", "bench", "compare", "quant"])
+    parser.add_argument("--engines", default=",".join(mf_engines.available_engines()))
+    parser.add_argument("--factors", default=os.getenv("MF_FACTORS", "24"))
+    parser.add_argument("--epochs", default=os.getenv("MF_EPOCHS", "60"))
+    parser.add_argument("--lr", default=os.getenv("MF_LR", "0.01"))
+    parser.add_argument("--reg", default=None, help="쉼표 구분. 없으면 엔진별 기본값(MF_REG/MF_ALS_REG)")
+    parser.add_argument("--center-user", action="store_true")
+    parser.add_argument("--k", default="10,20")
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--split", choices=["time", "random"], default="time")
+    parser.add_argument("--seed", type=int, default=int(os.getenv("MF_SEED", "42")))
+    parser.add_argument("--latency-samples", type=int, default=200)
+    parser.add_argument("--dtypes", default=",".join(mf_quant.FACTOR_DTYPES), help="quant: 비교할 요인 저장 형식")
+    parser.add_argument("--out", default=None, help="리포트 경로(.json/.csv)")
+    parser.add_argument("reports", nargs="*", help="compare: 기준 리포트, 새 리포트")
+    args = parser.parse_args()
+
+    if args.command == "coverage":
+        run_coverage()
+    elif args.command == "bench":
+        report = run_benchmark(
+            _bench_configs(args),
+            ks=_int_list(args.k),
+            holdout=args.holdout,
+            split=args.split,
+            seed=args.seed,
+            latency_samples=args.latency_samples,
+        )
+        if args.out:
+            write_report(report, args.out)
+            print(f"report={args.out}")
+    elif args.command == "quant":
+        dtypes = [d.strip().lower() for d in args.dtypes.split(",") if d.strip()]
+        unknown = [d for d in dtypes if d not in mf_quant.FACTOR_DTYPES]
+        if unknown:
+            parser.error(f"--dtypes must be among: {', '.join(mf_quant.FACTOR_DTYPES)}")
+        # 첫 번째 설정 하나만 학습해 저장 형식끼리 비교
+        report = run_quant_benchmark(
+            _bench_configs(args)[0],
+            dtypes=dtypes,
+            ks=_int_list(args.k),
+            holdout=args.holdout,
+            split=args.split,
+            seed=args.seed,
+            latency_samples=args.latency_samples,
+        )
+        if args.out:
+            write_report(report, args.out)
+            print(f"report={args.out}")
+    elif args.command == "compare":
+        if len(args.reports) != 2:
+            parser.error("compare needs two report paths: BASE NEW")
+        diffs = compare_reports(*args.reports)
+        if not diffs:
+            print("No matching configurations between reports.")
+        for diff in diffs:
+            print(" ".join(
+                f"{key}={value}" if key in CONFIG_KEYS or not isinstance(value, float) else f"{key}={value:+.4f}"
+                for key, value in diff.items()
+            ))
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,206 @@
+"""회원별 상호작용 상품(주문/위시/리뷰) 캐시. 추천에서 이미 상호작용한 상품을 제외할 때 쓴다.
+
+전체 스냅샷은 CSR 형태(정렬된 회원 id, 구간 포인터, 회원별 정렬된 int32 상품 id)로 한 번에 로드하고,
+쓰기 경로(주문/위시/리뷰)에서는 해당 회원만 다시 조회해 오버레이로 덮는다.
+스냅샷은 MF_INTERACTIONS_TTL_SEC마다 백그라운드에서 다시 만든다(다른 워커의 쓰기 반영).
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+import database
+import models
+from . import mf_services
+
+logger = logging.getLogger(__name__)
+
+# 리뷰는 recommend_view(product_review의 (회원, 상품) GROUP BY)와 같은 쌍이라 원본 테이블에서 바로 읽는다
+_SNAPSHOT_SQL = """
+SELECT o.member_id, d.product_id
+FROM order_detail d
+JOIN "order" o ON o.id = d.order_id
+WHERE o.member_id IS NOT NULL AND d.product_id IS NOT NULL
+UNION
+SELECT member_id, product_id FROM wishlist
+WHERE member_id IS NOT NULL AND product_id IS NOT NULL
+UNION
+SELECT member_id, product_id FROM product_review
+WHERE member_id IS NOT NULL AND product_id IS NOT NULL
+ORDER BY 1, 2
+"""
+
+_EMPTY = np.zeros(0, dtype=np.int32)
+
+
+def _ttl_seconds() -> float:
+    try:
+        return max(0.0, float(os.getenv("MF_INTERACTIONS_TTL_SEC", "600")))
+    except ValueError:
+        return 600.0
+
+
+class _Snapshot:
+    def __init__(self, member_ids: np.ndarray, indptr: np.ndarray, product_ids: np.ndarray, started_at: float):
+        self.member_ids = member_ids
+        self.indptr = indptr
+        self.product_ids = product_ids
+        self.started_at = started_at
+
+    def get(self, member_id: int) -> np.ndarray:
+        pos = int(np.searchsorted(self.member_ids, member_id))
+        if pos < len(self.member_ids) and int(self.member_ids[pos]) == member_id:
+            return self.product_ids[self.indptr[pos]:self.indptr[pos + 1]]
+        return _EMPTY
+
+
+class InteractionIndex:
+    """스냅샷 + 회원별 오버레이. 조회 결과는 정렬된 int32 상품 id 배열."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot: Optional[_Snapshot] = None
+        self._overlay: Dict[int, Tuple[float, np.ndarray]] = {}
+        self._building = False
+
+    def _build(self):
+        started = time.time()
+        try:
+            pairs = mf_services.fetch_array(_SNAPSHOT_SQL, {}, columns=2, dtype=np.int64)
+            member_ids, counts = np.unique(pairs[:, 0], return_counts=True)
+            indptr = np.zeros(len(member_ids) + 1, dtype=np.int64)
+            np.cumsum(counts, out=indptr[1:])
+            snapshot = _Snapshot(member_ids, indptr, pairs[:, 1].astype(np.int32), started)
+            with self._lock:
+                self._snapshot = snapshot
+                # 스냅샷 조회 시작 이전에 갱신된 오버레이는 스냅샷에 이미 반영됨
+                self._overlay = {mid: entry for mid, entry in self._overlay.items() if entry[0] >= started}
+            logger.info("MF interaction snapshot members=%d pairs=%d in %.2fs", len(member_ids), len(pairs), time.time() - started)
+        except Exception as exc:
+            logger.warning("MF interaction snapshot failed: %s", exc)
+        finally:
+            with self._lock:
+                self._building = False
+
+    def _ensure_fresh(self):
+        """스냅샷이 없거나 오래되면 백그라운드로 다시 만든다(요청은 기다리지 않음)."""
+        snapshot = self._snapshot
+        if snapshot is not None and (time.time() - snapshot.started_at) <= _ttl_seconds():
+            return
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+        threading.Thread(target=self._build, name="mf-interactions", daemon=True).start()
+
+    def get_many(self, db: Session, member_ids: List[int]) -> Dict[int, np.ndarray]:
+        self._ensure_fresh()
+        snapshot = self._snapshot
+        result: Dict[int, np.ndarray] = {}
+        missing: List[int] = []
+        for member_id in member_ids:
+            member_id = int(member_id)
+            entry = self._overlay.get(member_id)
+            if entry is not None:
+                result[member_id] = entry[1]
+            elif snapshot is not None:
+                result[member_id] = snapshot.get(member_id)
+            else:
+                missing.append(member_id)
+        if missing:
+            # 첫 스냅샷이 준비되기 전에는 DB에서 직접 조회
+            result.update(self.refresh(db, missing))
+        return result
+
+    def refresh(self, db: Session, member_ids: List[int]) -> Dict[int, np.ndarray]:
+        """회원들의 상호작용을 DB에서 다시 읽어 오버레이에 저장."""
+        now = time.time()
+        fresh = _query_members(db, member_ids)
+        with self._lock:
+            for member_id, products in fresh.items():
+                self._overlay[member_id] = (now, products)
+        return fresh
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "snapshot_members": len(snapshot.member_ids) if snapshot is not None else None,
+            "snapshot_pairs": len(snapshot.product_ids) if snapshot is not None else None,
+            "snapshot_age_sec": (time.time() - snapshot.started_at) if snapshot is not None else None,
+            "overlay_members": len(self._overlay),
+        }
+
+
+def _query_members(db: Session, member_ids: List[int]) -> Dict[int, np.ndarray]:
+    """주문/위시/리뷰 상호작용 상품을 회원별 정렬 배열로 조회(쿼리는 종류별 한 번씩).
+
+    리뷰는 recommend_view가 아닌 product_review에서 읽는다(구체화 뷰면 방금 쓴 리뷰가 아직 없다).
+    """
+    ids = [int(mid) for mid in member_ids]
+    collected: Dict[int, set] = {mid: set() for mid in ids}
+    if not ids:
+        return {}
+
+    order_rows = (
+        db.query(models.Order.member_id, models.OrderDetail.product_id)
+        .select_from(models.OrderDetail)
+        .join(models.Order, models.Order.id == models.OrderDetail.order_id)
+        .filter(models.Order.member_id.in_(ids))
+        .all()
+    )
+    wishlist_rows = (
+        db.query(models.Wishlist.member_id, models.Wishlist.product_id)
+        .filter(models.Wishlist.member_id.in_(ids))
+        .all()
+    )
+    review_rows = (
+        db.query(models.ProductReview.member_id, models.ProductReview.product_id)
+        .filter(models.ProductReview.member_id.in_(ids))
+        .all()
+    )
+    for rows in (order_rows, wishlist_rows, review_rows):
+        for mid, pid in rows:
+            if pid is not None:
+                collected[int(mid)].add(int(pid))
+
+    return {mid: np.array(sorted(pids), dtype=np.int32) for mid, pids in collected.items()}
+
+
+_INDEX = InteractionIndex()
+
+
+def stats() -> Dict[str, Any]:
+    return _INDEX.stats()
+
+
+def get_index() -> InteractionIndex:
+    return _INDEX
+
+
+def interacted(db: Session, member_id: int) -> np.ndarray:
+    return _INDEX.get_many(db, [int(member_id)])[int(member_id)]
+
+
+def interacted_many(db: Session, member_ids: List[int]) -> Dict[int, np.ndarray]:
+    return _INDEX.get_many(db, member_ids)
+
+
+def refresh_member(member_id: int) -> np.ndarray:
+    """쓰기 경로(커밋 이후)에서 호출: 해당 회원만 다시 조회."""
+    with database.SessionLocal() as db:
+        return _INDEX.refresh(db, [int(member_id)])[int(member_id)]
+
+
+def exclusion_mask(product_ids: np.ndarray, interacted_ids: np.ndarray) -> np.ndarray:
+    """정렬된 product_ids 중 interacted_ids에 든 위치 True(searchsorted, 상호작용 수에 비례)."""
+    mask = np.zeros(len(product_ids), dtype=bool)
+    if not len(interacted_ids) or not len(product_ids):
+        return mask
+    pos = np.minimum(np.searchsorted(product_ids, interacted_ids), len(product_ids) - 1)
+    hit = product_ids[pos] == interacted_ids
+    mask[pos[hit]] = True
+    return mask
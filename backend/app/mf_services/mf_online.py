@@ -0,0 +1,178 @@
+"""MF 온라인 갱신(fold-in): 아이템 벡터를 고정하고 회원 벡터/편향만 즉시 다시 푼다.
+
+전체 재학습 전까지 신규 회원도 개인화 추천을 받고, 기존 회원은 새 상호작용을 바로 반영한다.
+"""
+import logging
+import os
+import threading
+from typing import Dict, Optional, Set, Tuple
+
+import numpy as np
+
+from . import mf_engines, mf_quant, mf_services
+
+logger = logging.getLogger(__name__)
+
+# (user_vector, user_bias, user_mean)
+UserState = Tuple[np.ndarray, float, float]
+
+_LOCK = threading.Lock()
+_OVERLAY_MODEL: Optional[Dict[str, np.ndarray]] = None
+_OVERLAY: Dict[int, UserState] = {}
+# 상호작용이 없어 fold-in 할 수 없던 회원(요청마다 DB 조회 방지, 상호작용 시 해제)
+_NO_HISTORY: Set[int] = set()
+# 암시적 모델의 item_factors 그람 행렬(Y^T Y, 모델당 한 번 계산)
+_ITEM_GRAM: Optional[Tuple[Dict[str, np.ndarray], np.ndarray]] = None
+
+
+def _foldin_reg() -> float:
+    """fold-in 릿지 정규화(평점 수에 비례)."""
+    try:
+        return max(1e-6, float(os.getenv("MF_FOLDIN_REG", "0.1")))
+    except ValueError:
+        return 0.1
+
+
+def _enabled() -> bool:
+    return os.getenv("MF_ONLINE_ENABLED", "true").lower() not in {"0", "false", "no"}
+
+
+def _overlay_for(model: Dict[str, np.ndarray]) -> Dict[int, UserState]:
+    """모델이 바뀌면(재학습 반영) 이전 모델 기준 오버레이는 버린다."""
+    global _OVERLAY_MODEL, _OVERLAY, _NO_HISTORY
+    if _OVERLAY_MODEL is not model:
+        with _LOCK:
+            if _OVERLAY_MODEL is not model:
+                _OVERLAY = {}
+                _NO_HISTORY = set()
+                _OVERLAY_MODEL = model
+    return _OVERLAY
+
+
+def _model_state(model: Dict[str, np.ndarray], member_id: int) -> Optional[UserState]:
+    user_index = mf_services.user_position(model, member_id)
+    if user_index is None:
+        return None
+    user_mean = 0.0
+    if model.get("center_user") and model.get("user_mean") is not None:
+        user_mean = float(model["user_mean"][user_index])
+    return (
+        mf_quant.rows(model, "user_factors", user_index),
+        float(model["user_bias"][user_index]),
+        user_mean,
+    )
+
+
+def fold_in(
+    model: Dict[str, np.ndarray],
+    product_ids: np.ndarray,
+    values: np.ndarray,
+    prior: Optional[UserState] = None,
+    reg: Optional[float] = None,
+) -> Optional[UserState]:
+    """고정된 item_factors에 대해 [벡터, 편향]을 릿지 회귀로 푼다.
+
+    prior가 있으면 0 대신 기존 벡터 쪽으로 당겨(기존 회원은 조금씩만 이동) 푼다.
+    """
+    positions, valid = mf_services.item_positions(model, product_ids)
+    if not valid.any():
+        return None
+    positions = positions[valid]
+    targets = np.asarray(values, dtype=np.float64)[valid]
+    if model.get("implicit"):
+        return _fold_in_implicit(model, positions, targets, prior, reg)
+
+    user_mean = 0.0
+    if model.get("center_user"):
+        user_mean = float(targets.mean())
+        targets = targets - user_mean
+
+    factors = model["item_factors"].shape[1]
+    x = np.hstack([
+        mf_quant.rows(model, "item_factors", positions).astype(np.float64),
+        np.ones((len(positions), 1)),
+    ])
+    y = targets - float(model["global_mean"]) - np.asarray(model["item_bias"][positions], dtype=np.float64)
+
+    strength = (reg if reg is not None else _foldin_reg()) * len(positions)
+    anchor = np.zeros(factors + 1)
+    if prior is not None:
+        anchor[:factors] = prior[0]
+        anchor[factors] = prior[1]
+    solved = np.linalg.solve(x.T @ x + strength * np.eye(factors + 1), x.T @ y + strength * anchor)
+    return solved[:factors].astype(np.float32), float(solved[factors]), user_mean
+
+
+def _item_gram(model: Dict[str, np.ndarray]) -> np.ndarray:
+    global _ITEM_GRAM
+    cached = _ITEM_GRAM
+    if cached is None or cached[0] is not model:
+        item_factors = mf_quant.rows(model, "item_factors").astype(np.float64)
+        cached = (model, item_factors.T @ item_factors)
+        _ITEM_GRAM = cached
+    return cached[1]
+
+
+def _fold_in_implicit(
+    model: Dict[str, np.ndarray],
+    positions: np.ndarray,
+    strengths: np.ndarray,
+    prior: Optional[UserState],
+    reg: Optional[float],
+) -> UserState:
+    """암시적 모델: (Y^T Y + Y_u^T (C_u - I) Y_u + reg I) x = Y_u^T C_u 1 (학습과 같은 식, 편향 없음)."""
+    confidence = 1.0 + float(model.get("implicit_alpha", 0.0)) * np.maximum(strengths, 0.0)
+    y = mf_quant.rows(model, "item_factors", positions).astype(np.float64)
+    strength = reg if reg is not None else mf_engines._ials_reg()
+    factors = y.shape[1]
+    lhs = _item_gram(model) + (y * (confidence - 1.0)[:, None]).T @ y + strength * np.eye(factors)
+    rhs = y.T @ confidence
+    if prior is not None:
+        rhs = rhs + strength * np.asarray(prior[0], dtype=np.float64)
+    solved = np.linalg.solve(lhs, rhs)
+    return solved.astype(np.float32), 0.0, 0.0
+
+
+def user_state(model: Dict[str, np.ndarray], member_id: int) -> Optional[UserState]:
+    """추천용 회원 상태: 온라인 갱신값 우선, 없으면 학습된 모델 값."""
+    state = _overlay_for(model).get(int(member_id))
+    if state is not None:
+        return state
+    return _model_state(model, member_id)
+
+
+def refresh_member(member_id: int, model: Optional[Dict[str, np.ndarray]] = None) -> Optional[UserState]:
+    """회원의 현재 상호작용으로 벡터를 다시 풀어 오버레이에 저장."""
+    if not _enabled():
+        return None
+    model = model if model is not None else mf_services.load_mf_model()
+    if not model:
+        return None
+    overlay = _overlay_for(model)
+    try:
+        _, product_ids, values = mf_services._load_ratings_from_db(
+            member_id=int(member_id), implicit=bool(model.get("implicit"))
+        )
+    except Exception as exc:
+        logger.warning("MF fold-in load failed member_id=%s: %s", member_id, exc)
+        return None
+    state = fold_in(model, product_ids, values, prior=_model_state(model, member_id))
+    if state is None:
+        # 모델이 아는 상품과의 상호작용이 없음
+        _NO_HISTORY.add(int(member_id))
+        return None
+    _NO_HISTORY.discard(int(member_id))
+    overlay[int(member_id)] = state
+    return state
+
+
+def ensure_member(member_id: int, model: Dict[str, np.ndarray]) -> Optional[UserState]:
+    """모델/오버레이에 없는 회원이면 그 자리에서 fold-in 시도."""
+    state = user_state(model, member_id)
+    if state is not None or int(member_id) in _NO_HISTORY:
+        return state
+    return refresh_member(member_id, model)
+
+
+def overlay_size() -> int:
+    return len(_OVERLAY)
@@ -0,0 +1,166 @@
+"""회원별 MF 추천을 member_recommendation 테이블에 미리 계산해 두는 배치 작업.
+
+모델 공개 직후와 주기적으로 실행되고, 온라인 요청은 최신 결과가 있으면 점수 계산 없이 읽기만 한다.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, insert
+
+import database
+import models
+from . import mf_services
+
+logger = logging.getLogger(__name__)
+
+JOB_ID = "mf_precompute"
+
+_SCHEDULER = None
+_RUN_LOCK = threading.Lock()
+_LAST_RUN: Dict[str, Any] = {}
+
+
+def enabled() -> bool:
+    return os.getenv("MF_PRECOMPUTE_ENABLED", "true").lower() not in {"0", "false", "no"}
+
+
+def list_limit() -> int:
+    """미리 계산하는 추천 개수(이 개수로 요청될 때만 사용)."""
+    try:
+        return max(1, int(os.getenv("MF_PRECOMPUTE_LIMIT", "10")))
+    except ValueError:
+        return 10
+
+
+def max_age_seconds() -> int:
+    """이보다 오래된 결과는 온라인 계산으로 대체."""
+    try:
+        return max(0, int(os.getenv("MF_PRECOMPUTE_MAX_AGE_SEC", "7200")))
+    except ValueError:
+        return 7200
+
+
+def _interval_minutes() -> int:
+    try:
+        return max(1, int(os.getenv("MF_PRECOMPUTE_INTERVAL_MIN", "60")))
+    except ValueError:
+        return 60
+
+
+def materialize(limit: Optional[int] = None) -> Dict[str, Any]:
+    """모델에 있는 모든 회원의 상위 추천을 계산해 테이블에 기록(청크마다 회원 단위 교체)."""
+    # mf_recommend가 읽기 경로에서 이 모듈을 쓰므로 지연 import
+    from . import mf_recommend
+
+    if not _RUN_LOCK.acquire(blocking=False):
+        return {"skipped": "already running"}
+    try:
+        started = time.perf_counter()
+        limit = limit or list_limit()
+        model = mf_services.load_mf_model()
+        if not model:
+            return {"skipped": "model not available"}
+        version = model.get("version")
+        member_ids = [int(mid) for mid in model["user_ids"]]
+        table = models.MemberRecommendation.__table__
+
+        written_members = 0
+        written_rows = 0
+        chunk_size = mf_recommend._batch_chunk_size()
+        with database.SessionLocal() as db:
+            stream = mf_recommend.recommend_for_members(db, member_ids, limit)
+            while True:
+                chunk = list(islice(stream, chunk_size))
+                if not chunk:
+                    break
+                now = datetime.now()
+                rows: List[Dict[str, Any]] = []
+                for member_id, recs in chunk:
+                    # 인기 추천 대체 결과(점수 없음)는 저장하지 않고 온라인 경로에 맡김
+                    if not recs or recs[0][3] is None:
+                        continue
+                    rows.extend(
+                        {
+                            "member_id": member_id,
+                            "rank": rank,
+                            "product_id": int(prod.id),
+                            "score": float(score),
+                            "list_limit": limit,
+                            "model_version": version,
+                            "created_at": now,
+                        }
+                        for rank, (prod, _, _, score) in enumerate(recs)
+                    )
+                    written_members += 1
+                with database.engine.begin() as conn:
+                    conn.execute(delete(table).where(table.c.member_id.in_([member_id for member_id, _ in chunk])))
+                    if rows:
+                        conn.execute(insert(table), rows)
+                written_rows += len(rows)
+
+        summary = {
+            "members": written_members,
+            "rows": written_rows,
+            "model_version": version,
+            "duration_sec": time.perf_counter() - started,
+            "finished_at": time.time(),
+        }
+        _LAST_RUN.clear()
+        _LAST_RUN.update(summary)
+        logger.info("MF precompute done members=%d rows=%d in %.2fs", written_members, written_rows, summary["duration_sec"])
+        return summary
+    finally:
+        _RUN_LOCK.release()
+
+
+def _run_job():
+    try:
+        materialize()
+    except Exception as exc:
+        logger.warning("MF precompute failed: %s", exc, exc_info=True)
+
+
+def invalidate_member(member_id: int):
+    """회원 상호작용 후 그 회원의 미리 계산된 추천 삭제(다음 요청은 온라인 계산)."""
+    table = models.MemberRecommendation.__table__
+    try:
+        with database.engine.begin() as conn:
+            conn.execute(delete(table).where(table.c.member_id == int(member_id)))
+    except Exception as exc:
+        logger.warning("MF precompute invalidate failed member_id=%s: %s", member_id, exc)
+
+
+def register_jobs(scheduler):
+    """AsyncIOScheduler에 시작 직후 1회 + 주기 실행 작업 등록."""
+    global _SCHEDULER
+    if not enabled():
+        return
+    _SCHEDULER = scheduler
+    scheduler.add_job(_run_job, "date", id=f"{JOB_ID}_startup", replace_existing=True)
+    scheduler.add_job(
+        _run_job,
+        "interval",
+        minutes=_interval_minutes(),
+        id=JOB_ID,
+        replace_existing=True,
+    )
+
+
+def request_refresh(reason: str = ""):
+    """새 모델 공개 후 호출: 스케줄러에 즉시 실행 작업 추가(스케줄러가 없으면 무시)."""
+    scheduler = _SCHEDULER
+    if scheduler is None or not enabled():
+        return
+    try:
+        scheduler.add_job(_run_job, "date", id=f"{JOB_ID}_publish", replace_existing=True)
+    except Exception as exc:
+        logger.warning("MF precompute refresh scheduling failed reason=%s: %s", reason, exc)
+
+
+def status() -> Dict[str, Any]:
+    return {"enabled": enabled(), "list_limit": list_limit(), "last_run": dict(_LAST_RUN) or None}
@@ -0,0 +1,115 @@
+"""MF 요인 행렬 양자화 저장(float16 / 행별 스케일 int8)과 점수 계산 시 청크 단위 역양자화.
+
+int8: 행마다 scale = max|x| / 127, q = round(x / scale). 점수는 (q @ v) * scale로 계산한다.
+float32 모델은 그대로 통과하므로 기존 결과와 같다.
+"""
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+FACTOR_KEYS = ("user_factors", "item_factors")
+FACTOR_DTYPES = ("float32", "float16", "int8")
+SCALE_SUFFIX = "_scale"
+
+# 역양자화 임시 배열 상한(행 수). 전체 행렬을 float32로 한 번에 펼치지 않기 위함
+DEQUANT_CHUNK_ROWS = 16384
+
+
+def factor_dtype() -> str:
+    """공개할 모델의 요인 저장 형식(MF_FACTOR_DTYPE)."""
+    name = os.getenv("MF_FACTOR_DTYPE", "float32").lower()
+    return name if name in FACTOR_DTYPES else "float32"
+
+
+def quantize(matrix: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """(저장 배열, 행별 스케일 또는 None)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if dtype == "float16":
+        return matrix.astype(np.float16), None
+    if dtype == "int8":
+        peak = np.abs(matrix).max(axis=1) if matrix.size else np.zeros(len(matrix), dtype=np.float32)
+        scale = np.where(peak > 0, peak / 127.0, 1.0).astype(np.float32)
+        q = np.clip(np.rint(matrix / scale[:, None]), -127, 127).astype(np.int8)
+        return q, scale
+    return matrix, None
+
+
+def quantize_result(result: Dict[str, Any], dtype: str) -> Dict[str, Any]:
+    """학습 결과 dict의 요인 행렬을 dtype으로 바꾼 사본(스케일은 <key>_scale)."""
+    if dtype == "float32":
+        return result
+    out = dict(result)
+    for key in FACTOR_KEYS:
+        out[key], scale = quantize(result[key], dtype)
+        if scale is not None:
+            out[key + SCALE_SUFFIX] = scale
+    return out
+
+
+def storage_dtype(model: Dict[str, Any]) -> str:
+    matrix = model["item_factors"]
+    if matrix.dtype == np.int8:
+        return "int8"
+    return "float16" if matrix.dtype == np.float16 else "float32"
+
+
+def rows(model: Dict[str, Any], key: str, index=slice(None)) -> np.ndarray:
+    """요인 행(들)을 float32로. index는 정수/배열/slice."""
+    values = model[key][index]
+    scale = model.get(key + SCALE_SUFFIX)
+    if scale is not None:
+        return np.asarray(values, dtype=np.float32) * np.asarray(scale[index], dtype=np.float32)[..., None]
+    return np.asarray(values, dtype=np.float32)
+
+
+def _chunk(model: Dict[str, Any], key: str, index) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """청크 행을 float32로 펼친 값과 행별 스케일(스케일은 곱 결과에 적용해 곱셈 수를 줄인다)."""
+    scale = model.get(key + SCALE_SUFFIX)
+    values = np.asarray(model[key][index], dtype=np.float32)
+    return values, (np.asarray(scale[index], dtype=np.float32) if scale is not None else None)
+
+
+def matvec(model: Dict[str, Any], key: str, vector: np.ndarray, positions: Optional[np.ndarray] = None) -> np.ndarray:
+    """model[key](또는 positions 행) @ vector. 양자화 행렬은 DEQUANT_CHUNK_ROWS씩 펼쳐 곱한다."""
+    matrix = model[key]
+    vector = np.asarray(vector, dtype=np.float32)
+    if matrix.dtype == np.float32:
+        return (matrix if positions is None else matrix[positions]) @ vector
+    count = len(matrix) if positions is None else len(positions)
+    out = np.empty(count, dtype=np.float32)
+    for start in range(0, count, DEQUANT_CHUNK_ROWS):
+        end = min(start + DEQUANT_CHUNK_ROWS, count)
+        index = slice(start, end) if positions is None else positions[start:end]
+        values, scale = _chunk(model, key, index)
+        out[start:end] = values @ vector
+        if scale is not None:
+            out[start:end] *= scale
+    return out
+
+
+def matmul_t(model: Dict[str, Any], key: str, vectors: np.ndarray) -> np.ndarray:
+    """vectors @ model[key].T ((벡터 수 x 행 수)). 양자화 행렬은 행 청크 단위로 역양자화."""
+    matrix = model[key]
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if matrix.dtype == np.float32:
+        return vectors @ matrix.T
+    out = np.empty((len(vectors), len(matrix)), dtype=np.float32)
+    for start in range(0, len(matrix), DEQUANT_CHUNK_ROWS):
+        end = min(start + DEQUANT_CHUNK_ROWS, len(matrix))
+        values, scale = _chunk(model, key, slice(start, end))
+        out[:, start:end] = vectors @ values.T
+        if scale is not None:
+            out[:, start:end] *= scale
+    return out
+
+
+def factor_bytes(model: Dict[str, Any]) -> int:
+    """요인 행렬 + 스케일이 차지하는 바이트."""
+    total = 0
+    for key in FACTOR_KEYS:
+        total += int(model[key].nbytes)
+        scale = model.get(key + SCALE_SUFFIX)
+        if scale is not None:
+            total += int(scale.nbytes)
+    return total
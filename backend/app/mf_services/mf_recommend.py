@@ -1,9 +1,10 @@
 """MF 추천 로직(진단/다양성 옵션 포함)."""
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
 
 import os
 import logging
 import time
+from datetime import datetime
 
 import numpy as np
 
@@ -11,14 +12,11 @@ from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 import models
-from . import mf_services
+from . import mf_ann, mf_cache, mf_category_stats, mf_interactions, mf_online, mf_precompute, mf_services, mf_trending
 
-POPULAR_ORDER_WEIGHT = 0.8
-POPULAR_REVIEW_COUNT_WEIGHT = 0.15
 PER_CATEGORY_LIMIT = 3
 
 logger = logging.getLogger(__name__)
-_RECOMMEND_CACHE: Dict[Tuple[Optional[int], int, bool, str, float], Tuple[float, List[Tuple[int, float, int, Optional[float]]]]] = {}
 
 
 def _diversify_enabled() -> bool:
@@ -55,9 +53,9 @@ def _cache_ttl_seconds() -> int:
         return 30
 
 
-def _cache_key(member_id: Optional[int], limit: int) -> Tuple[Optional[int], int, bool, str, float]:
+def _cache_variant(limit: int) -> Tuple[int, bool, str, float]:
+    """캐시 키에 들어가는 요청/설정 값."""
     return (
-        int(member_id) if member_id is not None else None,
         int(limit),
         _diversify_enabled(),
         _score_norm_mode(),
@@ -65,6 +63,14 @@ def _cache_key(member_id: Optional[int], limit: int) -> Tuple[Optional[int], int
     )
 
 
+def _cache_version(member_id: Optional[int]) -> Optional[str]:
+    """캐시 키용 모델 버전(익명 추천은 모델과 무관)."""
+    if member_id is None:
+        return None
+    model = mf_services.load_mf_model()
+    return model.get("version") if model else None
+
+
 def _hydrate_cached(db: Session, rows: List[Tuple[int, float, int, Optional[float]]]):
     if not rows:
         return []
@@ -84,29 +90,68 @@ def _hydrate_cached(db: Session, rows: List[Tuple[int, float, int, Optional[floa
     return hydrated
 
 
-def _get_cached_recs(db: Session, member_id: Optional[int], limit: int):
-    ttl = _cache_ttl_seconds()
-    if ttl <= 0:
+def _cache_key(member_id: Optional[int], limit: int) -> Optional[str]:
+    """조회 시점의 캐시 키(회원 세대 포함). 저장도 같은 키로 해야 계산 중 무효화된 결과가 남지 않는다."""
+    if _cache_ttl_seconds() <= 0:
         return None
-    key = _cache_key(member_id, limit)
-    entry = _RECOMMEND_CACHE.get(key)
-    if not entry:
+    return mf_cache.get_cache().key(_cache_version(member_id), member_id, _cache_variant(limit))
+
+
+def _get_cached_recs(db: Session, key: Optional[str]):
+    if key is None:
         return None
-    ts, rows = entry
-    if (time.time() - ts) > ttl:
-        _RECOMMEND_CACHE.pop(key, None)
+    rows = mf_cache.get_cache().get(key)
+    if rows is None:
         return None
     logger.debug("MF cache hit key=%s", key)
     return _hydrate_cached(db, rows)
 
 
-def _set_cached_recs(member_id: Optional[int], limit: int, rows: List[Tuple[models.Product, float, int, Optional[float]]]):
-    ttl = _cache_ttl_seconds()
-    if ttl <= 0:
+def _set_cached_recs(key: Optional[str], rows: List[Tuple[models.Product, float, int, Optional[float]]]):
+    if key is None:
         return
-    key = _cache_key(member_id, limit)
     payload = [(int(p.id), float(avg), int(rc), score) for p, avg, rc, score in rows]
-    _RECOMMEND_CACHE[key] = (time.time(), payload)
+    mf_cache.get_cache().set(key, payload, _cache_ttl_seconds())
+
+
+def _batch_chunk_size() -> int:
+    """배치 추천에서 한 번에 행렬곱/조회하는 회원 수."""
+    try:
+        return max(1, int(os.getenv("MF_BATCH_CHUNK", "256")))
+    except ValueError:
+        return 256
+
+
+def _get_precomputed_recs(
+    db: Session, member_id: int, limit: int, model_version: Optional[str]
+) -> Optional[List[Tuple[models.Product, float, int, Optional[float]]]]:
+    """member_recommendation에 같은 개수/같은 모델 버전/최대 나이 이내 결과가 있으면 반환."""
+    if not mf_precompute.enabled():
+        return None
+    rows = (
+        db.query(
+            models.MemberRecommendation.product_id,
+            models.MemberRecommendation.score,
+            models.MemberRecommendation.list_limit,
+            models.MemberRecommendation.model_version,
+            models.MemberRecommendation.created_at,
+        )
+        .filter(models.MemberRecommendation.member_id == int(member_id))
+        .order_by(models.MemberRecommendation.rank)
+        .all()
+    )
+    if not rows:
+        return None
+    _, _, list_limit, version, created_at = rows[0]
+    if int(list_limit) != int(limit) or version != model_version:
+        return None
+    if (datetime.now() - created_at).total_seconds() > mf_precompute.max_age_seconds():
+        return None
+    hydrated = _hydrate_products(db, [int(pid) for pid, _, _, _, _ in rows])
+    if len(hydrated) < len(rows):
+        # 비활성화된 상품이 섞였으면 온라인 계산
+        return None
+    return [(*hydrated[int(pid)], score) for pid, score, _, _, _ in rows]
 
 
 def _rng():
@@ -118,253 +163,354 @@ def _rng():
     return np.random.default_rng(seed)
 
 
-def _get_interacted_product_ids(db: Session, member_id: int) -> set:
-    """주문/위시/리뷰 기반 상호작용 상품 추출."""
-    product_ids = set()
-
-    order_rows = (
-        db.query(models.OrderDetail.product_id)
-        .join(models.Order, models.Order.id == models.OrderDetail.order_id)
-        .filter(models.Order.member_id == member_id)
-        .all()
-    )
-    product_ids.update([row[0] for row in order_rows])
+def _catalog_ttl_seconds() -> int:
+    """활성 상품 배열 캐시 TTL (초)."""
+    try:
+        return max(0, int(os.getenv("MF_CATALOG_TTL_SEC", "60")))
+    except ValueError:
+        return 60
 
-    wishlist_rows = (
-        db.query(models.Wishlist.product_id)
-        .filter(models.Wishlist.member_id == member_id)
-        .all()
-    )
-    product_ids.update([row[0] for row in wishlist_rows])
 
-    review_rows = (
-        db.query(models.Recommend.product_id)
-        .filter(models.Recommend.member_id == member_id)
-        .all()
-    )
-    product_ids.update([row[0] for row in review_rows])
+_CATALOG_CACHE: Optional[Tuple[float, Dict[str, np.ndarray]]] = None
+# (모델, 카탈로그, 위치, valid). id()는 해제 후 재사용될 수 있어 객체 자체를 잡아 두고 is로 비교
+_ALIGN_CACHE: Optional[Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray], np.ndarray, np.ndarray]] = None
 
-    return product_ids
 
+def _active_catalog(db: Session) -> Dict[str, np.ndarray]:
+    """활성 상품의 id/카테고리/생성시각 배열(id 오름차순, ORM 객체 없이 조회)."""
+    global _CATALOG_CACHE
+    ttl = _catalog_ttl_seconds()
+    cached = _CATALOG_CACHE
+    if cached is not None and ttl > 0 and (time.time() - cached[0]) <= ttl:
+        return cached[1]
 
-def _base_product_query(db: Session):
-    """활성 상품 + 리뷰/주문 집계 조인."""
-    order_subq = (
-        db.query(
-            models.OrderDetail.product_id.label("product_id"),
-            func.count(models.OrderDetail.id).label("order_count"),
-        )
-        .group_by(models.OrderDetail.product_id)
-        .subquery()
+    rows = (
+        db.query(models.Product.id, models.Product.category_id, models.Product.created_at)
+        .filter(models.Product.is_active.is_(True))
+        .order_by(models.Product.id)
+        .all()
     )
+    catalog = {
+        "product_ids": np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows)),
+        "category_ids": np.fromiter((r[1] for r in rows), dtype=np.int64, count=len(rows)),
+        "created_ts": np.fromiter(
+            (r[2].timestamp() if r[2] is not None else 0.0 for r in rows), dtype=np.float64, count=len(rows)
+        ),
+    }
+    _CATALOG_CACHE = (time.time(), catalog)
+    return catalog
+
+
+def _align_catalog(model: Dict[str, np.ndarray], catalog: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """상품 배열 -> 모델 아이템 위치(모델에 없는 상품은 valid=False). 모델/카탈로그가 같으면 재사용."""
+    global _ALIGN_CACHE
+    cached = _ALIGN_CACHE
+    if cached is not None and cached[0] is model and cached[1] is catalog:
+        return cached[2], cached[3]
+    positions, valid = mf_services.item_positions(model, catalog["product_ids"])
+    _ALIGN_CACHE = (model, catalog, positions, valid)
+    return positions, valid
+
+
+def _category_weight_vector(category_ids: np.ndarray, category_weights: Dict[int, float]) -> np.ndarray:
+    """카테고리 id 배열 -> 선호 가중치 배열."""
+    if not category_weights or not len(category_ids):
+        return np.zeros(len(category_ids), dtype=np.float64)
+    keys = np.array(sorted(category_weights), dtype=np.int64)
+    values = np.array([category_weights[int(k)] for k in keys], dtype=np.float64)
+    pos = np.minimum(np.searchsorted(keys, category_ids), len(keys) - 1)
+    return np.where(keys[pos] == category_ids, values[pos], 0.0)
+
+
+def _top_indices(keys: np.ndarray, tiebreak: np.ndarray, k: int) -> np.ndarray:
+    """(keys, tiebreak) 내림차순 상위 k개 인덱스(argpartition 후 부분 정렬)."""
+    n = len(keys)
+    if k <= 0 or n == 0:
+        return np.zeros(0, dtype=np.int64)
+    if k < n:
+        part = np.argpartition(-keys, k - 1)[:k]
+        # 경계값과 같은 점수는 모두 포함해 created_at 타이브레이크가 전체 정렬과 같도록 함
+        threshold = keys[part].min()
+        part = np.flatnonzero(keys >= threshold)
+    else:
+        part = np.arange(n)
+    order = np.lexsort((-tiebreak[part], -keys[part]))
+    return part[order][:k]
 
+
+def _hydrate_products(db: Session, product_ids: List[int]) -> Dict[int, Tuple[models.Product, float, int]]:
+    """최종 선택 상품만 ORM + 리뷰 집계로 로드(집계도 선택 상품으로 한정)."""
+    if not product_ids:
+        return {}
     review_subq = (
         db.query(
             models.ProductReview.product_id.label("product_id"),
             func.count(models.ProductReview.id).label("review_count"),
-            func.coalesce(func.avg(models.ProductReview.rating), 0).label("avg_rating"),
+            func.avg(models.ProductReview.rating).label("avg_rating"),
         )
+        .filter(models.ProductReview.product_id.in_(product_ids))
         .group_by(models.ProductReview.product_id)
         .subquery()
     )
-
-    order_count = func.coalesce(order_subq.c.order_count, 0)
-    review_count = func.coalesce(review_subq.c.review_count, 0)
-    avg_rating = func.coalesce(review_subq.c.avg_rating, 0)
-
-    query = (
+    rows = (
         db.query(
             models.Product,
-            avg_rating.label("avg_rating"),
-            review_count.label("review_count"),
-            order_count.label("order_count"),
+            func.coalesce(review_subq.c.avg_rating, 0),
+            func.coalesce(review_subq.c.review_count, 0),
         )
-        .filter(models.Product.is_active.is_(True))
-        .outerjoin(order_subq, models.Product.id == order_subq.c.product_id)
+        .filter(models.Product.is_active.is_(True), models.Product.id.in_(product_ids))
         .outerjoin(review_subq, models.Product.id == review_subq.c.product_id)
+        .all()
     )
+    return {int(prod.id): (prod, float(avg), int(rc)) for prod, avg, rc in rows}
 
-    return query, order_count, review_count, avg_rating
 
+CategoryStats = mf_category_stats.CategoryStats
 
-def _get_member_category_stats(
-    db: Session, member_id: int
-) -> Tuple[Dict[int, float], Dict[int, int], int]:
-    review_rows = (
-        db.query(models.Product.category_id, func.count(models.ProductReview.id))
-        .join(models.Product, models.Product.id == models.ProductReview.product_id)
-        .filter(models.ProductReview.member_id == member_id)
-        .group_by(models.Product.category_id)
-        .all()
-    )
-    wishlist_rows = (
-        db.query(models.Product.category_id, func.count(models.Wishlist.id))
-        .join(models.Product, models.Product.id == models.Wishlist.product_id)
-        .filter(models.Wishlist.member_id == member_id)
-        .group_by(models.Product.category_id)
-        .all()
-    )
-    order_rows = (
-        db.query(models.Product.category_id, func.count(models.OrderDetail.id))
-        .join(models.Product, models.Product.id == models.OrderDetail.product_id)
-        .join(models.Order, models.Order.id == models.OrderDetail.order_id)
-        .filter(models.Order.member_id == member_id)
-        .group_by(models.Product.category_id)
-        .all()
-    )
 
-    weights: Dict[int, float] = {}
-    counts: Dict[int, int] = {}
-    for cid, cnt in review_rows:
-        cid_int = int(cid)
-        weights[cid_int] = weights.get(cid_int, 0.0) + float(cnt)
-        counts[cid_int] = counts.get(cid_int, 0) + int(cnt)
-    for cid, cnt in wishlist_rows:
-        cid_int = int(cid)
-        weights[cid_int] = weights.get(cid_int, 0.0) + float(cnt) * 0.8
-        counts[cid_int] = counts.get(cid_int, 0) + int(cnt)
-    for cid, cnt in order_rows:
-        cid_int = int(cid)
-        weights[cid_int] = weights.get(cid_int, 0.0) + float(cnt) * 1.2
-        counts[cid_int] = counts.get(cid_int, 0) + int(cnt)
-
-    total_interactions = sum(counts.values())
-    max_weight = max(weights.values()) if weights else 0.0
-    if max_weight <= 0.0:
-        return {}, counts, total_interactions
-    return {cid: w / max_weight for cid, w in weights.items()}, counts, total_interactions
+def _get_member_category_stats_batch(db: Session, member_ids: List[int]) -> Dict[int, CategoryStats]:
+    """여러 회원의 카테고리 선호 가중치/상호작용 수(member_category_stats 카운터에서 조회)."""
+    return mf_category_stats.category_stats_batch(db, member_ids)
 
 
-def _apply_sparse_preference(
-    mixed: List[Tuple[models.Product, float, int, float, float]],
-    prefer_ids: List[int],
-    category_weights: Dict[int, float],
-    limit: int,
-    prefer_pool: Optional[List[Tuple[models.Product, float, int, float, float]]] = None,
-) -> List[Tuple[models.Product, float, int, float, float]]:
+def _get_member_category_stats(db: Session, member_id: int) -> CategoryStats:
+    return _get_member_category_stats_batch(db, [int(member_id)])[int(member_id)]
+
+
+def _prefer_min_per_category() -> int:
     try:
         min_per = int(os.getenv("MF_PREFER_MIN_PER_CATEGORY", "1"))
     except ValueError:
         min_per = 1
+    return max(0, min_per)
+
+
+def _prefer_max_per_category() -> int:
     try:
         max_per = int(os.getenv("MF_PREFER_MAX_PER_CATEGORY", "2"))
     except ValueError:
         max_per = 2
-    min_per = max(0, min_per)
-    max_per = max(min_per, max_per)
-
-    pool = prefer_pool if prefer_pool is not None else mixed
-    per_cat_items: Dict[int, List[Tuple[models.Product, float, int, float, float]]] = {}
-    for row in pool:
-        cid = int(row[0].category_id)
-        if cid in prefer_ids:
-            per_cat_items.setdefault(cid, []).append(row)
-
-    cats_sorted = sorted(
-        prefer_ids, key=lambda cid: category_weights.get(cid, 0.0), reverse=True
-    )
-    if min_per > 0:
-        max_cats = max(1, limit // max(1, min_per))
-        if len(cats_sorted) > max_cats:
-            cats_sorted = cats_sorted[:max_cats]
-
-    picked: List[Tuple[models.Product, float, int, float, float]] = []
-    picked_ids = set()
-    per_cat_idx = {cid: 0 for cid in cats_sorted}
-    per_cat_picked = {cid: 0 for cid in cats_sorted}
-
-    def _take_next(cid: int):
-        items = per_cat_items.get(cid)
-        if not items:
-            return None
-        idx = per_cat_idx.get(cid, 0)
-        if idx >= len(items):
-            return None
-        per_cat_idx[cid] = idx + 1
-        return items[idx]
-
-    for cid in cats_sorted:
-        for _ in range(min_per):
-            if len(picked) >= limit:
-                break
-            item = _take_next(cid)
-            if item is None:
-                break
-            pid = int(item[0].id)
-            if pid in picked_ids:
-                continue
-            picked.append(item)
-            picked_ids.add(pid)
-            per_cat_picked[cid] += 1
-        if len(picked) >= limit:
-            break
-
-    if len(picked) < limit and max_per > 0:
-        while len(picked) < limit:
-            progressed = False
-            for cid in cats_sorted:
-                if len(picked) >= limit:
-                    break
-                if per_cat_picked[cid] >= max_per:
-                    continue
-                item = _take_next(cid)
-                if item is None:
-                    continue
-                pid = int(item[0].id)
-                if pid in picked_ids:
-                    continue
-                picked.append(item)
-                picked_ids.add(pid)
-                per_cat_picked[cid] += 1
-                progressed = True
-            if not progressed:
-                break
+    return max(_prefer_min_per_category(), max_per)
+
+
+class _Candidate(NamedTuple):
+    """선택 단계 후보(ORM 객체 없이 id/카테고리/점수만 보관)."""
+
+    product_id: int
+    category_id: int
+    score: float
+    norm: float
+
+
+def _group_rank(groups: np.ndarray) -> np.ndarray:
+    """각 원소의 같은 그룹 안 순번(배열 순서 기준, 0부터)."""
+    order = np.argsort(groups, kind="stable")
+    sorted_groups = groups[order]
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]]) if len(groups) else np.zeros(0, dtype=np.int64)
+    rank = np.empty(len(groups), dtype=np.int64)
+    rank[order] = np.arange(len(groups)) - np.repeat(starts, np.diff(np.r_[starts, len(groups)]))
+    return rank
 
-    if len(picked) < limit:
-        for row in mixed:
-            if len(picked) >= limit:
-                break
-            pid = int(row[0].id)
-            if pid in picked_ids:
-                continue
-            picked.append(row)
-            picked_ids.add(pid)
 
+def _apply_sparse_preference(
+    mixed: np.ndarray,
+    categories: np.ndarray,
+    prefer_ids: List[int],
+    category_weights: Dict[int, float],
+    limit: int,
+) -> np.ndarray:
+    """선호 카테고리 할당(가중치 순으로 카테고리당 최소 min_per개, 이후 라운드로빈으로 max_per개까지)을
+    먼저 채우고 남은 자리는 mixed 순서로 채운 후보 풀 위치 배열.
+
+    categories는 후보 풀(점수 순) 전체의 카테고리 id, mixed는 그 풀의 위치 배열.
+    """
+    min_per = _prefer_min_per_category()
+    max_per = _prefer_max_per_category()
+
+    prefer = np.asarray(prefer_ids, dtype=np.int64)
+    if not len(prefer):
+        return mixed[:limit]
+    weights = np.array([category_weights.get(cid, 0.0) for cid in prefer_ids], dtype=np.float64)
+    prefer = prefer[np.argsort(-weights, kind="stable")]
+    if min_per > 0:
+        prefer = prefer[:max(1, limit // max(1, min_per))]
+
+    # 풀 위치별 선호 카테고리 순위(비선호는 -1)와 카테고리 안 순번
+    order = np.argsort(prefer)
+    found = np.minimum(np.searchsorted(prefer[order], categories), len(prefer) - 1)
+    hit = prefer[order][found] == categories
+    members = np.flatnonzero(hit)
+    cat_rank = order[found[members]]
+    within = _group_rank(categories[members])
+
+    # 최소 할당은 카테고리 순서대로, 추가 할당은 라운드(카테고리 안 순번)마다 카테고리 순서대로
+    first = within < min_per
+    second = (within >= min_per) & (within < max_per)
+    picked = np.concatenate([
+        members[first][np.lexsort((within[first], cat_rank[first]))],
+        members[second][np.lexsort((cat_rank[second], within[second]))],
+    ])[:limit]
+    if len(picked) < limit:
+        rest = mixed[~np.isin(mixed, picked)]
+        picked = np.concatenate([picked, rest[:limit - len(picked)]])
     return picked
 
 
+def _diversify(mixed: np.ndarray, categories: np.ndarray, limit: int) -> Tuple[np.ndarray, int]:
+    """카테고리당 상한 안에서 mixed 순서로 limit개, 모자라면 상한 초과분으로 채움. (위치 배열, 채운 수)."""
+    within = _group_rank(categories[mixed])
+    kept = mixed[within < _per_category_limit()][:limit]
+    filled = mixed[within >= _per_category_limit()][:limit - len(kept)]
+    return np.concatenate([kept, filled]), len(filled)
+
+
 def _popular_products(db: Session, limit: int) -> List[Tuple[models.Product, float, int]]:
-    """모델이 없을 때 사용하는 인기 기반 추천."""
-    query, order_count, review_count, avg_rating = _base_product_query(db)
-    score = (order_count * POPULAR_ORDER_WEIGHT) + avg_rating + (review_count * POPULAR_REVIEW_COUNT_WEIGHT)
+    """모델이 없을 때 사용하는 인기 기반 추천(미리 계산된 트렌딩 순위의 앞 limit개)."""
+    product_ids = mf_trending.top_ids(db, limit, _per_category_limit())
+    hydrated = _hydrate_products(db, product_ids)
+    return [hydrated[pid] for pid in product_ids if pid in hydrated]
 
-    candidate_limit = min(max(limit * 5, 50), 500)
-    rows = (
-        query.order_by(score.desc(), models.Product.created_at.desc())
-        .limit(candidate_limit)
-        .all()
-    )
 
-    # diversify results so a single subcategory doesn't dominate
-    picked: List[Tuple[models.Product, float, int]] = []
-    per_cat_counts: Dict[int, int] = {}
-    for prod, avg, rc, _ in rows:
-        cat_id = int(prod.category_id)
-        if per_cat_counts.get(cat_id, 0) >= _per_category_limit():
-            continue
-        per_cat_counts[cat_id] = per_cat_counts.get(cat_id, 0) + 1
-        picked.append((prod, float(avg), int(rc)))
-        if len(picked) >= limit:
-            break
+def _new_diagnostics() -> Dict[str, int]:
+    return {
+        "total_active_products": 0,
+        "scorable_items_after_model_filter": 0,
+        "interacted_excluded_count": 0,
+        "remaining_candidates_before_diversify": 0,
+        "selected_after_diversify": 0,
+        "filled_by_fallback": 0,
+    }
 
-    if len(picked) < limit:
-        for prod, avg, rc, _ in rows:
-            if len(picked) >= limit:
-                break
-            if any(p.id == prod.id for p, _, _ in picked):
-                continue
-            picked.append((prod, float(avg), int(rc)))
 
+def _category_bonus() -> float:
+    try:
+        return float(os.getenv("MF_CATEGORY_BONUS", "1.0"))
+    except ValueError:
+        return 0.0
+
+
+def _select_candidates(
+    model: Dict[str, np.ndarray],
+    catalog: Dict[str, np.ndarray],
+    user_state: mf_online.UserState,
+    interacted_ids: np.ndarray,
+    category_stats: CategoryStats,
+    limit: int,
+    diagnostics: Dict[str, int],
+    item_scores: Optional[np.ndarray] = None,
+) -> Optional[List[_Candidate]]:
+    """한 회원의 최종 후보 선택(상호작용 제외 -> 점수 -> 상위 풀 -> 탐색/선호/다양성). 후보가 없으면 None.
+
+    item_scores(model["item_ids"] 순서 전체 점수, 배치 행렬곱 결과)를 주면 점수를 다시 계산하지 않는다.
+    """
+    # 후보군: 활성 상품 배열 -> 상호작용 제외 -> 모델에 있는 아이템만
+    product_ids = catalog["product_ids"]
+    candidate_mask = np.ones(len(product_ids), dtype=bool)
+    if len(interacted_ids):
+        excluded = mf_interactions.exclusion_mask(product_ids, interacted_ids)
+        candidate_mask &= ~excluded
+        diagnostics["interacted_excluded_count"] = int(excluded.sum())
+
+    positions, valid = _align_catalog(model, catalog)
+    candidate_mask &= valid
+    cand = np.flatnonzero(candidate_mask)
+    diagnostics["scorable_items_after_model_filter"] = int(len(cand))
+
+    # 큰 카탈로그: 근사 검색(IVF)으로 뽑은 후보 안에서만 점수/보너스/정규화/다양성 적용
+    ann_index = mf_ann.index_for(model) if item_scores is None and mf_ann.enabled() else None
+    if ann_index is not None:
+        found_ids = model["item_ids"][
+            mf_ann.search(model, ann_index, user_state[0], mf_ann.pool_size() + len(interacted_ids))
+        ]
+        found = np.minimum(np.searchsorted(product_ids, found_ids), len(product_ids) - 1)
+        found = found[product_ids[found] == found_ids]
+        cand = np.sort(found[candidate_mask[found]])
+    diagnostics["remaining_candidates_before_diversify"] = int(len(cand))
+
+    if not len(cand):
+        return None
+
+    category_weights, category_counts, _ = category_stats
+
+    # MF 점수 계산: item_factors @ user_vector 한 번 + 카테고리 보너스
+    cand_categories = catalog["category_ids"][cand]
+    cand_created = catalog["created_ts"][cand]
+    if item_scores is not None:
+        scores = np.asarray(item_scores)[positions[cand]].astype(np.float64)
+    elif ann_index is not None:
+        scores = mf_services.score_vector(model, *user_state, positions=positions[cand]).astype(np.float64)
+    else:
+        scores = mf_services.score_vector(model, *user_state)[positions[cand]].astype(np.float64)
+    scores += _category_weight_vector(cand_categories, category_weights) * _category_bonus()
+
+    # 점수 정규화(랭킹에만 사용)
+    if _score_norm_mode() == "zscore":
+        norm = (scores - scores.mean()) / (scores.std() + 1e-8)
+    else:
+        norm = scores
+
+    # 상위 후보 풀: 전역 상위(limit + 탐색 풀) + 선호 카테고리별 상위
+    prefer_ids = [int(cid) for cid in category_counts.keys()]
+    pool_size = limit + 200
+    pool = _top_indices(norm, cand_created, pool_size)
+    if prefer_ids:
+        per_cat = max(limit, _prefer_max_per_category())
+        extra = [
+            members[_top_indices(norm[members], cand_created[members], per_cat)]
+            for members in (np.flatnonzero(cand_categories == cid) for cid in prefer_ids)
+            if len(members)
+        ]
+        if extra:
+            pool = np.union1d(pool, np.concatenate(extra))
+            pool = pool[np.lexsort((-cand_created[pool], -norm[pool]))]
+
+    # 선택 단계는 풀 위치 배열로 처리하고 최종 후보만 _Candidate로 만든다
+    pool_categories = cand_categories[pool]
+    pool_scores = scores[pool]
+
+    # 탐색 혼합(상위 + 샘플)
+    explore_count = int(round(limit * _explore_ratio()))
+    explore_count = min(explore_count, max(0, len(cand) - limit))
+    base_count = max(0, limit - explore_count)
+    mixed = np.arange(min(base_count, len(pool)))
+    explore_pool = np.arange(base_count, min(base_count + 200, len(pool)))
+    if explore_count > 0 and len(explore_pool):
+        rng = _rng()
+        weights = np.maximum(pool_scores[explore_pool], 0.0)
+        if weights.sum() == 0:
+            weights = None
+        indices = rng.choice(len(explore_pool), size=explore_count, replace=False, p=None if weights is None else (weights / weights.sum()))
+        mixed = np.concatenate([mixed, explore_pool[indices]])
+
+    if prefer_ids:
+        mixed = _apply_sparse_preference(mixed, pool_categories, prefer_ids, category_weights, limit)
+
+    # 다양성 끄면 바로 top-N 반환
+    if not _diversify_enabled():
+        chosen = mixed[:limit]
+    else:
+        chosen, filled = _diversify(mixed, pool_categories, limit)
+        diagnostics["filled_by_fallback"] += filled
+
+    selected = [
+        _Candidate(int(pid), int(cid), float(sc), float(nm))
+        for pid, cid, sc, nm in zip(
+            product_ids[cand[pool[chosen]]], pool_categories[chosen], pool_scores[chosen], norm[pool[chosen]]
+        )
+    ]
+    return selected
+
+
+def _picked_rows(
+    hydrated: Dict[int, Tuple[models.Product, float, int]], selected: List[_Candidate]
+) -> List[Tuple[models.Product, float, int, Optional[float]]]:
+    picked: List[Tuple[models.Product, float, int, Optional[float]]] = []
+    for row in selected:
+        entry = hydrated.get(row.product_id)
+        if entry is None:
+            continue
+        prod, avg, rc = entry
+        picked.append((prod, avg, rc, row.score))
     return picked
 
 
@@ -375,17 +521,11 @@ def recommend_for_member_with_score(
     debug: bool = False,
 ) -> Tuple[List[Tuple[models.Product, float, int, Optional[float]]], Optional[Dict[str, int]]]:
     # 진단 정보(옵션)
-    diagnostics = {
-        "total_active_products": 0,
-        "scorable_items_after_model_filter": 0,
-        "interacted_excluded_count": 0,
-        "remaining_candidates_before_diversify": 0,
-        "selected_after_diversify": 0,
-        "filled_by_fallback": 0,
-    }
+    diagnostics = _new_diagnostics()
 
+    cache_key = None if debug else _cache_key(member_id, limit)
     if not debug:
-        cached = _get_cached_recs(db, member_id, limit)
+        cached = _get_cached_recs(db, cache_key)
         if cached is not None:
             return (cached, None)
 
@@ -393,7 +533,7 @@ def recommend_for_member_with_score(
         logger.info("MF fallback: anonymous member")
         recs = [(p, a, r, None) for p, a, r in _popular_products(db, limit)]
         if not debug:
-            _set_cached_recs(member_id, limit, recs)
+            _set_cached_recs(cache_key, recs)
         return (recs, diagnostics) if debug else (recs, None)
 
     # 모델 로드 실패/미등록 유저는 인기 추천으로 대체
@@ -402,130 +542,57 @@ def recommend_for_member_with_score(
         logger.warning("MF fallback: model not available")
         recs = [(p, a, r, None) for p, a, r in _popular_products(db, limit)]
         if not debug:
-            _set_cached_recs(member_id, limit, recs)
+            _set_cached_recs(cache_key, recs)
         return (recs, diagnostics) if debug else (recs, None)
 
-    if int(member_id) not in model.get("user_index", {}):
+    # 배치 작업이 미리 계산한 결과가 최신이면 온라인 점수 계산 생략
+    if not debug:
+        precomputed = _get_precomputed_recs(db, int(member_id), limit, model.get("version"))
+        if precomputed is not None:
+            _set_cached_recs(cache_key, precomputed)
+            return (precomputed, None)
+
+    # 학습 이후 새로 들어온 회원은 상호작용으로 즉시 fold-in
+    user_state = mf_online.ensure_member(int(member_id), model)
+    if user_state is None:
         logger.info("MF fallback: member_id not in model")
         recs = [(p, a, r, None) for p, a, r in _popular_products(db, limit)]
         if not debug:
-            _set_cached_recs(member_id, limit, recs)
+            _set_cached_recs(cache_key, recs)
         return (recs, diagnostics) if debug else (recs, None)
 
-    # 후보군: 활성 상품 전체 -> 상호작용 제외
-    query, _, _, _ = _base_product_query(db)
-    diagnostics["total_active_products"] = query.count()
-
-    interacted_ids = _get_interacted_product_ids(db, member_id)
-    if interacted_ids:
-        query = query.filter(~models.Product.id.in_(interacted_ids))
-        diagnostics["interacted_excluded_count"] = max(
-            0, diagnostics["total_active_products"] - query.count()
-        )
-
-    rows = (
-        query.order_by(models.Product.created_at.desc())
-        .all()
-    )
-
-    if not rows:
+    catalog = _active_catalog(db)
+    product_ids = catalog["product_ids"]
+    diagnostics["total_active_products"] = int(len(product_ids))
+    if not len(product_ids):
         logger.info("MF fallback: no active products")
         recs = [(p, a, r, None) for p, a, r in _popular_products(db, limit)]
         if not debug:
-            _set_cached_recs(member_id, limit, recs)
+            _set_cached_recs(cache_key, recs)
         return (recs, diagnostics) if debug else (recs, None)
 
-    category_bonus = 0.0
-    try:
-        category_bonus = float(os.getenv("MF_CATEGORY_BONUS", "1.0"))
-    except ValueError:
-        category_bonus = 0.0
-    category_weights, category_counts, total_interactions = _get_member_category_stats(
-        db, int(member_id)
+    selected = _select_candidates(
+        model,
+        catalog,
+        user_state,
+        mf_interactions.interacted(db, int(member_id)),
+        _get_member_category_stats(db, int(member_id)),
+        limit,
+        diagnostics,
     )
-
-    # MF 점수 계산(모델에 있는 아이템만)
-    scored: List[Tuple[models.Product, float, int, float]] = []
-    for prod, avg, rc, _ in rows:
-        score = mf_services.predict_score(model, int(member_id), int(prod.id))
-        if score is None:
-            continue
-        bonus = category_weights.get(int(prod.category_id), 0.0) * category_bonus
-        scored.append((prod, float(avg), int(rc), float(score + bonus)))
-    diagnostics["scorable_items_after_model_filter"] = len(scored)
-    diagnostics["remaining_candidates_before_diversify"] = len(scored)
-
-    if not scored:
+    if selected is None:
         logger.info("MF fallback: no scorable items")
         recs = [(p, a, r, None) for p, a, r in _popular_products(db, limit)]
         if not debug:
-            _set_cached_recs(member_id, limit, recs)
+            _set_cached_recs(cache_key, recs)
         return (recs, diagnostics) if debug else (recs, None)
 
-    # 점수 정규화(랭킹에만 사용)
-    if _score_norm_mode() == "zscore":
-        scores = [s for _, _, _, s in scored]
-        mean = float(sum(scores) / len(scores))
-        var = sum((s - mean) ** 2 for s in scores) / len(scores)
-        std = float(var ** 0.5)
-        scored = [(p, a, r, s, (s - mean) / (std + 1e-8)) for p, a, r, s in scored]
-    else:
-        scored = [(p, a, r, s, s) for p, a, r, s in scored]
-
-    scored.sort(key=lambda r: (r[4], r[0].created_at), reverse=True)
-    # 탐색 혼합(상위 + 샘플)
-    explore_count = int(round(limit * _explore_ratio()))
-    explore_count = min(explore_count, max(0, len(scored) - limit))
-    base_count = max(0, limit - explore_count)
-    base = scored[:base_count]
-    explore_pool = scored[base_count:base_count + 200]
-    explore = []
-    if explore_count > 0 and explore_pool:
-        rng = _rng()
-        weights = np.array([max(0.0, row[3]) for row in explore_pool], dtype=float)
-        if weights.sum() == 0:
-            weights = None
-        indices = rng.choice(len(explore_pool), size=explore_count, replace=False, p=None if weights is None else (weights / weights.sum()))
-        explore = [explore_pool[i] for i in indices]
-    mixed = base + explore
-
-    prefer_ids = [int(cid) for cid in category_counts.keys()]
-    if prefer_ids:
-        mixed = _apply_sparse_preference(mixed, prefer_ids, category_weights, limit, scored)
-
-    # 다양성 끄면 바로 top-N 반환
-    if not _diversify_enabled():
-        picked = [(prod, float(avg), int(rc), float(score)) for prod, avg, rc, score, _ in mixed[:limit]]
-        diagnostics["selected_after_diversify"] = len(picked)
-        if not debug:
-            _set_cached_recs(member_id, limit, picked)
-        return (picked, diagnostics) if debug else (picked, None)
-
-    # 다양성 제한 적용
-    picked: List[Tuple[models.Product, float, int, Optional[float]]] = []
-    per_cat_counts: Dict[int, int] = {}
-    for prod, avg, rc, score, _ in mixed:
-        cat_id = int(prod.category_id)
-        if per_cat_counts.get(cat_id, 0) >= _per_category_limit():
-            continue
-        per_cat_counts[cat_id] = per_cat_counts.get(cat_id, 0) + 1
-        picked.append((prod, float(avg), int(rc), float(score)))
-        if len(picked) >= limit:
-            break
-
-    if len(picked) < limit:
-        for prod, avg, rc, score, _ in mixed:
-            if len(picked) >= limit:
-                break
-            if any(p.id == prod.id for p, _, _, _ in picked):
-                continue
-            picked.append((prod, float(avg), int(rc), float(score)))
-            diagnostics["filled_by_fallback"] += 1
-
+    # 최종 선택 상품만 ORM 로드
+    picked = _picked_rows(_hydrate_products(db, [row.product_id for row in selected]), selected)
     diagnostics["selected_after_diversify"] = len(picked)
 
     if not debug:
-        _set_cached_recs(member_id, limit, picked)
+        _set_cached_recs(cache_key, picked)
     return (picked, diagnostics) if debug else (picked, None)
 
 
@@ -536,3 +603,67 @@ def recommend_for_member(
     recs, diagnostics = recommend_for_member_with_score(db, member_id, limit, debug=debug)
     results = [(prod, avg, rc) for prod, avg, rc, _ in recs]
     return (results, diagnostics) if debug else results
+
+
+def recommend_for_members(
+    db: Session,
+    member_ids: List[int],
+    limit: int = 20,
+) -> Iterator[Tuple[int, List[Tuple[models.Product, float, int, Optional[float]]]]]:
+    """여러 회원 추천을 (member_id, 추천 목록) 순서대로 생성.
+
+    MF_BATCH_CHUNK명 단위로 점수는 (회원 x 아이템) 행렬곱 한 번, 상호작용/카테고리 통계와
+    최종 상품 로드는 쿼리 한 번씩으로 계산한다. 선택 규칙은 단건 추천과 같다(근사 검색/캐시는 사용 안 함).
+    """
+    member_ids = list(dict.fromkeys(int(mid) for mid in member_ids))
+    popular: List[Tuple[models.Product, float, int, Optional[float]]] = []
+
+    def _fallback():
+        if not popular:
+            popular.extend((p, a, r, None) for p, a, r in _popular_products(db, limit))
+        return popular
+
+    model = mf_services.load_mf_model()
+    catalog = _active_catalog(db)
+    if not model or not len(catalog["product_ids"]):
+        logger.warning("MF batch fallback: model or active products not available")
+        for member_id in member_ids:
+            yield member_id, _fallback()
+        return
+
+    chunk_size = _batch_chunk_size()
+    for start in range(0, len(member_ids), chunk_size):
+        chunk = member_ids[start:start + chunk_size]
+        states = {member_id: mf_online.ensure_member(member_id, model) for member_id in chunk}
+        scorable = [member_id for member_id in chunk if states[member_id] is not None]
+        interacted = mf_interactions.interacted_many(db, scorable)
+        category_stats = _get_member_category_stats_batch(db, scorable)
+
+        selections: Dict[int, Optional[List[_Candidate]]] = {}
+        if scorable:
+            item_scores = mf_services.score_matrix(
+                model,
+                np.stack([states[member_id][0] for member_id in scorable]),
+                np.array([states[member_id][1] + states[member_id][2] for member_id in scorable]),
+            )
+            for row, member_id in enumerate(scorable):
+                selections[member_id] = _select_candidates(
+                    model,
+                    catalog,
+                    states[member_id],
+                    interacted[member_id],
+                    category_stats[member_id],
+                    limit,
+                    _new_diagnostics(),
+                    item_scores=item_scores[row],
+                )
+
+        hydrated = _hydrate_products(
+            db, sorted({row.product_id for selected in selections.values() if selected for row in selected})
+        )
+        for member_id in chunk:
+            selected = selections.get(member_id)
+            if selected is None:
+                yield member_id, _fallback()
+            else:
+                yield member_id, _picked_rows(hydrated, selected)
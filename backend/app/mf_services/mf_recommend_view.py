@@ -0,0 +1,162 @@
+"""구체화된 recommend_view 갱신(리뷰 쓰기를 모아 REFRESH MATERIALIZED VIEW CONCURRENTLY 한 번).
+
+RECOMMEND_VIEW_MATERIALIZED=true일 때만 동작한다. 일반 뷰면 조회 시점에 집계되므로 할 일이 없다.
+CONCURRENTLY 갱신이라 갱신 중에도 읽기는 막히지 않고, 워커가 여럿이어도 advisory lock으로 한 곳에서만 돈다.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+
+import database
+
+logger = logging.getLogger(__name__)
+
+REFRESH_DELAY_SEC = 30.0
+MAX_RETRIES = 5
+# pg_try_advisory_xact_lock 키(임의의 고정값)
+_ADVISORY_KEY = 0x5265_6356
+
+
+def _delay_seconds() -> float:
+    """첫 리뷰 쓰기 후 갱신까지 기다리며 쓰기를 모으는 시간(초)."""
+    try:
+        return max(0.0, float(os.getenv("MF_VIEW_REFRESH_DELAY_SEC", str(REFRESH_DELAY_SEC))))
+    except ValueError:
+        return REFRESH_DELAY_SEC
+
+
+def _max_retries() -> int:
+    """연속 실패 시 재시도 횟수(MF_VIEW_REFRESH_MAX_RETRIES). 재시도 간격은 지연 시간의 2배씩 늘어난다."""
+    try:
+        return max(0, int(os.getenv("MF_VIEW_REFRESH_MAX_RETRIES", str(MAX_RETRIES))))
+    except ValueError:
+        return MAX_RETRIES
+
+
+def refresh() -> str:
+    """구체화 뷰를 즉시 갱신. 결과: refreshed / busy(다른 워커가 갱신 중) / not_materialized."""
+    if not database.recommend_view_materialized():
+        return "not_materialized"
+    with database.engine.begin() as conn:
+        if database.recommend_view_kind(conn) != "m":
+            return "not_materialized"
+        if not conn.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": _ADVISORY_KEY}).scalar():
+            return "busy"
+        conn.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY recommend_view"))
+    return "refreshed"
+
+
+class ViewRefresher:
+    """갱신 요청을 지연 시간 동안 합쳐 한 번만 갱신한다(갱신 중 들어온 요청은 다음 회차로).
+
+    실패하면 간격을 늘려 가며 최대 MF_VIEW_REFRESH_MAX_RETRIES번 재시도하고, 그래도 안 되면 포기한다
+    (다음 리뷰 쓰기가 다시 시도한다).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._running = False
+        self._pending = 0
+        self._runs = 0
+        self._skips = 0
+        self._failures = 0
+        self._gave_up = 0
+        self._last_finished_at: Optional[float] = None
+        self._last_duration_sec: Optional[float] = None
+        self._last_error: Optional[str] = None
+
+    def request(self, reason: str = "") -> bool:
+        if not database.recommend_view_materialized():
+            return False
+        with self._lock:
+            self._pending += 1
+            if self._timer is None and not self._running:
+                self._schedule_locked()
+        return True
+
+    def _schedule_locked(self, delay: Optional[float] = None):
+        timer = threading.Timer(_delay_seconds() if delay is None else delay, self._run)
+        timer.daemon = True
+        self._timer = timer
+        timer.start()
+
+    def _run(self):
+        with self._lock:
+            self._timer = None
+            if not self._pending:
+                return
+            writes, self._pending = self._pending, 0
+            self._running = True
+
+        started = time.perf_counter()
+        result = "failed"
+        error: Optional[str] = None
+        try:
+            result = refresh()
+        except Exception as exc:
+            error = str(exc)
+            logger.warning("recommend_view refresh failed: %s", exc)
+
+        with self._lock:
+            self._running = False
+            delay: Optional[float] = None
+            if result == "refreshed":
+                self._runs += 1
+                self._failures = 0
+                self._last_finished_at = time.time()
+                self._last_duration_sec = time.perf_counter() - started
+                self._last_error = None
+                logger.info("recommend_view refreshed writes=%d in %.2fs", writes, self._last_duration_sec)
+            elif result == "busy":
+                # 다른 워커의 갱신이 이번 쓰기 커밋 전에 시작됐을 수 있으니 다음 회차에 다시
+                self._skips += 1
+                self._pending += writes
+            elif result == "failed":
+                self._failures += 1
+                self._last_error = error
+                if self._failures > _max_retries():
+                    # 뷰 삭제, 고유 인덱스 없음, 권한 등 영구 오류일 수 있어 더 재시도하지 않는다
+                    logger.error(
+                        "recommend_view refresh gave up after %d failures (writes=%d): %s",
+                        self._failures, writes + self._pending, error,
+                    )
+                    self._gave_up += 1
+                    self._failures = 0
+                    self._pending = 0
+                else:
+                    self._pending += writes
+                    delay = max(_delay_seconds(), 1.0) * (2 ** self._failures)
+            if self._pending and self._timer is None:
+                self._schedule_locked(delay)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "materialized": database.recommend_view_materialized(),
+                "pending_writes": self._pending,
+                "running": self._running,
+                "runs": self._runs,
+                "skips": self._skips,
+                "consecutive_failures": self._failures,
+                "gave_up": self._gave_up,
+                "last_finished_at": self._last_finished_at,
+                "last_duration_sec": self._last_duration_sec,
+                "last_error": self._last_error,
+            }
+
+
+_REFRESHER = ViewRefresher()
+
+
+def request_refresh(reason: str = "") -> bool:
+    """리뷰 쓰기 커밋 이후 호출(즉시 반환)."""
+    return _REFRESHER.request(reason)
+
+
+def status() -> Dict[str, Any]:
+    return _REFRESHER.status()
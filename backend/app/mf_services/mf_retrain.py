@@ -0,0 +1,187 @@
+"""MF 재학습 스케줄러(디바운스 + 별도 프로세스 학습)."""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from . import mf_precompute, mf_services
+
+logger = logging.getLogger(__name__)
+
+RETRAIN_WINDOW_SEC = 30.0
+
+
+def _window_seconds() -> float:
+    """트리거를 하나의 학습으로 묶는 시간(초)."""
+    try:
+        return max(0.0, float(os.getenv("MF_RETRAIN_WINDOW_SEC", str(RETRAIN_WINDOW_SEC))))
+    except ValueError:
+        return RETRAIN_WINDOW_SEC
+
+
+def _worker_mode() -> str:
+    """학습 실행 위치(process/thread)."""
+    return os.getenv("MF_RETRAIN_WORKER", "process").lower()
+
+
+def _run_training() -> Dict[str, Any]:
+    """워커 프로세스에서 실행되는 학습 함수."""
+    started = time.perf_counter()
+    summary = mf_services._train_from_source()
+    summary["duration_sec"] = time.perf_counter() - started
+    return summary
+
+
+class RetrainScheduler:
+    """재학습 요청을 윈도우 단위로 합쳐 한 번만 학습한다.
+
+    학습은 별도 워커에서 돌고, 새 모델이 저장될 때까지 기존 모델 캐시는 그대로 사용된다.
+    """
+
+    def __init__(self, window_sec: Optional[float] = None):
+        self._window_sec = window_sec
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._executor: Optional[Executor] = None
+        self._future: Optional[Future] = None
+        self._pending: List[str] = []
+        self._running_reasons: List[str] = []
+        self._runs = 0
+        self._failures = 0
+        self._last_started_at: Optional[float] = None
+        self._last_finished_at: Optional[float] = None
+        self._last_duration_sec: Optional[float] = None
+        self._last_error: Optional[str] = None
+        self._closed = False
+
+    def window_seconds(self) -> float:
+        return self._window_sec if self._window_sec is not None else _window_seconds()
+
+    def trigger(self, reason: str = "") -> bool:
+        """재학습 요청 등록(즉시 반환)."""
+        with self._lock:
+            if self._closed:
+                return False
+            self._pending.append(reason or "unspecified")
+            if self._timer is None and self._future is None:
+                self._schedule_locked()
+        return True
+
+    def _schedule_locked(self):
+        timer = threading.Timer(self.window_seconds(), self._launch)
+        timer.daemon = True
+        self._timer = timer
+        timer.start()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if _worker_mode() == "thread":
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mf-retrain")
+            else:
+                # fork는 uvicorn 스레드/DB 커넥션을 복제하므로 spawn 사용
+                ctx = multiprocessing.get_context("spawn")
+                self._executor = ProcessPoolExecutor(max_workers=1, mp_context=ctx)
+        return self._executor
+
+    def _launch(self):
+        with self._lock:
+            self._timer = None
+            if self._closed or not self._pending or self._future is not None:
+                return
+            self._running_reasons = self._pending
+            self._pending = []
+            self._last_started_at = time.time()
+            try:
+                future = self._get_executor().submit(_run_training)
+            except Exception as exc:
+                # 워커 풀이 깨졌으면 새로 만들고 다음 윈도우에 재시도
+                logger.warning("MF retrain submit failed: %s", exc)
+                self._executor = None
+                self._pending = self._running_reasons + self._pending
+                self._running_reasons = []
+                self._schedule_locked()
+                return
+            self._future = future
+        future.add_done_callback(self._on_done)
+
+    def _on_done(self, future: Future):
+        error: Optional[BaseException] = future.exception()
+        if error is None:
+            # 새 모델을 먼저 읽은 뒤 교체하므로 읽는 쪽은 항상 완전한 모델을 본다
+            mf_services.reload_mf_model()
+            mf_precompute.request_refresh("model_publish")
+
+        with self._lock:
+            self._future = None
+            self._runs += 1
+            self._last_finished_at = time.time()
+            reasons = self._running_reasons
+            self._running_reasons = []
+            if error is None:
+                summary = future.result()
+                self._last_duration_sec = float(summary.get("duration_sec", 0.0))
+                self._last_error = None
+                logger.info(
+                    "MF retrain done in %.2fs (triggers=%d)", self._last_duration_sec, len(reasons)
+                )
+            else:
+                self._failures += 1
+                self._last_duration_sec = self._last_finished_at - (self._last_started_at or self._last_finished_at)
+                self._last_error = str(error)
+                logger.warning(
+                    "MF retrain failed: %s (reasons=%s)", error, ",".join(sorted(set(reasons))), exc_info=error
+                )
+            if self._pending and not self._closed:
+                self._schedule_locked()
+
+    def status(self) -> Dict[str, Any]:
+        """큐 길이, 마지막 학습 시간, 모델 나이."""
+        with self._lock:
+            pending = len(self._pending)
+            running = self._future is not None
+            return {
+                "window_sec": self.window_seconds(),
+                "queue_depth": pending,
+                "running": running,
+                "running_triggers": len(self._running_reasons),
+                "runs": self._runs,
+                "failures": self._failures,
+                "last_started_at": self._last_started_at,
+                "last_finished_at": self._last_finished_at,
+                "last_train_duration_sec": self._last_duration_sec,
+                "last_error": self._last_error,
+                "model_age_sec": mf_services.model_age_seconds(),
+            }
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            executor = self._executor
+            self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_SCHEDULER = RetrainScheduler()
+
+
+def get_scheduler() -> RetrainScheduler:
+    return _SCHEDULER
+
+
+def trigger(reason: str = "") -> bool:
+    return _SCHEDULER.trigger(reason)
+
+
+def status() -> Dict[str, Any]:
+    return _SCHEDULER.status()
+
+
+def shutdown():
+    _SCHEDULER.shutdown()
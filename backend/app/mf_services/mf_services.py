@@ -1,14 +1,20 @@
 """MF 학습/예측 유틸리티(CSV/DB 입력, numpy SGD)."""
 import csv
+import logging
 import os
 import runpy
+import time
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
 import numpy as np
+from sqlalchemy import text
 
 import database
 import models
+from . import mf_ann, mf_engines, mf_quant, mf_store
+
+logger = logging.getLogger(__name__)
 
 # 모델 캐시(프로세스 단위)
 _MODEL_CACHE: Optional[Dict[str, np.ndarray]] = None
@@ -16,88 +22,177 @@ _MODEL_CACHE: Optional[Dict[str, np.ndarray]] = None
 
 def _load_ratings(csv_path: str) -> List[Tuple[int, int, float]]:
     """ratings.csv에서 (member_id, product_id, rating) 로드."""
-    ratings: List[Tuple[int, int, float]] = []
     with open(csv_path, "r", encoding="utf-8-sig") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                member_id_raw = row.get("member_id") or row.get("\ufeffmember_id")
-                product_id = row.get("product_id")
-                rating = row.get("rating")
-                if member_id_raw is None or product_id is None or rating is None:
-                    continue
-                member_id_raw = str(member_id_raw).strip()
-                if member_id_raw.lower().startswith("u") and member_id_raw[1:].isdigit():
-                    member_id = int(member_id_raw[1:])
-                else:
-                    member_id = int(member_id_raw)
-                product_id = int(product_id)
-                rating = float(rating)
-            except (ValueError, TypeError):
+        return _parse_rating_rows(csv.DictReader(f))
+
+
+def _parse_rating_rows(reader: Iterable[Dict[str, str]]) -> List[Tuple[int, int, float]]:
+    """csv.DictReader 행들을 (member_id, product_id, rating)로 변환(잘못된 행은 건너뜀)."""
+    ratings: List[Tuple[int, int, float]] = []
+    for row in reader:
+        try:
+            member_id_raw = row.get("member_id") or row.get("\ufeffmember_id")
+            product_id = row.get("product_id")
+            rating = row.get("rating")
+            if member_id_raw is None or product_id is None or rating is None:
                 continue
-            ratings.append((member_id, product_id, rating))
+            member_id_raw = str(member_id_raw).strip()
+            if member_id_raw.lower().startswith("u") and member_id_raw[1:].isdigit():
+                member_id = int(member_id_raw[1:])
+            else:
+                member_id = int(member_id_raw)
+            product_id = int(product_id)
+            rating = float(rating)
+        except (ValueError, TypeError):
+            continue
+        ratings.append((member_id, product_id, rating))
     return ratings
 
 
-def _load_ratings_from_db() -> List[Tuple[int, int, float]]:
-    ratings: Dict[Tuple[int, int], float] = {}
+def _interaction_weights() -> Dict[str, float]:
+    """상호작용 -> 의사 평점 가중치 설정."""
     review_weight = float(os.getenv("MF_REVIEW_WEIGHT", "10.0"))
-    review_weight = max(0.0, review_weight)
-    wishlist_score = float(os.getenv("MF_WISHLIST_RATING", "5.0"))
-    order_score = float(os.getenv("MF_ORDER_RATING", "8.0"))
     dummy_weight = float(os.getenv("MF_DUMMY_WEIGHT", "0.1"))
-    dummy_weight = max(0.0, dummy_weight)
-    with database.SessionLocal() as session:
-        review_rows = (
-            session.query(models.ProductReview.member_id, models.ProductReview.product_id, models.ProductReview.rating)
-            .filter(models.ProductReview.member_id.isnot(None))
-            .filter(models.ProductReview.product_id.isnot(None))
-            .all()
-        )
-        for mid, pid, rating in review_rows:
-            try:
-                is_dummy = 1 <= int(mid) <= 100
-                weight = dummy_weight if is_dummy else 1.0
-                key = (int(mid), int(pid))
-                ratings[key] = max(
-                    ratings.get(key, 0.0),
-                    float(rating) * review_weight * weight,
-                )
-            except (TypeError, ValueError):
-                continue
+    return {
+        "review_weight": max(0.0, review_weight),
+        "wishlist_score": float(os.getenv("MF_WISHLIST_RATING", "5.0")),
+        "order_score": float(os.getenv("MF_ORDER_RATING", "8.0")),
+        "dummy_weight": max(0.0, dummy_weight),
+    }
 
-        wishlist_rows = (
-            session.query(models.Wishlist.member_id, models.Wishlist.product_id)
-            .filter(models.Wishlist.member_id.isnot(None))
-            .filter(models.Wishlist.product_id.isnot(None))
-            .all()
-        )
-        for mid, pid in wishlist_rows:
-            try:
-                is_dummy = 1 <= int(mid) <= 100
-                weight = dummy_weight if is_dummy else 1.0
-                key = (int(mid), int(pid))
-                ratings[key] = max(ratings.get(key, 0.0), wishlist_score*weight)
-            except (TypeError, ValueError):
-                continue
 
-        order_rows = (
-            session.query(models.Order.member_id, models.OrderDetail.product_id)
-            .join(models.OrderDetail, models.Order.id == models.OrderDetail.order_id)
-            .filter(models.Order.member_id.isnot(None))
-            .filter(models.OrderDetail.product_id.isnot(None))
-            .all()
-        )
-        for mid, pid in order_rows:
-            try:
-                is_dummy = 1 <= int(mid) <= 100
-                weight = dummy_weight if is_dummy else 1.0
-                key = (int(mid), int(pid))
-                ratings[key] = max(ratings.get(key, 0.0), order_score*weight)
-            except (TypeError, ValueError):
-                continue
+def _implicit_weights() -> Dict[str, float]:
+    """암시적 엔진(ials)용 상호작용 -> 신뢰도 강도(쌍별 합산). 리뷰는 평점/5를 곱한다."""
+    return {
+        "review_confidence": max(0.0, float(os.getenv("MF_IMPLICIT_REVIEW", "1.0"))),
+        "wishlist_confidence": max(0.0, float(os.getenv("MF_IMPLICIT_WISHLIST", "1.0"))),
+        "order_confidence": max(0.0, float(os.getenv("MF_IMPLICIT_ORDER", "2.0"))),
+    }
+
+
+# 리뷰/위시/주문을 한 번에 의사 평점으로 바꾸고 (회원, 상품)별 최대값만 남김.
+# 같은 쌍의 암시적 신뢰도 강도(주문은 횟수만큼 누적)도 함께 계산
+_RATINGS_SQL = """
+SELECT member_id, product_id,
+       CAST(GREATEST(MAX(score), 0) AS DOUBLE PRECISION) AS score,
+       CAST(SUM(confidence) AS DOUBLE PRECISION) AS confidence
+FROM (
+    SELECT r.member_id, r.product_id,
+           r.rating * :review_weight
+             * CASE WHEN r.member_id BETWEEN 1 AND 100 THEN :dummy_weight ELSE 1.0 END AS score,
+           GREATEST(r.rating, 0) / 5.0 * :review_confidence
+             * CASE WHEN r.member_id BETWEEN 1 AND 100 THEN :dummy_weight ELSE 1.0 END AS confidence
+    FROM product_review r
+    WHERE r.member_id IS NOT NULL AND r.product_id IS NOT NULL {review_filter}
+    UNION ALL
+    SELECT w.member_id, w.product_id,
+           :wishlist_score
+             * CASE WHEN w.member_id BETWEEN 1 AND 100 THEN :dummy_weight ELSE 1.0 END AS score,
+           :wishlist_confidence
+             * CASE WHEN w.member_id BETWEEN 1 AND 100 THEN :dummy_weight ELSE 1.0 END AS confidence
+    FROM wishlist w
+    WHERE w.member_id IS NOT NULL AND w.product_id IS NOT NULL {wishlist_filter}
+    UNION ALL
+    SELECT o.member_id, d.product_id,
+           :order_score
+             * CASE WHEN o.member_id BETWEEN 1 AND 100 THEN :dummy_weight ELSE 1.0 END AS score,
+           :order_confidence
+             * CASE WHEN o.member_id BETWEEN 1 AND 100 THEN :dummy_weight ELSE 1.0 END AS confidence
+    FROM "order" o
+    JOIN order_detail d ON d.order_id = o.id
+    WHERE o.member_id IS NOT NULL AND d.product_id IS NOT NULL {order_filter}
+) interactions
+GROUP BY member_id, product_id
+ORDER BY member_id, product_id
+"""
+
+
+def _load_chunk_rows() -> int:
+    try:
+        return max(1000, int(os.getenv("MF_LOAD_CHUNK_ROWS", "50000")))
+    except ValueError:
+        return 50000
+
+
+def _load_interactions_from_db(
+    member_id: Optional[int] = None, member_ids: Optional[Sequence[int]] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """리뷰/위시/주문을 (member_ids, product_ids, scores, confidences) 배열로 로드.
+
+    member_id(한 명) 또는 member_ids(여러 명)를 주면 해당 회원만 읽는다.
+
+    가중치 계산과 MAX/SUM 집계는 SQL 한 문장에서 끝내고, 결과는 fetch_array로 청크 단위로 받는다.
+    """
+    weights = _interaction_weights()
+    params = {
+        "review_weight": weights["review_weight"],
+        "wishlist_score": weights["wishlist_score"],
+        "order_score": weights["order_score"],
+        "dummy_weight": weights["dummy_weight"],
+        **_implicit_weights(),
+    }
+    filters = {"review_filter": "", "wishlist_filter": "", "order_filter": ""}
+    if member_id is not None:
+        params["member_id"] = int(member_id)
+        filters = {
+            "review_filter": "AND r.member_id = :member_id",
+            "wishlist_filter": "AND w.member_id = :member_id",
+            "order_filter": "AND o.member_id = :member_id",
+        }
+    elif member_ids is not None:
+        params["member_ids"] = [int(mid) for mid in member_ids]
+        filters = {
+            "review_filter": "AND r.member_id = ANY(:member_ids)",
+            "wishlist_filter": "AND w.member_id = ANY(:member_ids)",
+            "order_filter": "AND o.member_id = ANY(:member_ids)",
+        }
+
+    data = fetch_array(_RATINGS_SQL.format(**filters), params, columns=4, dtype=np.float64)
+    return data[:, 0].astype(np.int64), data[:, 1].astype(np.int64), data[:, 2].copy(), data[:, 3].copy()
+
 
-    return [(mid, pid, score) for (mid, pid), score in ratings.items()]
+def _load_ratings_from_db(
+    member_id: Optional[int] = None, implicit: bool = False
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(member_ids, product_ids, values). 값은 쌍별 최대 의사 평점, implicit=True면 신뢰도 강도."""
+    users, items, scores, confidences = _load_interactions_from_db(member_id)
+    return users, items, confidences if implicit else scores
+
+
+def fetch_array(sql: str, params: Dict, columns: int, dtype=np.float64) -> np.ndarray:
+    """숫자 열만 있는 쿼리 결과를 (행 수 x columns) numpy 배열로 로드.
+
+    SQLAlchemy Row -> numpy 변환이 병목이라 DBAPI 이름 있는(서버 사이드) 커서에서 튜플을 바로 받아
+    버퍼(부족하면 두 배로 확장)에 MF_LOAD_CHUNK_ROWS 단위로 채운다.
+    """
+    chunk_rows = _load_chunk_rows()
+    capacity = chunk_rows
+    out = np.empty((capacity, columns), dtype=dtype)
+    size = 0
+    compiled = text(sql).compile(dialect=database.engine.dialect)
+    raw = database.engine.raw_connection()
+    try:
+        cursor = raw.cursor(name="mf_fetch")
+        cursor.itersize = chunk_rows
+        cursor.execute(str(compiled), params)
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            end = size + len(rows)
+            if end > capacity:
+                # 버퍼가 모자라면 두 배로 늘림(전체 복사는 로그 횟수만 발생)
+                capacity = max(end, capacity * 2)
+                grown = np.empty((capacity, columns), dtype=dtype)
+                grown[:size] = out[:size]
+                out = grown
+            out[size:end] = rows
+            size = end
+        cursor.close()
+        raw.rollback()
+    finally:
+        raw.close()
+    return out[:size]
 
 
 def _train_source() -> str:
@@ -227,8 +322,75 @@ def _train_biased_mf(
     }
 
 
+def _engine_name() -> str:
+    """학습 엔진(sgd/minibatch/als/ials)."""
+    return os.getenv("MF_ENGINE", "sgd").lower()
+
+
+def _engine_reg(engine: str, reg: float) -> float:
+    """엔진별 정규화 기본값. ALS-WR/iALS 정규화는 SGD의 샘플당 reg와 스케일이 달라 별도 값 사용."""
+    if engine == "als":
+        return float(os.getenv("MF_ALS_REG", "0.1"))
+    if engine == "ials":
+        return mf_engines._ials_reg()
+    return reg
+
+
+def _train_model(
+    ratings,
+    factors: int,
+    epochs: int,
+    lr: float,
+    reg: float,
+    seed: int,
+    center_user: bool,
+    engine_name: Optional[str] = None,
+):
+    """engine_name(기본: MF_ENGINE) 엔진으로 학습(결과 dict 형식은 동일). reg는 그대로 쓴다(기본값은 _engine_reg)."""
+    engine = mf_engines.get_engine(engine_name or _engine_name())
+    if engine is None:
+        if isinstance(ratings, tuple):
+            users, items, values = ratings
+            ratings = list(zip(users.tolist(), items.tolist(), values.tolist()))
+        return _train_biased_mf(ratings, factors, epochs, lr, reg, seed, center_user)
+    return engine(ratings, factors, epochs, lr, reg, seed, center_user)
+
+
+def _model_path() -> str:
+    """구버전 단일 npz 경로(버전 저장소가 비어 있을 때만 읽음)."""
+    return os.getenv(
+        "MF_MODEL_PATH",
+        str(Path(__file__).resolve().parent / "mf_model.npz"),
+    )
+
+
+def _save_model(result, engine: Optional[str] = None) -> str:
+    """새 모델 버전을 저장소에 공개하고 이 프로세스 캐시도 교체. 버전 디렉터리 경로 반환.
+
+    engine은 메타데이터에 기록할 엔진 이름(기본: MF_ENGINE).
+    """
+    if mf_ann.should_build(len(result["item_ids"])):
+        # 큰 카탈로그면 근사 검색 인덱스도 같은 버전에 함께 저장
+        result = {**result, **mf_ann.build_index(result["item_factors"], result["item_bias"])}
+    # 요인 행렬은 MF_FACTOR_DTYPE(float16/int8)로 줄여 저장할 수 있다(점수 계산 시 청크 단위 역양자화)
+    factor_dtype = mf_quant.factor_dtype()
+    result = mf_quant.quantize_result(result, factor_dtype)
+    version = mf_store.publish(
+        result,
+        meta={
+            "engine": engine or _engine_name(),
+            "rmse": float(result.get("rmse", 0.0)),
+            "factor_dtype": factor_dtype,
+        },
+    )
+    reload_mf_model()
+    return str(mf_store.version_path(version))
+
+
 def train_from_csv():
     """CSV 기반 학습 및 모델 저장."""
+    from . import mf_snapshot
+
     ratings_csv = os.getenv(
         "RATINGS_CSV_PATH",
         str((Path(__file__).resolve().parents[1] / "data" / "ratings.csv")),
@@ -236,40 +398,23 @@ def train_from_csv():
     factors = int(os.getenv("MF_FACTORS", "24"))
     epochs = int(os.getenv("MF_EPOCHS", "50"))
     lr = float(os.getenv("MF_LR", "0.01"))
-    reg = float(os.getenv("MF_REG", "0.01"))
+    reg = _engine_reg(_engine_name(), float(os.getenv("MF_REG", "0.01")))
     seed = int(os.getenv("MF_SEED", "42"))
 
-    ratings = _load_ratings(ratings_csv)
-    if not ratings:
+    ratings = mf_snapshot.load_csv(ratings_csv)
+    if not len(ratings[0]):
         raise RuntimeError("No ratings found in ratings.csv.")
 
     center_user = os.getenv("MF_CENTER_USER", "false").lower() in {"1", "true", "yes"}
     # 권장 튜닝: MF_FACTORS=64, MF_LR=0.005~0.02, MF_REG=0.01~0.05.
-    result = _train_biased_mf(ratings, factors, epochs, lr, reg, seed, center_user)
+    result = _train_model(ratings, factors, epochs, lr, reg, seed, center_user)
 
-    model_path = os.getenv(
-        "MF_MODEL_PATH",
-        str(Path(__file__).resolve().parent / "mf_model.npz"),
-    )
-    np.savez(
-        model_path,
-        user_factors=result["user_factors"],
-        item_factors=result["item_factors"],
-        user_bias=result["user_bias"],
-        item_bias=result["item_bias"],
-        global_mean=result["global_mean"],
-        user_ids=result["user_ids"],
-        item_ids=result["item_ids"],
-        user_mean=result["user_mean"],
-        center_user=np.array(int(result["center_user"]), dtype=np.int8),
-    )
-    global _MODEL_CACHE
-    _MODEL_CACHE = None
+    model_path = _save_model(result)
 
     return {
         "num_users": len(result["user_ids"]),
         "num_items": len(result["item_ids"]),
-        "num_ratings": len(ratings),
+        "num_ratings": len(ratings[0]),
         "rmse": result["rmse"],
         "user_bias_std": float(np.std(result["user_bias"])),
         "item_bias_std": float(np.std(result["item_bias"])),
@@ -279,42 +424,27 @@ def train_from_csv():
 
 def train_from_db():
     """DB 기반 학습 및 모델 저장"""
+    from . import mf_snapshot
+
     factors = int(os.getenv("MF_FACTORS", "24"))
     epochs = int(os.getenv("MF_EPOCHS", "60"))
     lr = float(os.getenv("MF_LR", "0.01"))
-    reg = float(os.getenv("MF_REG", "0.02"))
+    reg = _engine_reg(_engine_name(), float(os.getenv("MF_REG", "0.02")))
     seed = int(os.getenv("MF_SEED", "42"))
 
-    ratings = _load_ratings_from_db()
-    if not ratings:
+    ratings = mf_snapshot.load_db(implicit=mf_engines.is_implicit(_engine_name()))
+    if not len(ratings[0]):
         raise RuntimeError("No ratings found in DB.")
 
     center_user = os.getenv("MF_CENTER_USER", "false").lower() in {"1", "true", "yes"}
-    result = _train_biased_mf(ratings, factors, epochs, lr, reg, seed, center_user)
+    result = _train_model(ratings, factors, epochs, lr, reg, seed, center_user)
 
-    model_path = os.getenv(
-        "MF_MODEL_PATH",
-        str(Path(__file__).resolve().parent / "mf_model.npz"),
-    )
-    np.savez(
-        model_path,
-        user_factors=result["user_factors"],
-        item_factors=result["item_factors"],
-        user_bias=result["user_bias"],
-        item_bias=result["item_bias"],
-        global_mean=result["global_mean"],
-        user_ids=result["user_ids"],
-        item_ids=result["item_ids"],
-        user_mean=result["user_mean"],
-        center_user=np.array(int(result["center_user"]), dtype=np.int8),
-    )
-    global _MODEL_CACHE
-    _MODEL_CACHE = None
+    model_path = _save_model(result)
 
     return {
         "num_users": len(result["user_ids"]),
         "num_items": len(result["item_ids"]),
-        "num_ratings": len(ratings),
+        "num_ratings": len(ratings[0]),
         "rmse": result["rmse"],
         "user_bias_std": float(np.std(result["user_bias"])),
         "item_bias_std": float(np.std(result["item_bias"])),
@@ -329,16 +459,10 @@ def _train_from_source():
 
 
 def trigger_retrain(reason: str = "") -> bool:
-    """Synchronous retrain hook for user interactions."""
-    try:
-        train_from_db()
-        return True
-    except Exception as exc:
-        msg = f"MF retrain failed: {exc}"
-        if reason:
-            msg = f"{msg} (reason={reason})"
-        print(msg)
-        return False
+    """사용자 상호작용 재학습 훅(디바운스 후 백그라운드 학습, 즉시 반환)."""
+    from . import mf_retrain
+
+    return mf_retrain.trigger(reason)
 
 
 def _needs_dummy_seed() -> bool:
@@ -370,69 +494,134 @@ def run_mf_pipeline() -> Dict[str, str]:
     }
 
 
-def load_mf_model(_retry: bool = True) -> Optional[Dict[str, np.ndarray]]:
-    """모델 로드(캐시 적용)."""
-    global _MODEL_CACHE
-    if _MODEL_CACHE is not None:
-        return _MODEL_CACHE
+def _read_model(model_path: str) -> Dict[str, np.ndarray]:
+    """구버전 npz 모델 읽기."""
+    data = np.load(model_path, allow_pickle=False)
+    return {
+        "user_factors": data["user_factors"].astype(np.float32),
+        "item_factors": data["item_factors"].astype(np.float32),
+        "user_bias": data["user_bias"].astype(np.float32),
+        "item_bias": data["item_bias"].astype(np.float32),
+        "global_mean": float(data["global_mean"]),
+        "user_ids": data["user_ids"].astype(np.int64),
+        "item_ids": data["item_ids"].astype(np.int64),
+        "user_mean": data["user_mean"].astype(np.float32) if "user_mean" in data else None,
+        "center_user": bool(int(data["center_user"])) if "center_user" in data else False,
+        "version": f"npz:{os.path.getmtime(model_path)}",
+        "loaded_at": os.path.getmtime(model_path),
+    }
 
-    model_path = os.getenv(
-        "MF_MODEL_PATH",
-        str(Path(__file__).resolve().parent / "mf_model.npz"),
-    )
-    if not os.path.exists(model_path):
-        # 모델이 없으면 자동 학습 옵션으로 생성 시도
-        auto_train = os.getenv("MF_AUTO_TRAIN", "true").lower() in {"1", "true", "yes"}
-        if auto_train:
-            try:
-                _train_from_source()
-            except Exception:
-                return None
-        else:
-            return None
 
+def _check_interval() -> float:
+    """CURRENT 포인터 확인 주기(초). 다른 워커가 공개한 새 버전을 이 주기로 감지."""
     try:
-        data = np.load(model_path, allow_pickle=False)
-        user_ids = data["user_ids"].astype(np.int64)
-        item_ids = data["item_ids"].astype(np.int64)
-        _MODEL_CACHE = {
-            "user_factors": data["user_factors"].astype(np.float32),
-            "item_factors": data["item_factors"].astype(np.float32),
-            "user_bias": data["user_bias"].astype(np.float32),
-            "item_bias": data["item_bias"].astype(np.float32),
-            "global_mean": float(data["global_mean"]),
-            "user_ids": user_ids,
-            "item_ids": item_ids,
-            "user_index": {int(uid): idx for idx, uid in enumerate(user_ids)},
-            "item_index": {int(iid): idx for idx, iid in enumerate(item_ids)},
-            "user_mean": data["user_mean"].astype(np.float32) if "user_mean" in data else None,
-            "center_user": bool(int(data["center_user"])) if "center_user" in data else False,
-        }
-        return _MODEL_CACHE
-    except Exception:
-        # 로드 실패 시 자동 학습으로 재시도(옵션)
+        return max(0.0, float(os.getenv("MF_MODEL_CHECK_SEC", "2")))
+    except ValueError:
+        return 2.0
+
+
+_LAST_CHECK = 0.0
+
+
+def _open_current() -> Optional[Dict[str, np.ndarray]]:
+    version = mf_store.current_version()
+    if version is not None:
+        current = _MODEL_CACHE
+        if current is not None and current.get("version") == version:
+            return current
+        return mf_store.open_version(version)
+    model_path = _model_path()
+    if os.path.exists(model_path):
+        current = _MODEL_CACHE
+        if current is not None and current.get("version") == f"npz:{os.path.getmtime(model_path)}":
+            return current
+        return _read_model(model_path)
+    return None
+
+
+def load_mf_model(_retry: bool = True) -> Optional[Dict[str, np.ndarray]]:
+    """모델 로드(캐시 적용). 주기적으로 CURRENT를 확인해 새 버전이면 참조만 교체."""
+    global _MODEL_CACHE, _LAST_CHECK
+    model = _MODEL_CACHE
+    now = time.monotonic()
+    if model is not None and (now - _LAST_CHECK) < _check_interval():
+        return model
+    _LAST_CHECK = now
+
+    try:
+        loaded = _open_current()
+    except Exception as exc:
+        # 새 버전을 열지 못하면 기존 모델로 계속 서비스
+        if model is not None:
+            logger.warning("MF model reload failed: %s", exc, exc_info=True)
+            return model
+        loaded = None
+
+    if loaded is None:
+        # 모델이 없거나 읽기 실패 시 자동 학습 옵션으로 생성 시도
         auto_train = os.getenv("MF_AUTO_TRAIN", "true").lower() in {"1", "true", "yes"}
         if auto_train and _retry:
             try:
                 _train_from_source()
-                _MODEL_CACHE = None
+                _LAST_CHECK = 0.0
                 return load_mf_model(_retry=False)
             except Exception:
                 return None
         return None
 
+    _MODEL_CACHE = loaded
+    return loaded
+
+
+def reload_mf_model() -> Optional[Dict[str, np.ndarray]]:
+    """저장소의 현재 버전을 즉시 확인해 교체(실패 시 기존 모델 유지)."""
+    global _LAST_CHECK
+    _LAST_CHECK = 0.0
+    return load_mf_model(_retry=False)
+
+
+def model_age_seconds() -> Optional[float]:
+    """현재 공개된 모델의 나이(초)."""
+    version = mf_store.current_version()
+    try:
+        if version is not None:
+            return max(0.0, time.time() - os.path.getmtime(mf_store.version_path(version)))
+        return max(0.0, time.time() - os.path.getmtime(_model_path()))
+    except OSError:
+        return None
+
+
+def user_position(model: Dict[str, np.ndarray], member_id: int) -> Optional[int]:
+    """정렬된 user_ids에서 회원 위치(없으면 None)."""
+    user_ids = model["user_ids"]
+    pos = int(np.searchsorted(user_ids, int(member_id)))
+    if pos < len(user_ids) and int(user_ids[pos]) == int(member_id):
+        return pos
+    return None
+
+
+def item_positions(model: Dict[str, np.ndarray], product_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """정렬된 item_ids에서 상품 위치 배열과 존재 여부 마스크."""
+    item_ids = model["item_ids"]
+    product_ids = np.asarray(product_ids, dtype=np.int64)
+    if not len(item_ids):
+        return np.zeros(len(product_ids), dtype=np.int64), np.zeros(len(product_ids), dtype=bool)
+    positions = np.minimum(np.searchsorted(item_ids, product_ids), len(item_ids) - 1)
+    return positions, item_ids[positions] == product_ids
+
 
 def predict_score(model: Dict[str, np.ndarray], member_id: int, product_id: int) -> Optional[float]:
     """단일 유저-상품 점수 예측."""
-    user_index = model["user_index"].get(int(member_id))
-    item_index = model["item_index"].get(int(product_id))
-    if user_index is None or item_index is None:
+    user_index = user_position(model, member_id)
+    positions, valid = item_positions(model, np.array([product_id]))
+    if user_index is None or not valid[0]:
         return None
+    item_index = int(positions[0])
 
     user_bias = float(model["user_bias"][user_index])
     item_bias = float(model["item_bias"][item_index])
-    user_factors = model["user_factors"][user_index]
-    item_factors = model["item_factors"][item_index]
+    user_factors = mf_quant.rows(model, "user_factors", user_index)
+    item_factors = mf_quant.rows(model, "item_factors", item_index)
     global_mean = float(model["global_mean"])
     base = global_mean + user_bias + item_bias + float(np.dot(user_factors, item_factors))
     if model.get("center_user") and model.get("user_mean") is not None:
@@ -440,6 +629,51 @@ def predict_score(model: Dict[str, np.ndarray], member_id: int, product_id: int)
     return base
 
 
+def score_items(model: Dict[str, np.ndarray], user_index: int) -> np.ndarray:
+    """한 유저의 전체 아이템 점수(item_factors 행렬-벡터 곱 + 편향), model["item_ids"] 순서."""
+    user_mean = 0.0
+    if model.get("center_user") and model.get("user_mean") is not None:
+        user_mean = float(model["user_mean"][user_index])
+    return score_vector(
+        model,
+        mf_quant.rows(model, "user_factors", user_index),
+        float(model["user_bias"][user_index]),
+        user_mean,
+    )
+
+
+def score_vector(
+    model: Dict[str, np.ndarray],
+    user_vector: np.ndarray,
+    user_bias: float,
+    user_mean: float = 0.0,
+    positions: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """임의의 유저 벡터(fold-in 포함)로 아이템 점수 계산. positions를 주면 해당 아이템만."""
+    scores = mf_quant.matvec(model, "item_factors", user_vector, positions)
+    if positions is None:
+        scores += model["item_bias"]
+    else:
+        scores += model["item_bias"][positions]
+    scores += np.float32(float(model["global_mean"]) + user_bias + user_mean)
+    return scores
+
+
+def score_matrix(
+    model: Dict[str, np.ndarray],
+    user_vectors: np.ndarray,
+    user_offsets: np.ndarray,
+) -> np.ndarray:
+    """여러 유저의 전체 아이템 점수를 행렬곱 한 번으로 계산((유저 수 x 아이템 수)).
+
+    user_offsets는 유저별 user_bias + user_mean.
+    """
+    scores = mf_quant.matmul_t(model, "item_factors", user_vectors)
+    scores += model["item_bias"]
+    scores += (float(model["global_mean"]) + np.asarray(user_offsets, dtype=np.float64)).astype(np.float32)[:, None]
+    return scores
+
+
 def model_summary() -> Dict[str, float]:
     """Basic model stats."""
     model = load_mf_model()
@@ -451,6 +685,9 @@ def model_summary() -> Dict[str, float]:
         "num_users": float(len(model.get("user_ids", []))),
         "num_items": float(len(model.get("item_ids", []))),
         "center_user": float(1 if model.get("center_user") else 0),
+        "version": model.get("version"),
+        "factor_dtype": mf_quant.storage_dtype(model),
+        "factor_mb": mf_quant.factor_bytes(model) / (1024.0 * 1024.0),
     }
 
     return summary
@@ -471,12 +708,48 @@ def _sanity_check(model: Dict[str, np.ndarray]):
         print(f"user={uid} item={iid} score={score:.4f}" if score is not None else "score=None")
 
 
+def _compare_engines() -> List[Dict[str, float]]:
+    """ratings.csv로 엔진별 학습 시간/검증 RMSE 비교."""
+    ratings_csv = os.getenv(
+        "RATINGS_CSV_PATH",
+        str((Path(__file__).resolve().parents[1] / "data" / "ratings.csv")),
+    )
+    factors = int(os.getenv("MF_FACTORS", "24"))
+    epochs = int(os.getenv("MF_EPOCHS", "50"))
+    lr = float(os.getenv("MF_LR", "0.01"))
+    reg = float(os.getenv("MF_REG", "0.01"))
+    seed = int(os.getenv("MF_SEED", "42"))
+    ratings = _load_ratings(ratings_csv)
+
+    rows = []
+    for name in mf_engines.available_engines():
+        if mf_engines.is_implicit(name):
+            # 암시적 엔진의 rmse는 평점 RMSE가 아니라 비교 대상이 아님(순위 비교는 mf_experiment bench)
+            continue
+        started = time.perf_counter()
+        result = _train_model(ratings, factors, epochs, lr, _engine_reg(name, reg), seed, False, engine_name=name)
+        rows.append({"engine": name, "seconds": time.perf_counter() - started, "rmse": result["rmse"]})
+    base = rows[0]["seconds"]
+    for row in rows:
+        row["speedup"] = base / row["seconds"] if row["seconds"] > 0 else 0.0
+    return rows
+
+
 def main():
     import argparse
 
     parser = argparse.ArgumentParser()
-    parser.add_argument("command", choices=["train", "sanity", "summary"])
-    args = parser.parse_args()
+    parser.add_argument("command", choices=["train", "sanity", "summary", "engines", "sweep"])
+    args, rest = parser.parse_known_args()
+
+    if args.command == "sweep":
+        # 탐색 옵션은 mf_sweep에서 해석(학습/서빙 경로는 multiprocessing을 import하지 않도록 지연 로드)
+        from . import mf_sweep
+
+        mf_sweep.main(rest)
+        return
+    if rest:
+        parser.error(f"unrecognized arguments: {' '.join(rest)}")
 
     if args.command == "train":
         summary = _train_from_source()
@@ -489,7 +762,16 @@ def main():
             f"user_bias_std={summary['user_bias_std']:.4f}",
             f"item_bias_std={summary['item_bias_std']:.4f}",
             f"model_path={summary['model_path']}",
+            f"engine={_engine_name()}",
         )
+    elif args.command == "engines":
+        for row in _compare_engines():
+            print(
+                f"engine={row['engine']}",
+                f"seconds={row['seconds']:.3f}",
+                f"val_rmse={row['rmse']:.4f}",
+                f"speedup={row['speedup']:.1f}x",
+            )
     elif args.command == "sanity":
         model = load_mf_model()
         if not model:
@@ -0,0 +1,328 @@
+"""MF 학습 입력 스냅샷(모델 저장소 옆 snapshot-<source>/ 에 열 단위 .npy로 보관).
+
+DB: (회원, 상품)별 의사 평점/신뢰도를 회원, 상품 순으로 저장하고 워터마크(적재 시작 시각)를 기록한다.
+재학습 때는 워터마크 이후 리뷰/위시/주문이 생긴 회원만 다시 집계해 그 회원의 행을 교체한다.
+삭제(위시 해제 등)는 시각이 남지 않으므로 이벤트 경로(mf_events)가 회원을 dirty로 표시해 다음 증분에서
+그 회원 행을 교체하고, 이벤트를 거치지 않은 삭제는 MF_SNAPSHOT_MAX_AGE_HOURS마다 전체를 다시 만들어 반영한다.
+CSV: 파일 뒤에 덧붙여지기만 했으면 이전에 읽은 바이트 이후만 파싱해 붙인다.
+"""
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import text
+
+import database
+from . import mf_engines, mf_services, mf_store
+
+logger = logging.getLogger(__name__)
+
+# 저장 형식이 바뀌면 올려서 기존 스냅샷을 전체 재적재
+SNAPSHOT_FORMAT = 1
+COLUMNS = {
+    "member_ids": np.int32,
+    "product_ids": np.int32,
+    "values": np.float32,
+    "confidence": np.float32,
+}
+META_NAME = "meta.json"
+# CSV가 통째로 바뀌었는지 확인할 때 비교하는 앞부분 크기
+_HEAD_BYTES = 65536
+
+# 워터마크 이후 상호작용이 생긴 회원. 리뷰는 수정(평점 변경)도 잡도록 updated_at 기준
+# (ORM 쓰기는 server_default/onupdate로 항상 채워지고, 시각 없이 대량 적재하면 invalidate() 호출)
+_CHANGED_MEMBERS_SQL = """
+SELECT member_id FROM product_review WHERE member_id IS NOT NULL AND updated_at >= :since
+UNION
+SELECT member_id FROM wishlist WHERE member_id IS NOT NULL AND created_at >= :since
+UNION
+SELECT member_id FROM "order" WHERE member_id IS NOT NULL AND created_at >= :since
+"""
+
+
+def _enabled() -> bool:
+    return os.getenv("MF_SNAPSHOT_ENABLED", "true").lower() not in {"0", "false", "no"}
+
+
+def _max_age_seconds() -> float:
+    """이 시간이 지나면 증분 대신 전체 재적재(삭제 반영)."""
+    try:
+        return max(0.0, float(os.getenv("MF_SNAPSHOT_MAX_AGE_HOURS", "24"))) * 3600.0
+    except ValueError:
+        return 24 * 3600.0
+
+
+def _overlap_seconds() -> float:
+    """워터마크보다 이만큼 앞에서부터 다시 확인(워터마크 이전에 시작해 늦게 커밋된 트랜잭션 대비)."""
+    try:
+        return max(0.0, float(os.getenv("MF_SNAPSHOT_OVERLAP_SEC", "600")))
+    except ValueError:
+        return 600.0
+
+
+def snapshot_dir(source: str) -> Path:
+    return mf_store.store_dir() / f"snapshot-{source}"
+
+
+def _dirty_dir() -> Path:
+    """다음 증분에서 다시 집계할 회원 표시(회원 id 이름의 빈 파일, 워커/학습 프로세스가 함께 본다)."""
+    return mf_store.store_dir() / "snapshot-db-dirty"
+
+
+def mark_dirty(member_id: int):
+    """쓰기 경로(커밋 이후)에서 호출: 워터마크로 잡히지 않는 변경(삭제 등)도 다음 증분에 반영."""
+    if not _enabled():
+        return
+    try:
+        path = _dirty_dir()
+        path.mkdir(parents=True, exist_ok=True)
+        (path / str(int(member_id))).touch()
+    except OSError as exc:
+        logger.warning("MF snapshot mark dirty failed member_id=%s: %s", member_id, exc)
+
+
+def _dirty_members() -> Tuple[np.ndarray, list]:
+    """표시된 회원 id와 표시 파일(처리 후 지울 것만; 그 뒤에 표시된 회원은 다음 회차에)."""
+    try:
+        paths = [p for p in _dirty_dir().iterdir() if p.name.isdigit()]
+    except OSError:
+        return np.zeros(0, dtype=np.int64), []
+    return np.array([int(p.name) for p in paths], dtype=np.int64), paths
+
+
+def _clear_dirty(paths: list):
+    for path in paths:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+def _read(source: str) -> Optional[Tuple[Dict[str, np.ndarray], Dict[str, Any]]]:
+    path = snapshot_dir(source)
+    try:
+        meta = json.loads((path / META_NAME).read_text(encoding="utf-8"))
+        if meta.get("format") != SNAPSHOT_FORMAT:
+            return None
+        arrays = {key: np.load(path / f"{key}.npy", allow_pickle=False) for key in COLUMNS}
+    except (OSError, ValueError) as exc:
+        if path.exists():
+            logger.warning("MF snapshot unreadable source=%s: %s", source, exc)
+        return None
+    return arrays, meta
+
+
+def _write_meta(path: Path, meta: Dict[str, Any]):
+    tmp = path / f".{META_NAME}.{os.getpid()}"
+    tmp.write_text(json.dumps(meta), encoding="utf-8")
+    os.replace(tmp, path / META_NAME)
+
+
+def _write(source: str, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]):
+    """임시 디렉터리에 쓴 뒤 교체(교체 순간에 없으면 다음 학습이 전체 재적재할 뿐)."""
+    path = snapshot_dir(source)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.parent / f".{path.name}.tmp-{os.getpid()}"
+    old = path.parent / f".{path.name}.old-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir()
+    for key in COLUMNS:
+        np.save(tmp / f"{key}.npy", np.ascontiguousarray(arrays[key]), allow_pickle=False)
+    _write_meta(tmp, meta)
+    if path.exists():
+        os.rename(path, old)
+    os.rename(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def invalidate(source: Optional[str] = None):
+    """스냅샷 삭제(대량 적재처럼 워터마크로 잡히지 않는 변경 후 호출). 다음 학습이 전체 재적재한다."""
+    for name in [source] if source else ["db", "csv"]:
+        shutil.rmtree(snapshot_dir(name), ignore_errors=True)
+
+
+def _columns(users, items, values, confidence) -> Dict[str, np.ndarray]:
+    raw = {"member_ids": users, "product_ids": items, "values": values, "confidence": confidence}
+    return {key: np.asarray(raw[key]).astype(dtype, copy=False) for key, dtype in COLUMNS.items()}
+
+
+def _replace_members(arrays: Dict[str, np.ndarray], member_ids: np.ndarray, delta: Dict[str, np.ndarray]):
+    """member_ids의 기존 행을 delta로 교체하고 (회원, 상품) 순서(전체 적재와 같은 순서)를 유지."""
+    keep = ~np.isin(arrays["member_ids"], member_ids.astype(np.int32))
+    merged = {key: np.concatenate([arrays[key][keep], delta[key]]) for key in COLUMNS}
+    order = np.lexsort((merged["product_ids"], merged["member_ids"]))
+    return {key: value[order] for key, value in merged.items()}
+
+
+def _db_config() -> Dict[str, Any]:
+    """스냅샷 값을 결정하는 설정(바뀌면 전체 재적재)."""
+    return {
+        "database": database.engine.url.render_as_string(hide_password=True),
+        **mf_services._interaction_weights(),
+        **mf_services._implicit_weights(),
+    }
+
+
+def _can_append(meta: Dict[str, Any], config: Dict[str, Any]) -> bool:
+    return (
+        meta.get("source") == "db"
+        and meta.get("config") == config
+        and (time.time() - float(meta.get("full_at", 0.0))) <= _max_age_seconds()
+    )
+
+
+def refresh_db() -> Dict[str, np.ndarray]:
+    """DB 스냅샷을 최신으로 맞춰 열 배열 반환(가능하면 워터마크 이후 변경 회원만 다시 집계)."""
+    started = time.perf_counter()
+    with database.engine.connect() as conn:
+        # 적재 전에 찍어 두어 적재 중 커밋된 쓰기는 다음 회차에 다시 잡힌다
+        watermark: datetime = conn.execute(text("SELECT LOCALTIMESTAMP")).scalar()
+    config = _db_config()
+    current = _read("db")
+    dirty, dirty_paths = _dirty_members()
+
+    changed_members = 0
+    if current is not None and _can_append(current[1], config):
+        arrays, previous = current
+        since = datetime.fromisoformat(previous["watermark"]) - timedelta(seconds=_overlap_seconds())
+        changed = mf_services.fetch_array(_CHANGED_MEMBERS_SQL, {"since": since}, columns=1, dtype=np.int64)[:, 0]
+        changed = np.union1d(changed, dirty)
+        changed_members = int(len(changed))
+        meta = {**previous, "mode": "append"}
+        if changed_members:
+            delta = _columns(*mf_services._load_interactions_from_db(member_ids=changed.tolist()))
+            arrays = _replace_members(arrays, changed, delta)
+    else:
+        arrays = _columns(*mf_services._load_interactions_from_db())
+        meta = {"format": SNAPSHOT_FORMAT, "source": "db", "config": config, "full_at": time.time(), "mode": "full"}
+
+    meta.update({
+        "watermark": watermark.isoformat(),
+        "rows": int(len(arrays["values"])),
+        "changed_members": changed_members,
+        "duration_sec": time.perf_counter() - started,
+        "updated_at": time.time(),
+    })
+    if meta["mode"] == "append" and not changed_members:
+        # 배열은 그대로, 워터마크만 전진
+        _write_meta(snapshot_dir("db"), meta)
+    else:
+        _write("db", arrays, meta)
+    # 전체 재적재든 증분이든 표시된 회원은 이번 배열에 반영됨
+    _clear_dirty(dirty_paths)
+    logger.info(
+        "MF snapshot db mode=%s rows=%d changed_members=%d in %.2fs",
+        meta["mode"], meta["rows"], changed_members, meta["duration_sec"],
+    )
+    return arrays
+
+
+def load_db(implicit: bool = False) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """학습용 (member_ids, product_ids, values). mf_services._load_ratings_from_db와 같은 내용."""
+    if not _enabled():
+        return mf_services._load_ratings_from_db(implicit=implicit)
+    arrays = refresh_db()
+    return arrays["member_ids"], arrays["product_ids"], arrays["confidence" if implicit else "values"]
+
+
+def _head_digest(data: bytes) -> str:
+    return hashlib.sha1(data[:_HEAD_BYTES]).hexdigest()
+
+
+def _parse_csv(data: bytes, fieldnames: Optional[Sequence[str]]) -> Tuple[Dict[str, np.ndarray], int, list]:
+    """CSV 바이트 파싱. (열 배열, 마지막 줄바꿈 이후 미완성 줄에서 나온 행 수, 헤더) 반환."""
+    complete = data.rfind(b"\n") + 1
+    body = data.decode("utf-8-sig")
+    reader = csv.DictReader(io.StringIO(body), fieldnames=list(fieldnames) if fieldnames else None)
+    ratings = mf_services._parse_rating_rows(reader)
+    tail_rows = 0
+    if complete < len(data):
+        # 쓰는 중인 마지막 줄은 다음 회차에 다시 읽도록 그 줄에서 나온 행 수를 기록
+        tail = data[complete:].decode("utf-8-sig")
+        tail_reader = csv.DictReader(io.StringIO(tail), fieldnames=list(reader.fieldnames or []))
+        tail_rows = len(mf_services._parse_rating_rows(tail_reader))
+    users, items, values = mf_engines.as_arrays(ratings)
+    return _columns(users, items, values, values), tail_rows, list(reader.fieldnames or [])
+
+
+def load_csv(csv_path: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """ratings.csv 학습 입력. 뒤에 덧붙은 부분만 파싱하고, 파일이 바뀌었으면 전체 파싱."""
+    if not _enabled():
+        return mf_engines.as_arrays(mf_services._load_ratings(csv_path))
+    started = time.perf_counter()
+    path = Path(csv_path).resolve()
+    with open(path, "rb") as f:
+        head = f.read(_HEAD_BYTES)
+        size = os.fstat(f.fileno()).st_size
+
+        current = _read("csv")
+        arrays: Optional[Dict[str, np.ndarray]] = None
+        meta: Dict[str, Any] = {}
+        if current is not None:
+            arrays, meta = current
+            offset = int(meta.get("offset", 0))
+            reusable = (
+                meta.get("path") == str(path)
+                and size >= offset
+                and meta.get("head_digest") == _head_digest(head[:offset])
+            )
+            if not reusable:
+                arrays = None
+            elif size == meta.get("size"):
+                return arrays["member_ids"], arrays["product_ids"], arrays["values"]
+
+        if arrays is not None:
+            f.seek(offset)
+            data = f.read()
+            appended, tail_rows, _ = _parse_csv(data, meta["fieldnames"])
+            keep = len(arrays["values"]) - int(meta.get("tail_rows", 0))
+            arrays = {key: np.concatenate([arrays[key][:keep], appended[key]]) for key in COLUMNS}
+            mode = "append"
+        else:
+            f.seek(0)
+            data = f.read()
+            offset = 0
+            arrays, tail_rows, fieldnames = _parse_csv(data, None)
+            meta = {"format": SNAPSHOT_FORMAT, "source": "csv", "path": str(path), "fieldnames": fieldnames}
+            mode = "full"
+
+    offset += data.rfind(b"\n") + 1
+    meta.update({
+        "head_digest": _head_digest(head[:offset]),
+        "offset": offset,
+        "size": size,
+        "tail_rows": tail_rows,
+        "rows": int(len(arrays["values"])),
+        "mode": mode,
+        "duration_sec": time.perf_counter() - started,
+        "updated_at": time.time(),
+    })
+    _write("csv", arrays, meta)
+    logger.info("MF snapshot csv mode=%s rows=%d in %.2fs", mode, meta["rows"], meta["duration_sec"])
+    return arrays["member_ids"], arrays["product_ids"], arrays["values"]
+
+
+def status() -> Dict[str, Any]:
+    """스냅샷 메타(학습은 별도 프로세스라 디스크에서 읽음)."""
+    result: Dict[str, Any] = {"enabled": _enabled()}
+    for source in ("db", "csv"):
+        try:
+            meta = json.loads((snapshot_dir(source) / META_NAME).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            result[source] = None
+            continue
+        result[source] = {
+            key: meta.get(key)
+            for key in ("mode", "rows", "watermark", "changed_members", "duration_sec", "full_at", "updated_at")
+            if key in meta
+        }
+    return result
@@ -0,0 +1,136 @@
+"""버전별 MF 모델 저장소.
+
+    models/
+      CURRENT                 # 현재 버전 이름(원자적으로 교체되는 포인터)
+      v<ns>-<pid>/            # 버전 디렉터리(쓰기 완료 후 rename으로 공개)
+        user_factors.npy ...  # 비압축 .npy(np.load(mmap_mode="r")로 열어 워커 간 페이지 캐시 공유)
+        meta.json
+
+id 배열은 정렬되어 있어 dict 대신 np.searchsorted로 조회한다.
+"""
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+ARRAY_KEYS = (
+    "user_factors",
+    "item_factors",
+    "user_bias",
+    "item_bias",
+    "user_ids",
+    "item_ids",
+    "user_mean",
+)
+# 있을 때만 저장/로드하는 배열(근사 검색 인덱스, int8 요인 행렬의 행별 스케일 등)
+OPTIONAL_KEYS = (
+    "ann_centroids",
+    "ann_order",
+    "ann_offsets",
+    "user_factors_scale",
+    "item_factors_scale",
+)
+POINTER_NAME = "CURRENT"
+META_NAME = "meta.json"
+
+
+def store_dir() -> Path:
+    return Path(os.getenv("MF_MODEL_DIR", str(Path(__file__).resolve().parent / "models")))
+
+
+def _keep_versions() -> int:
+    try:
+        return max(1, int(os.getenv("MF_MODEL_KEEP", "3")))
+    except ValueError:
+        return 3
+
+
+def current_version() -> Optional[str]:
+    """CURRENT 포인터가 가리키는 버전 이름(없으면 None)."""
+    try:
+        version = (store_dir() / POINTER_NAME).read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+    return version or None
+
+
+def list_versions() -> List[str]:
+    root = store_dir()
+    if not root.exists():
+        return []
+    return sorted(p.name for p in root.iterdir() if p.is_dir() and p.name.startswith("v"))
+
+
+def publish(result: Dict[str, Any], meta: Optional[Dict[str, Any]] = None) -> str:
+    """새 버전을 기록하고 CURRENT를 원자적으로 교체. 새 버전 이름 반환."""
+    root = store_dir()
+    root.mkdir(parents=True, exist_ok=True)
+    version = f"v{time.time_ns()}-{os.getpid()}"
+    tmp_dir = root / f".tmp-{version}"
+    tmp_dir.mkdir()
+
+    for key in ARRAY_KEYS:
+        np.save(tmp_dir / f"{key}.npy", np.ascontiguousarray(result[key]), allow_pickle=False)
+    for key in OPTIONAL_KEYS:
+        if result.get(key) is not None:
+            np.save(tmp_dir / f"{key}.npy", np.ascontiguousarray(result[key]), allow_pickle=False)
+    payload = {
+        "version": version,
+        "created_at": time.time(),
+        "global_mean": float(result["global_mean"]),
+        "center_user": bool(result["center_user"]),
+        "num_users": int(len(result["user_ids"])),
+        "num_items": int(len(result["item_ids"])),
+        "implicit": bool(result.get("implicit", False)),
+    }
+    if result.get("implicit"):
+        payload["implicit_alpha"] = float(result["implicit_alpha"])
+    payload.update(meta or {})
+    (tmp_dir / META_NAME).write_text(json.dumps(payload), encoding="utf-8")
+
+    os.rename(tmp_dir, root / version)
+    pointer_tmp = root / f".{POINTER_NAME}.{os.getpid()}"
+    pointer_tmp.write_text(version, encoding="utf-8")
+    os.replace(pointer_tmp, root / POINTER_NAME)
+
+    prune()
+    return version
+
+
+def prune(keep: Optional[int] = None):
+    """오래된 버전 삭제(현재 버전은 유지). 이미 mmap으로 연 워커는 파일이 지워져도 계속 읽을 수 있다."""
+    keep = keep if keep is not None else _keep_versions()
+    current = current_version()
+    versions = [v for v in list_versions() if v != current]
+    stale = versions[: max(0, len(versions) - (keep - 1))]
+    for version in stale:
+        shutil.rmtree(store_dir() / version, ignore_errors=True)
+
+
+def version_path(version: str) -> Path:
+    return store_dir() / version
+
+
+def open_version(version: str) -> Dict[str, Any]:
+    """버전 디렉터리를 mmap으로 열어 모델 dict 구성."""
+    path = version_path(version)
+    meta = json.loads((path / META_NAME).read_text(encoding="utf-8"))
+    model: Dict[str, Any] = {
+        key: np.load(path / f"{key}.npy", mmap_mode="r", allow_pickle=False) for key in ARRAY_KEYS
+    }
+    for key in OPTIONAL_KEYS:
+        if (path / f"{key}.npy").exists():
+            model[key] = np.load(path / f"{key}.npy", mmap_mode="r", allow_pickle=False)
+    model["global_mean"] = float(meta["global_mean"])
+    model["center_user"] = bool(meta.get("center_user", False))
+    model["implicit"] = bool(meta.get("implicit", False))
+    if model["implicit"]:
+        model["implicit_alpha"] = float(meta.get("implicit_alpha", 0.0))
+    model["version"] = version
+    model["meta"] = meta
+    model["loaded_at"] = float(meta.get("created_at", time.time()))
+    return model
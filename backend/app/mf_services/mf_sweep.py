@@ -0,0 +1,301 @@
+"""MF 하이퍼파라미터 탐색(엔진 x factors x lr x reg 격자 또는 무작위 표본을 여러 프로세스에서 병렬 학습).
+
+평점 배열과 홀드아웃 마스크는 한 번만 로드해 공유 메모리에 올리고, 워커는 복사 없이 붙어서 읽는다.
+각 설정은 엔진의 검증 RMSE 조기 종료로 학습한 뒤 홀드아웃 순위 지표(mf_experiment)로 평가한다.
+"""
+import itertools
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import mf_engines, mf_experiment, mf_services
+
+# 워커가 BLAS 스레드를 또 띄우면 코어를 나눠 쓰게 되므로 워커당 스레드 수를 제한
+_THREAD_ENV_KEYS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+# 워커 프로세스 전역(initializer에서 채움)
+_SHARED: Dict[str, Any] = {}
+
+
+def _load_dataset() -> Dict[str, np.ndarray]:
+    """학습 소스(MF_TRAIN_SOURCE)의 평점. CSV는 시각이 없어 시간 분할이 시드 무작위 분할이 된다."""
+    if mf_services._train_source() == "csv":
+        ratings_csv = os.getenv(
+            "RATINGS_CSV_PATH",
+            str(mf_experiment.DATA_DIR / "ratings.csv"),
+        )
+        users, items, values = mf_engines.as_arrays(mf_services._load_ratings(ratings_csv))
+        return {"users": users, "items": items, "values": values, "confidence": values, "ts": np.zeros(len(values))}
+    return mf_experiment._load_dataset()
+
+
+def _share(arrays: Dict[str, np.ndarray]) -> Tuple[List[shared_memory.SharedMemory], Dict[str, Tuple[str, str, int]]]:
+    """배열을 공유 메모리 블록으로 복사. 워커에 넘길 (이름, dtype, 길이) 정보 반환."""
+    blocks: List[shared_memory.SharedMemory] = []
+    specs: Dict[str, Tuple[str, str, int]] = {}
+    for key, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+        blocks.append(block)
+        specs[key] = (block.name, array.dtype.str, len(array))
+    return blocks, specs
+
+
+def _attach(specs: Dict[str, Tuple[str, str, int]]):
+    """워커 initializer: 공유 메모리에 붙어 읽기 전용 배열 뷰를 만든다.
+
+    spawn 워커는 부모의 resource tracker를 공유하므로 등록 해제하지 않는다(해제는 부모가 unlink로).
+    """
+    for key, (name, dtype, length) in specs.items():
+        block = shared_memory.SharedMemory(name=name)
+        view = np.ndarray((length,), dtype=np.dtype(dtype), buffer=block.buf)
+        view.flags.writeable = False
+        _SHARED[key] = view
+        _SHARED[f"_{key}_block"] = block
+
+
+def _evaluate(config: Dict[str, Any], ks: Sequence[int]) -> Dict[str, Any]:
+    """워커에서 실행: 학습 분할로 학습 후 홀드아웃 순위 지표 계산."""
+    test_mask = _SHARED["test_mask"].astype(bool)
+    data = {key: _SHARED[key] for key in ("users", "items", "values", "confidence")}
+    train = mf_experiment._train_arrays(config["engine"], data, ~test_mask)
+
+    row: Dict[str, Any] = dict(config)
+    started = time.perf_counter()
+    model = mf_experiment._train(config["engine"], train, config)
+    row["train_sec"] = time.perf_counter() - started
+    row["ratings_per_sec"] = len(train[0]) / row["train_sec"] if row["train_sec"] > 0 else 0.0
+    row["val_rmse"] = float(model.get("rmse", 0.0))
+
+    sets = mf_experiment._eval_sets(model, data, test_mask)
+    row.update(mf_experiment._ranking_metrics(model, sets, ks))
+    row["eval_users"] = int(len(sets["members"]))
+    row["worker_pid"] = os.getpid()
+    return row
+
+
+def grid(
+    engines: Sequence[str],
+    factors: Sequence[int],
+    lrs: Sequence[float],
+    regs: Optional[Sequence[float]],
+    epochs: int,
+    patience: int,
+    seed: int,
+    center_user: bool = False,
+    samples: int = 0,
+) -> List[Dict[str, Any]]:
+    """설정 격자. samples > 0이면 격자에서 그만큼 무작위(시드 고정) 표본."""
+    configs: List[Dict[str, Any]] = []
+    for engine, n_factors, lr in itertools.product(engines, factors, lrs):
+        for reg in regs or [mf_experiment._default_reg(engine)]:
+            configs.append({
+                "engine": engine,
+                "factors": int(n_factors),
+                "epochs": int(epochs),
+                "lr": float(lr),
+                "reg": float(reg),
+                "patience": int(patience),
+                "seed": int(seed),
+                "center_user": center_user,
+            })
+    if 0 < samples < len(configs):
+        configs = random.Random(seed).sample(configs, samples)
+    return configs
+
+
+def _mixed_rmse(metric: str, engines: Sequence[str]) -> bool:
+    """val_rmse는 암묵 엔진(선호도 0/1 RMSE)과 명시 엔진(평점 RMSE) 사이에 비교할 수 없다."""
+    kinds = {mf_engines.is_implicit(engine) for engine in engines}
+    return metric == "val_rmse" and len(kinds) > 1
+
+
+def _better(metric: str, row: Dict[str, Any], best: Optional[Dict[str, Any]]) -> bool:
+    if best is None:
+        return True
+    # rmse는 낮을수록, 순위 지표는 높을수록 좋음
+    if metric == "val_rmse":
+        return row[metric] < best[metric]
+    return row[metric] > best[metric]
+
+
+def sweep(
+    configs: List[Dict[str, Any]],
+    ks: Sequence[int] = (10,),
+    metric: str = "ndcg@10",
+    holdout: float = 0.2,
+    split: str = "time",
+    seed: int = 42,
+    workers: Optional[int] = None,
+    threads_per_worker: int = 1,
+    publish: bool = False,
+) -> Dict[str, Any]:
+    """설정들을 병렬 학습/평가하고 metric 기준 최고 설정을 고른다.
+
+    publish=True면 최고 설정으로 전체 데이터(홀드아웃 포함)를 다시 학습해 현재 모델로 공개한다.
+    """
+    if _mixed_rmse(metric, [config["engine"] for config in configs]):
+        raise ValueError("val_rmse cannot rank implicit and explicit engines together; use a ranking metric")
+    data = _load_dataset()
+    test_mask = mf_experiment._split(data, holdout, split, seed)
+    blocks, specs = _share({
+        "users": data["users"],
+        "items": data["items"],
+        "values": data["values"],
+        "confidence": data["confidence"],
+        "test_mask": test_mask.astype(np.uint8),
+    })
+    workers = max(1, min(workers or os.cpu_count() or 1, len(configs)))
+    saved_env = {key: os.environ.get(key) for key in _THREAD_ENV_KEYS}
+    results: List[Dict[str, Any]] = []
+    best: Optional[Dict[str, Any]] = None
+    started = time.perf_counter()
+    try:
+        # 자식 프로세스는 생성 시점의 환경 변수를 물려받는다
+        for key in _THREAD_ENV_KEYS:
+            os.environ[key] = str(threads_per_worker)
+        # fork는 uvicorn 스레드/DB 커넥션을 복제하므로 spawn 사용
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_attach, initargs=(specs,)) as pool:
+            futures = {pool.submit(_evaluate, config, ks): config for config in configs}
+            for future in as_completed(futures):
+                config = futures[future]
+                try:
+                    row = future.result()
+                except Exception as exc:
+                    print(f"MF sweep config failed {config}: {exc}")
+                    continue
+                results.append(row)
+                if _better(metric, row, best):
+                    best = row
+                print(
+                    f"engine={row['engine']} factors={row['factors']} lr={row['lr']} reg={row['reg']}",
+                    f"val_rmse={row['val_rmse']:.4f}",
+                    " ".join(f"{key}={row[key]:.4f}" for key in row if "@" in key),
+                    f"train_sec={row['train_sec']:.2f}",
+                    flush=True,
+                )
+    finally:
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    summary: Dict[str, Any] = {
+        "meta": {
+            "commit": mf_experiment._git_commit(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "split": split,
+            "holdout": holdout,
+            "seed": seed,
+            "ks": list(ks),
+            "metric": metric,
+            "workers": workers,
+            "configs": len(configs),
+            "pairs": int(len(data["values"])),
+            "test_pairs": int(test_mask.sum()),
+            "wall_sec": time.perf_counter() - started,
+        },
+        "results": sorted(results, key=lambda r: r.get(metric, 0.0), reverse=metric != "val_rmse"),
+        "best": best,
+    }
+
+    if publish and best is not None:
+        # 선택은 홀드아웃으로 했으니 공개 모델은 전체 데이터로 다시 학습
+        full = mf_experiment._train_arrays(best["engine"], data, np.ones(len(data["values"]), dtype=bool))
+        result = mf_experiment._train(best["engine"], full, best)
+        summary["published"] = mf_services._save_model(result, engine=best["engine"])
+    return summary
+
+
+def main(argv: Optional[List[str]] = None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="mf_services sweep")
+    parser.add_argument("--engines", default=",".join(mf_engines.available_engines()))
+    parser.add_argument("--factors", default="16,24,32")
+    parser.add_argument("--lr", default="0.005,0.01,0.02")
+    parser.add_argument(
+        "--reg",
+        default="",
+        help="쉼표 구분(모든 엔진에 같은 값). 기본은 엔진별 기본값(MF_REG/MF_ALS_REG/MF_IALS_REG): ALS 계열은 스케일이 달라 한 격자를 같이 쓰지 않음",
+    )
+    parser.add_argument("--epochs", type=int, default=int(os.getenv("MF_EPOCHS", "60")))
+    parser.add_argument("--patience", type=int, default=3, help="검증 RMSE 조기 종료 에폭 수")
+    parser.add_argument("--samples", type=int, default=0, help="격자에서 무작위로 고를 설정 수(0이면 전체 격자)")
+    parser.add_argument("--center-user", action="store_true")
+    parser.add_argument("--metric", default="ndcg@10", help="선택 기준(val_rmse는 낮을수록, 나머지는 높을수록 좋음)")
+    parser.add_argument("--k", default="10")
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--split", choices=["time", "random"], default="time")
+    parser.add_argument("--seed", type=int, default=int(os.getenv("MF_SEED", "42")))
+    parser.add_argument("--workers", type=int, default=None, help="기본: CPU 코어 수")
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--publish", action="store_true", help="최고 설정을 전체 데이터로 재학습해 현재 모델로 공개")
+    parser.add_argument("--out", default=None, help="리포트 경로(.json/.csv)")
+    args = parser.parse_args(argv)
+
+    ks = mf_experiment._int_list(args.k)
+    valid_metrics = {"val_rmse"} | {f"{name}@{k}" for name in mf_experiment.METRIC_KEYS for k in ks}
+    if args.metric not in valid_metrics:
+        parser.error(f"--metric must be one of: {', '.join(sorted(valid_metrics))}")
+
+    engines = [e.strip().lower() for e in args.engines.split(",") if e.strip()]
+    if _mixed_rmse(args.metric, engines):
+        parser.error("--metric val_rmse cannot compare implicit and explicit engines; pass only one kind in --engines")
+
+    configs = grid(
+        engines,
+        mf_experiment._int_list(args.factors),
+        mf_experiment._float_list(args.lr),
+        mf_experiment._float_list(args.reg),
+        epochs=args.epochs,
+        patience=args.patience,
+        seed=args.seed,
+        center_user=args.center_user,
+        samples=args.samples,
+    )
+    summary = sweep(
+        configs,
+        ks=ks,
+        metric=args.metric,
+        holdout=args.holdout,
+        split=args.split,
+        seed=args.seed,
+        workers=args.workers,
+        threads_per_worker=args.threads_per_worker,
+        publish=args.publish,
+    )
+    meta, best = summary["meta"], summary["best"]
+    print(
+        f"configs={meta['configs']} completed={len(summary['results'])}",
+        f"workers={meta['workers']} wall_sec={meta['wall_sec']:.2f}",
+    )
+    if best is None:
+        print("No configuration finished.")
+        return
+    print(
+        "Best:",
+        " ".join(f"{key}={best[key]}" for key in ("engine", "factors", "lr", "reg")),
+        f"{args.metric}={best[args.metric]:.4f}",
+    )
+    if "published" in summary:
+        print(f"model_path={summary['published']}")
+    if args.out:
+        mf_experiment.write_report(summary, args.out)
+        print(f"report={args.out}")
+
+
+if __name__ == "__main__":
+    main()
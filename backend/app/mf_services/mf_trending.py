@@ -0,0 +1,163 @@
+"""상품 인기(트렌딩) 점수: 주문/리뷰를 시간 감쇠 합으로 누적한 product_trending 테이블.
+
+각 행은 updated_at 시점의 감쇠 합을 저장하고, 새 주문/리뷰가 들어오면 같은 트랜잭션에서
+(기존 값 x 경과 감쇠 + 새 가중치)로 갱신한다(models.py의 mapper 이벤트, 카테고리 카운터와 같은 곳). 읽을 때는 경과 시간만큼 더 감쇠해 점수를 만든다.
+비회원/미등록 회원/대체 경로는 프로세스에 캐시한 카테고리 다양화 순위의 앞부분만 읽는다.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+import database
+import models
+
+logger = logging.getLogger(__name__)
+
+ORDER_WEIGHT = 0.8
+REVIEW_COUNT_WEIGHT = 0.15
+
+_LOCK = threading.Lock()
+# (생성 시각, 카테고리당 상한, 조회한 상품 수, 다양화된 상품 id 순위)
+_RANKING: Optional[Tuple[float, int, int, List[int]]] = None
+
+
+def _pool_size() -> int:
+    """미리 순위를 매겨 두는 상품 수."""
+    try:
+        return max(1, int(os.getenv("MF_TRENDING_POOL", "500")))
+    except ValueError:
+        return 500
+
+
+def _ttl_seconds() -> int:
+    """프로세스 내 순위 목록 재계산 주기(테이블은 쓰기마다 갱신됨)."""
+    try:
+        return max(0, int(os.getenv("MF_TRENDING_TTL_SEC", "300")))
+    except ValueError:
+        return 300
+
+
+_DECAY = models.TRENDING_DECAY
+
+_REBUILD_SQL = [
+    "LOCK TABLE product_trending IN EXCLUSIVE MODE",
+    "DELETE FROM product_trending",
+    f"""
+    INSERT INTO product_trending (product_id, order_weight, review_weight, rating_weight, updated_at)
+    SELECT product_id, SUM(orders * decay), SUM(reviews * decay), SUM(ratings * decay), LOCALTIMESTAMP
+    FROM (
+        SELECT d.product_id, 1 AS orders, 0 AS reviews, 0 AS ratings,
+               {_DECAY.format(ts="COALESCE(o.created_at, LOCALTIMESTAMP)")} AS decay
+        FROM order_detail d JOIN "order" o ON o.id = d.order_id
+        UNION ALL
+        SELECT r.product_id, 0, 1, r.rating,
+               {_DECAY.format(ts="COALESCE(r.created_at, LOCALTIMESTAMP)")}
+        FROM product_review r
+    ) src
+    WHERE product_id IS NOT NULL
+    GROUP BY product_id
+    """,
+]
+
+# 감쇠 합 + 감쇠 가중 평균 평점(같은 행의 감쇠는 약분됨). 기록이 없는 상품은 최신순
+_RANKED_SQL = f"""
+SELECT p.id, p.category_id
+FROM product p
+LEFT JOIN product_trending t ON t.product_id = p.id
+WHERE p.is_active IS TRUE
+ORDER BY COALESCE(
+    (:order_weight * t.order_weight + :review_weight * t.review_weight)
+        * {_DECAY.format(ts="t.updated_at")}
+    + CASE WHEN t.review_weight > 0 THEN t.rating_weight / t.review_weight ELSE 0 END,
+    0) DESC, p.created_at DESC
+LIMIT :pool
+"""
+
+
+def rebuild() -> Dict[str, Any]:
+    """주문/리뷰 원본에서 감쇠 합 전체를 한 트랜잭션으로 다시 계산."""
+    global _RANKING
+    started = time.perf_counter()
+    with database.engine.begin() as conn:
+        for sql in _REBUILD_SQL:
+            result = conn.execute(text(sql), {"tau": models.trending_tau_seconds()})
+    _RANKING = None
+    summary = {"rows": result.rowcount, "duration_sec": time.perf_counter() - started}
+    logger.info("product_trending rebuilt rows=%d in %.2fs", summary["rows"], summary["duration_sec"])
+    return summary
+
+
+def backfill():
+    """서버 시작/대량 적재 후 호출(실패해도 진행)."""
+    try:
+        rebuild()
+    except Exception as exc:
+        logger.warning("product_trending rebuild failed: %s", exc, exc_info=True)
+
+
+def _diversify(rows: List[Tuple[int, int]], per_category: int) -> List[int]:
+    """카테고리당 per_category개까지 점수순으로 고른 뒤 남은 상품을 점수순으로 잇는다.
+
+    어떤 limit에 대해서도 앞 limit개가 (상한 적용 -> 부족분 채우기) 결과와 같다.
+    """
+    picked: List[int] = []
+    rest: List[int] = []
+    per_cat_counts: Dict[int, int] = {}
+    for product_id, category_id in rows:
+        cat_id = int(category_id)
+        if per_cat_counts.get(cat_id, 0) >= per_category:
+            rest.append(int(product_id))
+            continue
+        per_cat_counts[cat_id] = per_cat_counts.get(cat_id, 0) + 1
+        picked.append(int(product_id))
+    return picked + rest
+
+
+def _cached_ranking(per_category: int, limit: int) -> Optional[List[int]]:
+    cached = _RANKING
+    ttl = _ttl_seconds()
+    if cached is None or ttl <= 0 or (time.time() - cached[0]) > ttl:
+        return None
+    built_at, cached_per_category, pool, ranking = cached
+    if cached_per_category != per_category or pool < limit:
+        return None
+    return ranking
+
+
+def _ranking(db: Session, per_category: int, limit: int) -> List[int]:
+    ranking = _cached_ranking(per_category, limit)
+    if ranking is not None:
+        return ranking
+    global _RANKING
+    with _LOCK:
+        # 다른 요청이 먼저 다시 계산했으면 그 결과 사용
+        ranking = _cached_ranking(per_category, limit)
+        if ranking is not None:
+            return ranking
+        pool = max(limit, _pool_size())
+        rows = db.execute(
+            text(_RANKED_SQL),
+            {"order_weight": ORDER_WEIGHT, "review_weight": REVIEW_COUNT_WEIGHT, "tau": models.trending_tau_seconds(), "pool": pool},
+        ).all()
+        ranking = _diversify(rows, per_category)
+        _RANKING = (time.time(), per_category, pool, ranking)
+    return ranking
+
+
+def top_ids(db: Session, limit: int, per_category: int) -> List[int]:
+    """카테고리 다양화된 인기 상품 id 상위 limit개."""
+    return _ranking(db, per_category, limit)[:limit]
+
+
+def status() -> Dict[str, Any]:
+    cached = _RANKING
+    return {
+        "half_life_days": models.trending_half_life_days(),
+        "ranked_products": len(cached[3]) if cached is not None else None,
+        "ranking_age_sec": (time.time() - cached[0]) if cached is not None else None,
+    }
@@ -1,10 +1,28 @@
+import math
+import os
+
 from sqlalchemy import (
-    Column, Integer, String, Text, Boolean, DateTime, ForeignKey, func,
-    CheckConstraint, UniqueConstraint, Index, Date, text, event, inspect
+    Column, Integer, String, Text, Boolean, DateTime, Float, ForeignKey, func,
+    CheckConstraint, UniqueConstraint, Index, Date, LargeBinary, text, event, inspect
 )
-from sqlalchemy.orm import relationship, joinedload
+from sqlalchemy.orm import relationship, joinedload, column_property
 from pgvector.sqlalchemy import Vector
-from database import Base, SessionLocal
+from database import Base, SessionLocal, drop_recommend_view
+
+# pgvector HNSW 인덱스 빌드 파라미터(검색 시 ef_search는 embedding_services.vector_search에서 설정)
+HNSW_INDEX_PARAMS = {"m": 16, "ef_construction": 64}
+
+
+def _embedding_hnsw_index(name: str) -> Index:
+    """embedding 컬럼 코사인 거리 HNSW 인덱스(ORDER BY embedding <=> :query LIMIT n 근사 검색)."""
+    return Index(
+        name,
+        "embedding",
+        postgresql_using="hnsw",
+        postgresql_with=HNSW_INDEX_PARAMS,
+        postgresql_ops={"embedding": "vector_cosine_ops"},
+    )
+
 
 class Member(Base):
     __tablename__ = "member"
@@ -107,6 +125,10 @@ class Category(Base):
 class Product(Base):
     __tablename__ = "product"
 
+    __table_args__ = (
+        _embedding_hnsw_index("ix_product_embedding_hnsw"),
+    )
+
     id = Column(Integer, primary_key=True, autoincrement=True)
     category_id = Column(Integer, ForeignKey("category.id"), nullable=False)
     name = Column(String(50), nullable=False)
@@ -128,6 +150,10 @@ class Product(Base):
 class Recipe(Base):
     __tablename__ = "recipe"
 
+    __table_args__ = (
+        _embedding_hnsw_index("ix_recipe_embedding_hnsw"),
+    )
+
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(Text, nullable=False)
     ingredient = Column(Text, nullable=True)
@@ -159,6 +185,10 @@ class RecipeBookmark(Base):
 class RecipeProduct(Base):
     __tablename__ = "recipe_product"
 
+    __table_args__ = (
+        _embedding_hnsw_index("ix_recipe_product_embedding_hnsw"),
+    )
+
     id = Column(Integer, primary_key=True, autoincrement=True)
     recipe_id = Column(Integer, ForeignKey("recipe.id"), nullable=False)
     product_id = Column(Integer, ForeignKey("product.id"))
@@ -250,6 +280,11 @@ class Order(Base):
     status = Column(String(20), default="pending")
     created_at = Column(DateTime, server_default=func.now())
 
+    __table_args__ = (
+        # MF 학습 스냅샷이 워터마크 이후 주문한 회원만 찾을 때 사용
+        Index("ix_order_created_at", "created_at"),
+    )
+
     member = relationship("Member", back_populates="orders")
     order_details = relationship("OrderDetail", back_populates="order", cascade="all, delete-orphan")
 
@@ -298,17 +333,20 @@ class ProductReview(Base):
     order_detail_id = Column(Integer, ForeignKey("order_detail.id", ondelete="SET NULL"), nullable=True)
     content = Column(Text, nullable=False)
     url = Column(Text, nullable=True)
-    rating = Column(Integer, nullable=False)
+    # 평점 변경 시 이전 값을 읽어 둬야 카테고리 카운터(rating_sum)를 증감할 수 있다
+    rating = column_property(Column(Integer, nullable=False), active_history=True)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
     __table_args__ = (
         CheckConstraint("rating BETWEEN 1 AND 5", name="check_rating_range"),
+        Index("ix_product_review_product_id", "product_id"),
+        Index("ix_product_review_updated_at", "updated_at"),
     )
 
 @event.listens_for(Base.metadata, "before_drop")
 def drop_views(target, connection, **kw):
-    connection.execute(text("DROP VIEW IF EXISTS recommend_view CASCADE;"))
+    drop_recommend_view(connection)
     print("✅ recommend_view dropped successfully (before drop_all).")
 
 class Recommend(Base):
@@ -332,11 +370,172 @@ class Wishlist(Base):
         UniqueConstraint("member_id", "product_id", name="uq_wishlist_member_product"),
         Index("ix_wishlist_member_id", "member_id"),
         Index("ix_wishlist_product_id", "product_id"),
+        Index("ix_wishlist_created_at", "created_at"),
     )
 
     member = relationship("Member", back_populates="wishlists")
     product = relationship("Product")
 
+class MemberRecommendation(Base):
+    """배치로 미리 계산한 회원별 MF 추천(순위별 한 행)."""
+    __tablename__ = "member_recommendation"
+
+    member_id = Column(Integer, ForeignKey("member.id", ondelete="CASCADE"), primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    product_id = Column(Integer, ForeignKey("product.id", ondelete="CASCADE"), nullable=False)
+    score = Column(Float, nullable=True)
+    list_limit = Column(Integer, nullable=False)
+    model_version = Column(String(64), nullable=True)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+class MemberCategoryStats(Base):
+    """회원×카테고리 상호작용 카운터(리뷰/위시/주문 쓰기와 같은 트랜잭션에서 증감)."""
+    __tablename__ = "member_category_stats"
+
+    member_id = Column(Integer, ForeignKey("member.id", ondelete="CASCADE"), primary_key=True)
+    category_id = Column(Integer, ForeignKey("category.id", ondelete="CASCADE"), primary_key=True)
+    review_count = Column(Integer, nullable=False, server_default=text("0"))
+    rating_sum = Column(Integer, nullable=False, server_default=text("0"))
+    wishlist_count = Column(Integer, nullable=False, server_default=text("0"))
+    order_count = Column(Integer, nullable=False, server_default=text("0"))
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class ProductTrending(Base):
+    """상품별 시간 감쇠 인기 누적값(updated_at 시점 값, 읽을 때 경과 시간만큼 더 감쇠)."""
+    __tablename__ = "product_trending"
+
+    product_id = Column(Integer, ForeignKey("product.id", ondelete="CASCADE"), primary_key=True)
+    order_weight = Column(Float, nullable=False, server_default=text("0"))
+    review_weight = Column(Float, nullable=False, server_default=text("0"))
+    rating_weight = Column(Float, nullable=False, server_default=text("0"))
+    updated_at = Column(DateTime, nullable=False, server_default=func.now())
+
+class QueryEmbedding(Base):
+    """질의 임베딩 영속 캐시(정규화 텍스트 해시 x 모델 x 입력 종류 -> float32 바이트)."""
+    __tablename__ = "query_embedding_cache"
+
+    model = Column(String(50), primary_key=True)
+    input_type = Column(String(20), primary_key=True)
+    text_hash = Column(String(64), primary_key=True)
+    query_text = Column(Text, nullable=False)
+    dim = Column(Integer, nullable=False)
+    vector = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+
+# 상품의 카테고리로 (회원, 카테고리) 행을 증감. 회원은 직접 값 또는 주문에서 조회
+_CATEGORY_STATS_BUMP = """
+INSERT INTO member_category_stats
+    (member_id, category_id, review_count, rating_sum, wishlist_count, order_count, updated_at)
+SELECT m.member_id, p.category_id,
+       GREATEST(:reviews, 0), GREATEST(:ratings, 0), GREATEST(:wishlists, 0), GREATEST(:orders, 0), now()
+FROM product p, ({member_sql}) m
+WHERE p.id = :product_id AND m.member_id IS NOT NULL
+ON CONFLICT (member_id, category_id) DO UPDATE SET
+    review_count = GREATEST(member_category_stats.review_count + :reviews, 0),
+    rating_sum = GREATEST(member_category_stats.rating_sum + :ratings, 0),
+    wishlist_count = GREATEST(member_category_stats.wishlist_count + :wishlists, 0),
+    order_count = GREATEST(member_category_stats.order_count + :orders, 0),
+    updated_at = now()
+"""
+_MEMBER_BY_ID = "SELECT CAST(:member_id AS INTEGER) AS member_id"
+_MEMBER_BY_ORDER = 'SELECT member_id FROM "order" WHERE id = :order_id'
+
+
+def _bump_category_stats(connection, member_sql: str, params: dict, reviews=0, ratings=0, wishlists=0, orders=0):
+    connection.execute(
+        text(_CATEGORY_STATS_BUMP.format(member_sql=member_sql)),
+        {**params, "reviews": reviews, "ratings": ratings, "wishlists": wishlists, "orders": orders},
+    )
+
+@event.listens_for(ProductReview, "after_insert")
+def review_after_insert(mapper, connection, target):
+    _bump_category_stats(
+        connection, _MEMBER_BY_ID, {"member_id": target.member_id, "product_id": target.product_id},
+        reviews=1, ratings=int(target.rating or 0),
+    )
+
+@event.listens_for(ProductReview, "after_update")
+def review_after_update(mapper, connection, target):
+    hist = inspect(target).attrs.rating.history
+    if not (hist.has_changes() and hist.added and hist.deleted):
+        return
+    _bump_category_stats(
+        connection, _MEMBER_BY_ID, {"member_id": target.member_id, "product_id": target.product_id},
+        ratings=int(hist.added[0] or 0) - int(hist.deleted[0] or 0),
+    )
+
+@event.listens_for(ProductReview, "after_delete")
+def review_after_delete(mapper, connection, target):
+    _bump_category_stats(
+        connection, _MEMBER_BY_ID, {"member_id": target.member_id, "product_id": target.product_id},
+        reviews=-1, ratings=-int(target.rating or 0),
+    )
+
+@event.listens_for(Wishlist, "after_insert")
+def wishlist_after_insert(mapper, connection, target):
+    _bump_category_stats(
+        connection, _MEMBER_BY_ID, {"member_id": target.member_id, "product_id": target.product_id}, wishlists=1,
+    )
+
+@event.listens_for(Wishlist, "after_delete")
+def wishlist_after_delete(mapper, connection, target):
+    _bump_category_stats(
+        connection, _MEMBER_BY_ID, {"member_id": target.member_id, "product_id": target.product_id}, wishlists=-1,
+    )
+
+@event.listens_for(OrderDetail, "after_insert")
+def order_detail_after_insert(mapper, connection, target):
+    _bump_category_stats(
+        connection, _MEMBER_BY_ORDER, {"order_id": target.order_id, "product_id": target.product_id}, orders=1,
+    )
+
+@event.listens_for(OrderDetail, "after_delete")
+def order_detail_after_delete(mapper, connection, target):
+    _bump_category_stats(
+        connection, _MEMBER_BY_ORDER, {"order_id": target.order_id, "product_id": target.product_id}, orders=-1,
+    )
+
+def trending_half_life_days() -> float:
+    """트렌딩 주문/리뷰 가중치가 절반이 되는 기간(일)."""
+    try:
+        return max(0.01, float(os.getenv("MF_TRENDING_HALF_LIFE_DAYS", "14")))
+    except ValueError:
+        return 14.0
+
+def trending_tau_seconds() -> float:
+    return trending_half_life_days() * 86400.0 / math.log(2.0)
+
+# 타임스탬프 컬럼이 timezone 없는 DateTime이라 LOCALTIMESTAMP 기준으로 경과 시간 계산(mf_trending 읽기에도 사용)
+TRENDING_DECAY = "EXP(-GREATEST(EXTRACT(EPOCH FROM (LOCALTIMESTAMP - {ts})), 0) / :tau)"
+
+_TRENDING_BUMP = f"""
+INSERT INTO product_trending (product_id, order_weight, review_weight, rating_weight, updated_at)
+VALUES (:product_id, :orders, :reviews, :ratings, LOCALTIMESTAMP)
+ON CONFLICT (product_id) DO UPDATE SET
+    order_weight = product_trending.order_weight * {TRENDING_DECAY.format(ts="product_trending.updated_at")} + :orders,
+    review_weight = product_trending.review_weight * {TRENDING_DECAY.format(ts="product_trending.updated_at")} + :reviews,
+    rating_weight = product_trending.rating_weight * {TRENDING_DECAY.format(ts="product_trending.updated_at")} + :ratings,
+    updated_at = LOCALTIMESTAMP
+"""
+
+def _bump_trending(connection, product_id, orders=0.0, reviews=0.0, ratings=0.0):
+    if product_id is None:
+        return
+    connection.execute(
+        text(_TRENDING_BUMP),
+        {"product_id": int(product_id), "orders": orders, "reviews": reviews, "ratings": ratings,
+         "tau": trending_tau_seconds()},
+    )
+
+# 주문/리뷰 ORM 쓰기와 같은 트랜잭션에서 트렌딩 누적(삭제는 감쇠로 자연히 사라지게 둠)
+@event.listens_for(OrderDetail, "after_insert")
+def order_detail_trending_after_insert(mapper, connection, target):
+    _bump_trending(connection, target.product_id, orders=1.0)
+
+@event.listens_for(ProductReview, "after_insert")
+def review_trending_after_insert(mapper, connection, target):
+    _bump_trending(connection, target.product_id, reviews=1.0, ratings=float(target.rating or 0))
+
 class AiMeal(Base):
     __tablename__ = "ai_meal"
     
@@ -1,12 +1,18 @@
-﻿from typing import Dict, List, Optional
+﻿import json
+from typing import Dict, List, Optional
 
 from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
+import database
 from database import get_db
-from mf_services import mf_recommend, mf_services
+from mf_services import (
+    mf_cache, mf_category_stats, mf_interactions, mf_precompute, mf_recommend, mf_recommend_view, mf_retrain,
+    mf_snapshot, mf_trending,
+)
 import models
+from schemas.mf_recommend import MFBatchRequest
 from schemas.product import ProductOut
 
 router = APIRouter(prefix="/api/mf_recommend", tags=["mf_recommend"])
@@ -19,19 +25,48 @@ def get_mf_recommendations(
     db: Session = Depends(get_db),
 ):
     """MF 추천 목록 조회."""
-    mf_services.trigger_retrain(reason="api_recommend_request")
     rows = mf_recommend.recommend_for_member(db, member_id, limit)
+    return [_product_item(prod, avg_rating, review_count) for prod, avg_rating, review_count in rows]
 
-    items = []
-    for prod, avg_rating, review_count in rows:
-        data = prod.__dict__.copy()
-        data.pop("_sa_instance_state", None)
-        data["avg_rating"] = float(avg_rating) if avg_rating is not None else 0.0
-        data["review_count"] = int(review_count)
-        data["monthly_buyers"] = 0
-        items.append(data)
 
-    return items
+def _product_item(prod: models.Product, avg_rating, review_count) -> dict:
+    data = prod.__dict__.copy()
+    data.pop("_sa_instance_state", None)
+    data["avg_rating"] = float(avg_rating) if avg_rating is not None else 0.0
+    data["review_count"] = int(review_count)
+    data["monthly_buyers"] = 0
+    return data
+
+
+@router.post("/mf/batch")
+def get_mf_recommendations_batch(payload: MFBatchRequest):
+    """여러 회원 MF 추천을 NDJSON(회원당 한 줄)으로 스트리밍."""
+
+    def _lines():
+        # 스트리밍 도중에도 세션이 살아 있도록 응답 생성기 안에서 직접 연다
+        with database.SessionLocal() as db:
+            for member_id, recs in mf_recommend.recommend_for_members(db, payload.member_ids, payload.limit):
+                items = []
+                for prod, avg_rating, review_count, score in recs:
+                    item = ProductOut.model_validate(_product_item(prod, avg_rating, review_count)).model_dump(mode="json")
+                    item["score"] = score
+                    items.append(item)
+                yield json.dumps({"member_id": member_id, "items": items}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
+
+
+@router.get("/status")
+def get_mf_status():
+    """재학습 스케줄러 상태(대기 트리거 수, 마지막 학습 시간, 모델 나이) + 추천 캐시 적중률/사전 계산 작업."""
+    status = mf_retrain.status()
+    status["cache"] = mf_cache.stats()
+    status["precompute"] = mf_precompute.status()
+    status["interactions"] = mf_interactions.stats()
+    status["trending"] = mf_trending.status()
+    status["recommend_view"] = mf_recommend_view.status()
+    status["training_snapshot"] = mf_snapshot.status()
+    return status
 
 
 @router.get("/stats")
@@ -40,50 +75,21 @@ def get_member_category_stats(
     limit: int = Query(20, ge=1, le=200),
     db: Session = Depends(get_db),
 ):
-    """회원 카테고리 통계(리뷰/위시/구매/추천)."""
-    review_rows = (
-        db.query(
-            models.Product.category_id,
-            models.Category.name,
-            func.count(models.ProductReview.id),
-            func.coalesce(func.avg(models.ProductReview.rating), 0),
-        )
-        .join(models.Product, models.Product.id == models.ProductReview.product_id)
-        .join(models.Category, models.Category.id == models.Product.category_id)
-        .filter(models.ProductReview.member_id == member_id)
-        .group_by(models.Product.category_id, models.Category.name)
-        .all()
-    )
-    wishlist_rows = (
-        db.query(
-            models.Product.category_id,
-            models.Category.name,
-            func.count(models.Wishlist.id),
-        )
-        .join(models.Product, models.Product.id == models.Wishlist.product_id)
-        .join(models.Category, models.Category.id == models.Product.category_id)
-        .filter(models.Wishlist.member_id == member_id)
-        .group_by(models.Product.category_id, models.Category.name)
-        .all()
-    )
-    order_rows = (
-        db.query(
-            models.Product.category_id,
-            models.Category.name,
-            func.count(models.OrderDetail.id),
-        )
-        .join(models.Product, models.Product.id == models.OrderDetail.product_id)
-        .join(models.Category, models.Category.id == models.Product.category_id)
-        .join(models.Order, models.Order.id == models.OrderDetail.order_id)
-        .filter(models.Order.member_id == member_id)
-        .group_by(models.Product.category_id, models.Category.name)
-        .all()
-    )
-
-    review_map: Dict[int, int] = {cid: int(cnt) for cid, _, cnt, _ in review_rows}
-    rating_map: Dict[int, float] = {cid: float(avg) for cid, _, _, avg in review_rows}
-    wishlist_map: Dict[int, int] = {cid: int(cnt) for cid, _, cnt in wishlist_rows}
-    order_map: Dict[int, int] = {cid: int(cnt) for cid, _, cnt in order_rows}
+    """회원 카테고리 통계(리뷰/위시/구매/추천). 리뷰/위시/구매 수는 member_category_stats 카운터에서 읽는다."""
+    counters = mf_category_stats.member_rows(db, [member_id])
+    review_map: Dict[int, int] = {}
+    rating_map: Dict[int, float] = {}
+    wishlist_map: Dict[int, int] = {}
+    order_map: Dict[int, int] = {}
+    for row in counters:
+        cid = int(row.category_id)
+        if row.review_count > 0:
+            review_map[cid] = int(row.review_count)
+            rating_map[cid] = row.rating_sum / row.review_count
+        if row.wishlist_count > 0:
+            wishlist_map[cid] = int(row.wishlist_count)
+        if row.order_count > 0:
+            order_map[cid] = int(row.order_count)
 
     rec_rows = mf_recommend.recommend_for_member(db, member_id, limit)
     rec_map: Dict[int, int] = {}
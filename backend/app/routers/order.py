@@ -4,7 +4,7 @@ from typing import List
 from database import get_db
 import models
 from schemas.order import OrderIn, OrderOut
-from mf_services import mf_services
+from mf_services import mf_events
 
 router = APIRouter(prefix="/api/orders", tags=["orders"])
 
@@ -41,7 +41,7 @@ def create_order(order_in: OrderIn, db: Session = Depends(get_db)):
     db.add(order)
     db.commit()
     db.refresh(order)
-    mf_services.trigger_retrain(reason="order_create")
+    mf_events.record_interaction(order.member_id, reason="order_create")
 
     return order
 
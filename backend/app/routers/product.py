@@ -8,7 +8,7 @@ from database import get_db
 import models
 from schemas.product import ProductOut, PaginationProduct
 from schemas.review import ProductReviewIn, ProductReviewOut, PaginationReview
-from mf_services import mf_services
+from mf_services import mf_events
 
 router = APIRouter(prefix="/api/products", tags=["products"])
 
@@ -198,7 +198,7 @@ def create_review(product_id: int, review: ProductReviewIn, db: Session = Depend
     db.add(db_review)
     db.commit()
     db.refresh(db_review)
-    mf_services.trigger_retrain(reason="review_create")
+    mf_events.record_interaction(db_review.member_id, reason="review_create")
     return db_review
 
 
@@ -5,20 +5,15 @@ import json
 from database import get_db, SessionLocal
 from models import Recipe, RecipeStep, RecipeProduct, Product, Taste, RecipeTip
 from typing import List
-import numpy as np
 import os
-from sklearn.metrics.pairwise import cosine_similarity
-import voyageai
 from langchain_openai import ChatOpenAI
 from schemas.recipe import RecipeTipsResponse
+from embedding_services import recipe_matrix
 from pydantic import ValidationError
 import requests
 
 router = APIRouter(prefix="/api/recipe", tags=["레시피 관리"])
 
-VOYAGE_API_KEY = os.getenv("EMBEDDING_API_KEY")
-voyage_client = voyageai.Client(api_key=VOYAGE_API_KEY)
-
 CUSTOM_API_KEY = os.getenv("LLM_API_KEY")
 CUSTOM_BASE_URL = os.getenv("LLM_BASE_URL")
 CUSTOM_MODEL_NAME = "gemini-3-flash-preview"
@@ -183,53 +178,12 @@ def get_recommend_recipe(
     if not ids:
         return []
     
-    # 1. 장바구니 상품들 가져오기
-    products = db.query(Product).filter(Product.id.in_(ids)).all()
-    if not products:
-        return []
-        
-    # 2. 전체 레시피 로드 (임베딩이 있는 것만)
-    all_recipes = db.query(Recipe).filter(Recipe.embedding != None).all()
-    if not all_recipes:
+    # 캐시된 레시피 임베딩 행렬과 상품 임베딩의 행렬곱 한 번으로 상품별 최대 유사도 계산
+    top_ids = recipe_matrix.recommend_for_products(db, ids, limit=4)
+    if not top_ids:
         return []
-    
-    # 레시피 임베딩 배열 생성
-    recipe_embeddings = np.array([r.embedding for r in all_recipes])
-    
-    # 3. 각 레시피의 최종 점수를 저장할 딕셔너리 {recipe_id: max_score}
-    # 초기값은 매우 낮은 점수로 설정
-    recipe_scores = {r.id: -1.0 for r in all_recipes}
-    recipe_map = {r.id: r for r in all_recipes}
-
-    # 4. 각 상품별로 루프를 돌며 레시피들과의 유사도 계산 (핵심!)
-    for p in products:
-        if p.embedding is None:
-            continue
-            
-        p_vector = np.array(p.embedding).reshape(1, -1)
-        # 현재 상품과 모든 레시피 간의 유사도 계산
-        sims = cosine_similarity(p_vector, recipe_embeddings)[0]
-        
-        # 텍스트 매칭 보너스용 키워드 (상품명 앞글자)
-        # keyword = p.name
-
-        for idx, sim in enumerate(sims):
-            r = all_recipes[idx]
-            
-            # 해당 상품(p)과 레시피(r) 사이의 점수 계산
-            current_score = sim
-            # if keyword in (r.ingredient or ""):
-            #     current_score += 1.0  # 텍스트 일치 보너스
-            
-            # "최대 유사도" 전략: 이 레시피가 가진 기존 점수보다 높으면 업데이트
-            if current_score > recipe_scores[r.id]:
-                recipe_scores[r.id] = current_score
-
-    # 5. 점수 높은 순으로 정렬
-    sorted_recipe_ids = sorted(recipe_scores.items(), key=lambda x: x[1], reverse=True)
-    
-    # 6. 상위 4개 결과 생성
-    top_4_recipes = [recipe_map[rid] for rid, score in sorted_recipe_ids[:4]]
+    recipe_map = {r.id: r for r in db.query(Recipe).filter(Recipe.id.in_(top_ids)).all()}
+    top_4_recipes = [recipe_map[rid] for rid in top_ids if rid in recipe_map]
 
     return [
         {
@@ -5,7 +5,6 @@ import re
 import random
 from collections import defaultdict
 import httpx
-import voyageai
 import requests
 from datetime import date, timedelta, datetime
 from fastapi import APIRouter, Depends, HTTPException
@@ -20,6 +19,8 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from pydantic import SecretStr
 from database import get_db
+from mf_services import mf_precompute
+from embedding_services import gateway as embedding_gateway, query_cache, vector_search
 from models import Recipe, RecipeProduct, Member, ChatLog, ChatMessage, AiMeal, MealCalendar, Product
 from schemas.recommendations import (
     RecommendationRequest, RecommendationResponse, ChatRequest, ChatResponse, DailyPlanResponse,
@@ -29,9 +30,8 @@ from schemas.recommendations import (
 # 라우터 설정
 router = APIRouter(prefix="/api/recommendations", tags=["Recommendations"])
 
-# Voyage 임베딩 설정
-VOYAGE_API_KEY = os.getenv("EMBEDDING_API_KEY")
-voyage_client = voyageai.Client(api_key=VOYAGE_API_KEY)
+# 임베딩: 공용 게이트웨이(동시 요청을 모아 배치 호출)
+voyage_client = embedding_gateway.client()
 
 ###########################################################
 # 기존 OpenAPI 방식
@@ -97,6 +97,7 @@ def start_scheduler():
         id="get_token_scheduler",
         replace_existing=True
     )
+    mf_precompute.register_jobs(scheduler)
     scheduler.start()
 
 def shutdown_scheduler():
@@ -1760,7 +1761,8 @@ def retrieve_node(state: AgentState):
 
     # 1. 벡터 검색 시도
     try:
-        query_vector = voyage_client.embed([query], model="voyage-3.5", input_type="query").embeddings[0]
+        query_vector = query_cache.embed_query(voyage_client, query, model="voyage-3.5", input_type="query")
+        vector_search.apply_search_params(db, limit=20)
         results = db.query(Recipe) \
             .options(joinedload(Recipe.product_links).joinedload(RecipeProduct.product)) \
             .order_by(Recipe.embedding.cosine_distance(query_vector)) \
@@ -2217,6 +2219,18 @@ def get_chat_logs(member_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/embedding-cache")
+def get_embedding_cache_stats():
+    """질의 임베딩 캐시 단계별(LRU/테이블) 적중률."""
+    return query_cache.stats()
+
+
+@router.get("/embedding-gateway")
+def get_embedding_gateway_stats():
+    """임베딩 게이트웨이 배치 통계(배치 수, 평균 배치 크기, 실패 수)."""
+    return embedding_gateway.stats()
+
+
 # Approve AiMeal rows that were created for a given assistant ChatMessage id.
 @router.post("/approve_plan")
 def approve_plan(payload: dict, db: Session = Depends(get_db)):
@@ -2261,7 +2275,8 @@ def query_retrieve_node(state: RecState, config):
     db: Session = config["configurable"]["db"]
     query = state["user_query"]
     limit_count = state.get("candidate_limit", 20)
-    query_vector = voyage_client.embed([query], model="voyage-3.5", input_type="query").embeddings[0]
+    query_vector = query_cache.embed_query(voyage_client, query, model="voyage-3.5", input_type="query")
+    vector_search.apply_search_params(db, limit=limit_count)
     results = db.query(Recipe) \
         .options(joinedload(Recipe.product_links).joinedload(RecipeProduct.product)) \
         .order_by(Recipe.embedding.cosine_distance(query_vector)) \
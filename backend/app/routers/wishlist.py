@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 from database import get_db
 from models import Product, Wishlist, Member
 from deps.auth import get_current_member
-from mf_services import mf_services
+from mf_services import mf_events
 
 router = APIRouter(prefix="/api/wishlist", tags=["wishlist"])
 
@@ -59,7 +59,7 @@ def add_to_wishlist(
     w = Wishlist(member_id=me.id, product_id=product_id)
     db.add(w)
     db.commit()
-    mf_services.trigger_retrain(reason="wishlist_add")
+    mf_events.record_interaction(me.id, reason="wishlist_add")
     return {"liked": True}
 
 
@@ -79,5 +79,5 @@ def remove_from_wishlist(
 
     db.delete(row)
     db.commit()
-    mf_services.trigger_retrain(reason="wishlist_remove")
+    mf_events.record_interaction(me.id, reason="wishlist_remove")
     return {"liked": False}
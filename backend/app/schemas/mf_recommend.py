@@ -0,0 +1,8 @@
+from typing import List
+
+from pydantic import BaseModel, Field
+
+
+class MFBatchRequest(BaseModel):
+    member_ids: List[int] = Field(..., min_length=1, max_length=5000)
+    limit: int = Field(20, ge=1, le=100)
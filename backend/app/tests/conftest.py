@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 앱 모듈은 backend/app을 기준으로 import한다(uvicorn main:app과 같은 경로)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,156 @@
+"""mf_cache 백엔드 테스트(Redis는 get/set/incr/expire만 흉내 내는 로컬 대체 클라이언트 사용)."""
+import fnmatch
+import time
+
+from mf_services import mf_cache
+
+
+class FakeRedis:
+    """redis.Redis 중 RedisBackend가 쓰는 명령만 구현(만료 포함, 값은 bytes로 저장)."""
+
+    def __init__(self):
+        self._data = {}
+        self._expires = {}
+
+    def _alive(self, key):
+        expires_at = self._expires.get(key)
+        if expires_at is not None and time.time() >= expires_at:
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    def get(self, key):
+        return self._data[key] if self._alive(key) else None
+
+    def set(self, key, value, ex=None):
+        self._data[key] = value.encode("utf-8") if isinstance(value, str) else value
+        self._expires.pop(key, None)
+        if ex is not None:
+            self.expire(key, ex)
+        return True
+
+    def incr(self, key):
+        value = int(self.get(key) or 0) + 1
+        self._data[key] = str(value).encode("utf-8")
+        return value
+
+    def expire(self, key, seconds):
+        if not self._alive(key):
+            return False
+        self._expires[key] = time.time() + seconds
+        return True
+
+    def delete(self, *keys):
+        removed = 0
+        for key in keys:
+            removed += int(self._data.pop(key, None) is not None)
+            self._expires.pop(key, None)
+        return removed
+
+    def scan_iter(self, match="*"):
+        return [key for key in list(self._data) if self._alive(key) and fnmatch.fnmatchcase(key, match)]
+
+
+ROWS = [(1, 4.5, 3, 0.9), (2, 4.0, 1, None)]
+
+
+def _cache(backend):
+    return mf_cache.RecommendCache(backend)
+
+
+def test_redis_roundtrip_and_generation_invalidation():
+    fake = FakeRedis()
+    cache = _cache(mf_cache.RedisBackend(client=fake))
+
+    key = cache.key("v1", 7, (10,))
+    assert cache.get(key) is None
+    cache.set(key, ROWS, ttl=60)
+    assert cache.get(key) == ROWS
+
+    # 다른 워커(같은 Redis를 보는 별도 캐시)에서 무효화해도 세대 키가 공유되어 키가 바뀐다
+    other = _cache(mf_cache.RedisBackend(client=fake))
+    other.invalidate_member(7)
+    new_key = cache.key("v1", 7, (10,))
+    assert new_key != key
+    assert cache.get(new_key) is None
+    assert fake.get("mf:rec:gen:7") == b"1"
+
+    # 다른 회원과 익명 키는 영향 없음
+    anon_key = cache.key("v1", None, (10,))
+    cache.set(anon_key, ROWS, ttl=60)
+    other.invalidate_member(8)
+    assert cache.get(anon_key) == ROWS
+
+    stats = cache.stats()
+    assert stats["backend"] == "redis"
+    assert stats["evictions"] is None
+    assert stats["hits"] == 2 and stats["misses"] == 2
+
+
+def test_redis_entries_expire():
+    fake = FakeRedis()
+    backend = mf_cache.RedisBackend(client=fake)
+    backend.set("k", ROWS, ttl=60)
+    fake.expire("mf:rec:k", 0)
+    assert backend.get("k") is None
+
+
+def test_redis_clear_removes_only_prefixed_keys():
+    fake = FakeRedis()
+    fake.set("other:key", "x")
+    backend = mf_cache.RedisBackend(client=fake)
+    backend.set("k", ROWS, ttl=60)
+    backend.bump(3)
+    backend.clear()
+    assert fake.scan_iter("mf:rec:*") == []
+    assert fake.get("other:key") == b"x"
+
+
+def test_redis_failure_is_a_miss():
+    class Broken:
+        def get(self, key):
+            raise ConnectionError("down")
+
+    cache = _cache(mf_cache.RedisBackend(client=Broken()))
+    assert cache.key("v1", 1, (10,)) is None
+    assert cache.get("1:0:v1:10") is None
+    assert cache.stats()["errors"] == 2
+
+
+def test_lru_eviction():
+    backend = mf_cache.LRUBackend(max_entries=2)
+    backend.set("a", ROWS, ttl=60)
+    backend.set("b", ROWS, ttl=60)
+    assert backend.get("a") == ROWS  # a가 최근 사용으로 이동
+    backend.set("c", ROWS, ttl=60)
+    assert backend.get("b") is None
+    assert backend.get("a") == ROWS and backend.get("c") == ROWS
+    assert backend.evictions == 1
+
+
+def test_lru_bump_drops_member_entries():
+    cache = _cache(mf_cache.LRUBackend(max_entries=10))
+    key = cache.key("v1", 5, (10,))
+    cache.set(key, ROWS, ttl=60)
+    cache.set(cache.key("v1", 6, (10,)), ROWS, ttl=60)
+    cache.invalidate_member(5)
+    assert cache.key("v1", 5, (10,)) != key
+    assert cache.backend.size() == 1
+
+
+def test_lru_generations_are_bounded():
+    backend = mf_cache.LRUBackend(max_entries=3)
+    for member_id in range(100):
+        backend.bump(member_id)
+    assert len(backend._generations) == 3
+    assert backend.generation(99) == 1
+    assert backend.generation(0) == 0
+
+    # 세대가 밀려난 회원의 남은 항목도 함께 지워져 세대 0 키가 옛 결과를 돌려주지 않는다
+    backend = mf_cache.LRUBackend(max_entries=3)
+    backend.bump(1)
+    backend.set("1:0:v1:10", ROWS, ttl=60)  # 무효화 직전에 계산이 시작된 요청의 늦은 쓰기
+    for member_id in (2, 3, 4):
+        backend.bump(member_id)
+    assert backend.generation(1) == 0
+    assert backend.get("1:0:v1:10") is None